@@ -1,29 +1,56 @@
-from langchain_community.tools import DuckDuckGoSearchRun
+from langchain_core.runnables import RunnableLambda
 from langchain_core.messages import (
     AnyMessage, AIMessage, HumanMessage, SystemMessage, ToolMessage, BaseMessage
 )
 from langgraph.graph import START, StateGraph, END
 from langgraph.graph.message import add_messages
-from langgraph.prebuilt import ToolNode, tools_condition
+from langgraph.prebuilt import tools_condition
 from typing import TypedDict, Annotated, List, Dict, Any, Sequence
+import threading
+import time
+import uuid
 
-from chat_agent.meta_agent import invoke_llm_manually
+from chat_agent.completion_cache import CompletionCacheMiss
+from chat_agent.meta_agent import ainvoke_llm_manually, invoke_llm_manually
+from chat_agent import model_router
+from chat_agent.tool_executor import ParallelToolNode
 
-from tools.file_downloader import file_downloader_tool
-from tools.board_to_fen import board_to_fen_tool
-from tools.transcribe_audio import transcribe_audio_tool
-from tools.youtube import youtube_tool
+# Tool modules are imported on first use, so startup does not load TensorFlow, Vosk or yt-dlp
+from tools.registry import lazy_tool
+from tools.prefetch import prefetch, record_first_tool_result
 
 # --- Configuration ---
 AWS_REGION = "us-east-2"  # AWS region where Llama 405B is available
 LLAMA_MODEL_ID = "us.meta.llama3-1-405b-instruct-v1:0"  # Llama 405B model ID
 
+# AgentState is shared by every compiled graph
+class AgentState(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+
+def route_after_assistant(state: AgentState):
+    """Like tools_condition, but also routes malformed tool calls to the tools node for error feedback."""
+    last_message = state["messages"][-1]
+    if getattr(last_message, "invalid_tool_calls", None):
+        return "tools"
+    return tools_condition(state)
+
 # --- Agent Definition (Modified) ---
 class BasicAgent:
     def __init__(self):
         print("BasicAgent initialized.")
-        self.search_tool = DuckDuckGoSearchRun()
-        self.tools = [self.search_tool, file_downloader_tool, board_to_fen_tool, transcribe_audio_tool, youtube_tool]
+        self.model_id = LLAMA_MODEL_ID
+        self.region_name = AWS_REGION
+        self.temperature = 0.2
+        self.max_tokens = 5000
+        # With MODEL_ROUTING=1 turns start on a smaller model and escalate to model_id
+        self.router = model_router.get_model_router() if model_router.MODEL_ROUTING else None
+        # Compiled graphs keyed by _graph_key(), built lazily in get_graph()
+        self._graph_cache = {}
+        self._graph_lock = threading.Lock()
+        # HumanMessage id -> (start time, whether a prefetch was started) for in-flight questions
+        self._question_started = {}
+        self.search_tool = lazy_tool("duckduckgo_search")
+        self.tools = [self.search_tool, lazy_tool("file_downloader"), lazy_tool("board_to_fen"), lazy_tool("Transcribe Audio"), lazy_tool("youtube_processor")]
         # self.system_prompt = """You are a helpful AI assistant using the AWS Bedrock Llama 405B model. You follow the ReAct (Reasoning and Acting) approach to solve problems step by step.
         
         # When you need information, you can use the available tools. For each step:
@@ -49,12 +76,25 @@ class BasicAgent:
         # print(self.system_prompt)
         # print("\n--- END Agent Initialized With PROMPT---")
 
-    def __call__(self, question: str, task_id: str = None) -> dict:
-        # print(f"Agent received question: {question}")
+    def _graph_key(self):
+        """Cache key for the compiled graph: the tool set plus the model config."""
+        return (
+            tuple(getattr(tool, "name", repr(tool)) for tool in self.tools),
+            self.model_id,
+            self.region_name,
+            self.temperature,
+            self.max_tokens,
+            id(self.router),
+        )
 
-        # AgentState definition remains the same
-        class AgentState(TypedDict):
-            messages: Annotated[List[AnyMessage], add_messages]
+    def _build_graph(self):
+        """Builds and compiles the assistant/tools StateGraph for the current tool set."""
+        tools = list(self.tools)
+        model_id = self.model_id
+        region_name = self.region_name
+        temperature = self.temperature
+        max_tokens = self.max_tokens
+        router = self.router
 
         # --- Modified Assistant Node ---
         def assistant_node(state: AgentState):
@@ -62,35 +102,107 @@ class BasicAgent:
             # print("Messages going IN:", state["messages"])
 
             # Use the AWS Bedrock Llama 405B invocation function
-            result = invoke_llm_manually(
-                messages=state["messages"],
-                tools=self.tools,
-                model_name=LLAMA_MODEL_ID,
-                temperature=0.2,
-                max_tokens=5000,
-                region_name=AWS_REGION
-            )
+            if router is not None:
+                result = router.invoke(
+                    state["messages"],
+                    tools=tools,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    region_name=region_name
+                )
+            else:
+                result = invoke_llm_manually(
+                    messages=state["messages"],
+                    tools=tools,
+                    model_name=model_id,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    region_name=region_name
+                )
 
             print("Assistant Node Result Type:", type(result))
             print("Assistant Node Result Content:", repr(result))
             # Add the message to the state
             return {"messages": [result]}
 
-        # ToolNode remains the same
-        tool_node = ToolNode(self.tools)
+        # Same node for ainvoke: awaits Bedrock instead of blocking a thread
+        async def aassistant_node(state: AgentState):
+            if router is not None:
+                result = await router.ainvoke(
+                    state["messages"],
+                    tools=tools,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    region_name=region_name
+                )
+            else:
+                result = await ainvoke_llm_manually(
+                    messages=state["messages"],
+                    tools=tools,
+                    model_name=model_id,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    region_name=region_name
+                )
+            print("Assistant Node Result Content:", repr(result))
+            return {"messages": [result]}
+
+        # Runs the tool calls of one assistant turn concurrently, in call order
+        tool_node = ParallelToolNode(tools)
+
+        def record_first_tool_result_time(state: AgentState):
+            # Only the first tools turn of a question is measured
+            if any(isinstance(msg, ToolMessage) for msg in state["messages"]):
+                return
+            question = next((msg for msg in state["messages"] if isinstance(msg, HumanMessage)), None)
+            started = self._question_started.get(question.id) if question is not None else None
+            if started:
+                record_first_tool_result(time.perf_counter() - started[0], started[1])
+
+        def tools_node(state: AgentState):
+            result = tool_node(state)
+            record_first_tool_result_time(state)
+            return result
+
+        async def atools_node(state: AgentState):
+            result = await tool_node.acall(state)
+            record_first_tool_result_time(state)
+            return result
 
         # --- Graph Definition (remains the same) ---
         builder = StateGraph(AgentState)
-        builder.add_node("assistant", assistant_node) # Use the modified node
-        builder.add_node("tools", tool_node)
+        builder.add_node("assistant", RunnableLambda(assistant_node, afunc=aassistant_node)) # Use the modified node
+        builder.add_node("tools", RunnableLambda(tools_node, afunc=atools_node))
         builder.set_entry_point("assistant")
         builder.add_conditional_edges(
             "assistant",
-            tools_condition,
+            route_after_assistant,
             {"tools": "tools", END: END}
         )
         builder.add_edge("tools", "assistant")
-        agent = builder.compile()
+        return builder.compile()
+
+    def get_graph(self):
+        """
+        Returns the compiled agent graph, building it lazily on first use.
+
+        Graphs are cached per (tool set, model config) so a question only pays for
+        `invoke`; changing `self.tools` or the model settings compiles a new graph.
+        """
+        key = self._graph_key()
+        with self._graph_lock:
+            agent = self._graph_cache.get(key)
+            if agent is None:
+                print(f"Compiling agent graph for tools: {list(key[0])}")
+                agent = self._build_graph()
+                self._graph_cache[key] = agent
+        return agent
+
+    def _initial_messages(self, question: str, task_id: str = None):
+        # Attachments and linked videos are fetched while the model plans its first turn
+        prefetched = prefetch(question, task_id)
+        message_id = str(uuid.uuid4())
+        self._question_started[message_id] = (time.perf_counter(), prefetched)
 
         # --- Invocation with task_id if provided ---
         if task_id:
@@ -98,28 +210,65 @@ class BasicAgent:
             enhanced_question = f"{question}\n\nIMPORTANT: The task_id for this question is '{task_id}'. Use this exact task_id with the file_downloader tool."
             question = enhanced_question
             
-        initial_messages = [
+        return [
             SystemMessage(content=self.system_prompt),
-            HumanMessage(content=question)
+            HumanMessage(content=question, id=message_id)
         ]
+
+    @staticmethod
+    def _log_final_state(final_state):
+        if "messages" in final_state and final_state["messages"]:
+            #  print("Final Agent State Messages:", final_state["messages"])
+            #  print("\nFinal Answer Message:", repr(final_state["messages"][-1]))
+             if final_state["messages"][-1].content:
+                 print("\nFinal Answer Content:", final_state["messages"][-1].content)
+             else:
+                 print("\nFinal Answer: (Tool call or empty content in last message)")
+        else:
+            print("Error: No messages found in the final state.")
+
+    def __call__(self, question: str, task_id: str = None) -> dict:
+        # print(f"Agent received question: {question}")
+        agent = self.get_graph()
+        initial_messages = self._initial_messages(question, task_id)
         # print("\n--- Invoking Agent ---")
         final_state = {}
         try:
             final_state = agent.invoke({"messages": initial_messages})
             # print("\n--- Agent Invocation Finished ---")
-            if "messages" in final_state and final_state["messages"]:
-                #  print("Final Agent State Messages:", final_state["messages"])
-                #  print("\nFinal Answer Message:", repr(final_state["messages"][-1]))
-                 if final_state["messages"][-1].content:
-                     print("\nFinal Answer Content:", final_state["messages"][-1].content)
-                 else:
-                     print("\nFinal Answer: (Tool call or empty content in last message)")
-            else:
-                print("Error: No messages found in the final state.")
+            self._log_final_state(final_state)
+        except CompletionCacheMiss:
+            raise
+        except Exception as e:
+            print("\n--- Agent Invocation Error ---")
+            import traceback
+            print(f"An error occurred during agent execution: {e}")
+            print(traceback.format_exc())
+        finally:
+            self._question_started.pop(initial_messages[-1].id, None)
+
+        return final_state["messages"][-1].content
+
+    async def acall(self, question: str, task_id: str = None) -> dict:
+        """
+        Async variant of __call__ using the graph's ainvoke. Bedrock and file downloads are
+        awaited and CPU-bound tools run in worker threads, so one event loop can hold
+        many questions in flight.
+        """
+        agent = self.get_graph()
+        initial_messages = self._initial_messages(question, task_id)
+        final_state = {}
+        try:
+            final_state = await agent.ainvoke({"messages": initial_messages})
+            self._log_final_state(final_state)
+        except CompletionCacheMiss:
+            raise
         except Exception as e:
             print("\n--- Agent Invocation Error ---")
             import traceback
             print(f"An error occurred during agent execution: {e}")
             print(traceback.format_exc())
+        finally:
+            self._question_started.pop(initial_messages[-1].id, None)
 
         return final_state["messages"][-1].content
\ No newline at end of file
@@ -1,19 +1,128 @@
 import os
+import sys
 import gradio as gr
 import requests
 import inspect
 import json
+import argparse
+import asyncio
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from agent import BasicAgent
+from chat_agent.completion_cache import CompletionCacheMiss, get_completion_cache
+from chat_agent import llm_backend
+from chat_agent.meta_agent import close_async_bedrock_clients
+from chat_agent import model_router
+from chat_agent.prompt_compaction import get_compaction_stats
+from chat_agent.rate_limiter import get_rate_limiter
+from chat_agent.results_journal import ResultsJournal
+from chat_agent.tool_executor import get_tool_memo_stats
+from tools.prefetch import get_prefetch_metrics
+from tools.utils.http_session import get_http_session, get_http_metrics
 
 # (Keep Constants as is)
 # --- Constants ---
 DEFAULT_API_URL = "https://agents-course-unit4-scoring.hf.space"
+DEFAULT_WORKERS = int(os.getenv("AGENT_WORKERS", "1"))
 
-def run_and_submit_all( profile: gr.OAuthProfile | None):
+def run_question(agent, item, journal=None):
+    """
+    Runs the agent on a single question.
+
+    Args:
+        journal: Optional ResultsJournal the answer is appended to as soon as it exists
+
+    Returns:
+        (answer, log_entry): answer is the payload entry, or None if the agent failed.
+    """
+    task_id = item.get("task_id")
+    question_text = item.get("question")
+    # The agent only needs the task_id when there is an attachment to fetch
+    attachment_id = task_id if item.get("file_name") else None
+    print("Question is ", item)
+    try:
+        submitted_answer = agent(question_text, attachment_id)
+        answer = {"task_id": task_id, "question": question_text, "submitted_answer": submitted_answer}
+        if journal is not None:
+            journal.append(answer)
+        return (
+            answer,
+            {"Task ID": task_id, "Question": question_text, "Submitted Answer": submitted_answer}
+        )
+    except CompletionCacheMiss:
+        # In replay mode a prompt without a cached completion ends the run
+        raise
+    except Exception as e:
+         print(f"Error running agent on task {task_id}: {e}")
+         return None, {"Task ID": task_id, "Question": question_text, "Submitted Answer": f"AGENT ERROR: {e}"}
+
+async def arun_question(agent, item, journal=None):
+    """Async variant of run_question using the agent's async path."""
+    task_id = item.get("task_id")
+    question_text = item.get("question")
+    # The agent only needs the task_id when there is an attachment to fetch
+    attachment_id = task_id if item.get("file_name") else None
+    print("Question is ", item)
+    try:
+        submitted_answer = await agent.acall(question_text, attachment_id)
+        answer = {"task_id": task_id, "question": question_text, "submitted_answer": submitted_answer}
+        if journal is not None:
+            journal.append(answer)
+        return (
+            answer,
+            {"Task ID": task_id, "Question": question_text, "Submitted Answer": submitted_answer}
+        )
+    except CompletionCacheMiss:
+        # In replay mode a prompt without a cached completion ends the run
+        raise
+    except Exception as e:
+         print(f"Error running agent on task {task_id}: {e}")
+         return None, {"Task ID": task_id, "Question": question_text, "Submitted Answer": f"AGENT ERROR: {e}"}
+
+async def run_questions_async(agent, items, workers: int, journal=None):
+    """
+    Runs the questions on one event loop with at most `workers` in flight.
+
+    Returns:
+        List of run_question results in the order of `items`.
+    """
+    semaphore = asyncio.Semaphore(workers)
+
+    async def run(item):
+        async with semaphore:
+            return await arun_question(agent, item, journal)
+
+    try:
+        return await asyncio.gather(*(run(item) for item in items))
+    finally:
+        await close_async_bedrock_clients()
+
+def run_questions(agent, items, workers: int = DEFAULT_WORKERS, use_async: bool = False, journal=None):
+    """
+    Runs the agent on every item with `workers` questions in flight.
+
+    Returns:
+        List of run_question results in the order of `items`, whichever finishes first.
+    """
+    workers = max(1, workers or 1)
+    if use_async:
+        return asyncio.run(run_questions_async(agent, items, workers, journal))
+    if workers == 1:
+        return [run_question(agent, item, journal) for item in items]
+    # map() yields in submission order, so results keep the question order
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent") as executor:
+        return list(executor.map(lambda item: run_question(agent, item, journal), items))
+
+def run_and_submit_all( profile: gr.OAuthProfile | None, workers: int = DEFAULT_WORKERS, use_async: bool = False):
     """
     Fetches all questions, runs the BasicAgent on them, submits all answers,
     and displays the results.
+
+    Args:
+        profile: The Hugging Face OAuth profile (unused while submission is disabled).
+        workers: Number of questions run concurrently. Results keep the order of
+                 the questions regardless of which task finishes first.
+        use_async: Run the questions as coroutines on one event loop instead of threads.
     """
     # --- Determine HF Space Runtime URL and Repo URL ---
     space_id = os.getenv("SPACE_ID") # Get the SPACE_ID for sending link to the code
@@ -50,7 +159,7 @@ def run_and_submit_all( profile: gr.OAuthProfile | None):
     else:
         print(f"Fetching questions from: {questions_url}")
         try:
-            response = requests.get(questions_url, timeout=15)
+            response = get_http_session().get(questions_url, timeout=15)
             response.raise_for_status()
             questions_data = response.json()
             if not questions_data:
@@ -71,42 +180,47 @@ def run_and_submit_all( profile: gr.OAuthProfile | None):
             json.dump(questions_data, json_file, indent=4)
 
     # 3. Run your Agent
-    completed_answers = []
-    if os.path.exists("output.txt"):
-        with open("output.txt", "r") as file:
-            completed_answers = json.load(file)
-    results_log = []
-    answers_payload = []
-    print(f"Running agent on {len(questions_data)} questions...")
-    # count = 0
-    for item in questions_data:
-        # if count != 2:
-        #     print(f"incrementing count {count}")
-        #     count = count + 1
-        #     continue
-        # count = count + 1
-        if item.get("task_id") in [answer["task_id"] for answer in completed_answers]:
-            print(f"Question {item['task_id']} already processed.")
-            continue
-        print("Question is ", item)
-        task_id = item.get("task_id")
-        question_text = item.get("question")
-        try:
-            submitted_answer = agent(question_text)
-            answers_payload.append({"task_id": task_id, "question": question_text, "submitted_answer": submitted_answer})
-            results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": submitted_answer})
-        except Exception as e:
-             print(f"Error running agent on task {task_id}: {e}")
-             results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": f"AGENT ERROR: {e}"})
+    # Answers are journaled as they are produced, so an interrupted run resumes where it stopped
+    with ResultsJournal() as journal:
+        results_log = []
+        new_answers = []
+        pending = []
+        for item in questions_data:
+            if item.get("task_id") in journal:
+                print(f"Question {item['task_id']} already processed.")
+                continue
+            pending.append(item)
 
-    if not answers_payload:
-        print("Agent did not produce any answers to submit.")
-        return "Agent did not produce any answers to submit.", pd.DataFrame(results_log)
+        workers = max(1, workers or 1)
+        print(f"Running agent on {len(pending)} of {len(questions_data)} questions with {workers} worker(s)...")
+        results = run_questions(agent, pending, workers, use_async, journal)
+
+        for answer, log_entry in results:
+            if answer is not None:
+                new_answers.append(answer)
+            results_log.append(log_entry)
+
+        if not new_answers:
+            print("Agent did not produce any answers to submit.")
+            return "Agent did not produce any answers to submit.", pd.DataFrame(results_log)
     
-    print("Final answer length is ", len(answers_payload))
-    with open("output.txt", "w") as file:
-        # for item in answers_payload:
-        json.dump(answers_payload, file, indent=4)
+        # Submit every journaled answer, including those from earlier runs, in question order
+        answers_payload = journal.answers([item.get("task_id") for item in questions_data])
+        print("Final answer length is ", len(answers_payload))
+        print("HTTP metrics:", get_http_metrics())
+        print("LLM completion cache:", get_completion_cache().stats())
+        print("Repeated tool calls answered from memo:", get_tool_memo_stats())
+        if agent.router is not None:
+            print("Model routing:", agent.router.stats())
+        print("LLM backends:", llm_backend.get_llm_backend_stats())
+        print("Time to first tool result:", get_prefetch_metrics())
+        # Tools are imported lazily; only report on the ones this run actually used
+        if "tools.web_search" in sys.modules:
+            print("Search cache:", sys.modules["tools.web_search"].get_cached_search().stats)
+        if "tools.board_to_fen" in sys.modules:
+            print("board_to_fen metrics:", sys.modules["tools.board_to_fen"].get_fen_metrics())
+        for stats in get_compaction_stats().values():
+            print(f"Prompt compaction for '{stats['task']}': {stats['tokens_saved']} of {stats['prompt_tokens'] + stats['tokens_saved']} tokens saved over {stats['turns']} turns")
 
     # # 4. Prepare Submission 
     # submission_data = {"username": username.strip(), "agent_code": agent_code, "answers": answers_payload}
@@ -116,7 +230,7 @@ def run_and_submit_all( profile: gr.OAuthProfile | None):
     # # 5. Submit
     # print(f"Submitting {len(answers_payload)} answers to: {submit_url}")
     # try:
-    #     response = requests.post(submit_url, json=submission_data, timeout=60)
+    #     response = get_http_session().post(submit_url, json=submission_data, timeout=60)
     #     response.raise_for_status()
     #     result_data = response.json()
     #     final_status = (
@@ -189,6 +303,43 @@ def run_and_submit_all( profile: gr.OAuthProfile | None):
 #     )
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the BasicAgent over all questions.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of questions to run concurrently (default: %(default)s)")
+    parser.add_argument("--bedrock-rpm", type=int, default=None,
+                        help="Max Bedrock calls started per minute across all workers (0 = unlimited)")
+    parser.add_argument("--preload-vosk", action="store_true",
+                        help="Load the Vosk speech model before running any question")
+    parser.add_argument("--preload-fen", action="store_true",
+                        help="Load and warm up the board_to_fen classifier before running any question")
+    parser.add_argument("--llm-cache", choices=["off", "on", "replay"], default=None,
+                        help="LLM completion cache mode; 'replay' only serves cached completions")
+    parser.add_argument("--model-routing", action="store_true",
+                        help="Start turns on the small model tier and escalate to Llama 405B by rule")
+    parser.add_argument("--llm-backends", default=None,
+                        help="Comma-separated LLM backends tried in order on throttling/5xx, e.g. 'bedrock,openai'")
+    parser.add_argument("--hedge-after", default=None,
+                        help="Send a second LLM request when the first is slower than this: 'p95' or seconds")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run questions on an asyncio event loop (async Bedrock and HTTP clients)")
+    args = parser.parse_args()
+    if args.model_routing:
+        model_router.MODEL_ROUTING = True
+    if args.llm_backends is not None:
+        llm_backend.LLM_BACKENDS = args.llm_backends
+    if args.hedge_after is not None:
+        llm_backend.LLM_HEDGE_AFTER = args.hedge_after
+    if args.bedrock_rpm is not None:
+        get_rate_limiter("bedrock", args.bedrock_rpm)
+    if args.llm_cache is not None:
+        get_completion_cache().mode = args.llm_cache
+    if args.preload_vosk:
+        from tools.transcribe_audio import preload_vosk_model
+        preload_vosk_model()
+    if args.preload_fen:
+        from tools.board_to_fen import preload_fen_model
+        preload_fen_model()
+
     print("\n" + "-"*30 + " App Starting " + "-"*30)
     # # Check for SPACE_HOST and SPACE_ID at startup for information
     # space_host_startup = os.getenv("SPACE_HOST")
@@ -211,4 +362,4 @@ if __name__ == "__main__":
 
     # print("Launching Gradio Interface for Basic Agent Evaluation...")
     # demo.launch(debug=True, share=False)
-    run_and_submit_all(profile=None)
\ No newline at end of file
+    run_and_submit_all(profile=None, workers=args.workers, use_async=args.use_async)
\ No newline at end of file
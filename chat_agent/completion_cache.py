@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# off: never cache, on: read and write the cache, replay: only serve cached completions
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "off").lower()
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_completions.sqlite"))
+# Seconds a completion stays valid (0 = never expires)
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "0"))
+# Max completions kept; the least recently used ones are dropped beyond this
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+
+class CompletionCacheMiss(LookupError):
+    """Raised in replay mode when a prompt has no cached completion."""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Strip surrounding and trailing-line whitespace so cosmetic differences share a key."""
+    return "\n".join(line.rstrip() for line in prompt.strip().splitlines())
+
+
+def completion_key(model_id: str, prompt: str, temperature: float, max_gen_len: int,
+                   stream: bool = False) -> str:
+    """
+    Hash of (model_id, normalized prompt, temperature, max_gen_len).
+
+    Streamed completions stop at the first tool call or final answer, so they are
+    keyed apart from full ones (`stream`) and never served to a non-streamed call.
+    """
+    key = [model_id, normalize_prompt(prompt), temperature, max_gen_len]
+    if stream:
+        key.append("stream")
+    payload = json.dumps(key)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    SQLite-backed store of LLM completions.
+
+    One connection is shared by all threads behind a lock; entries older than `ttl`
+    are treated as misses and the table is trimmed to `max_entries` by last use.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, mode: str = LLM_CACHE_MODE,
+                 ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        if mode not in ("off", "on", "replay"):
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, model_id TEXT, completion TEXT, "
+                "created_at REAL, last_used REAL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str):
+        """Return the cached completion for `key`, or None (raises CompletionCacheMiss in replay mode)."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT completion, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            if row is not None:
+                conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+        if self.mode == "replay":
+            raise CompletionCacheMiss(f"No cached completion for prompt key {key} (replay mode)")
+        return None
+
+    def put(self, key: str, model_id: str, completion: str):
+        """Store a completion; no-op unless the cache mode is 'on'."""
+        if self.mode != "on":
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model_id, completion, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model_id, completion, now, now)
+            )
+            if self.max_entries:
+                conn.execute(
+                    "DELETE FROM completions WHERE key NOT IN "
+                    "(SELECT key FROM completions ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+            conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mode": self.mode, "hits": self.hits, "misses": self.misses}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_completion_cache() -> CompletionCache:
+    """Return the process-wide completion cache configured from the LLM_CACHE_* environment."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CompletionCache()
+    return _cache
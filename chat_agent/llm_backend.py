@@ -0,0 +1,437 @@
+import asyncio
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from botocore.exceptions import ClientError, ConnectionError as BotocoreConnectionError
+from requests.adapters import HTTPAdapter
+
+from chat_agent.completion_cache import completion_key, get_completion_cache
+from chat_agent.prompt_builder import build_preamble, render_message
+from tools.utils.histogram import Histogram
+from tools.utils.http_session import DEFAULT_TIMEOUT, HTTP_POOL_MAXSIZE
+
+# Backends tried in order, comma-separated: "bedrock", "openai" (e.g. LLM_BACKENDS=bedrock,openai)
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "bedrock")
+# OpenAI-compatible /chat/completions endpoint (vLLM, llama.cpp server, Together, OpenRouter...)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "http://localhost:8000/v1")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+# Model sent to the OpenAI-compatible backend; empty passes the Bedrock model ID through
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "")
+# Send a second request when the first is slower than this: empty disables hedging,
+# "p95" (or any "pNN") uses that quantile of recent latencies, a number is a fixed delay in seconds
+LLM_HEDGE_AFTER = os.getenv("LLM_HEDGE_AFTER", "")
+# Latencies needed before a quantile threshold is trusted, and how many recent ones are kept
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = 200
+LLM_HEDGE_MAX_WORKERS = int(os.getenv("LLM_HEDGE_MAX_WORKERS", "16"))
+
+# Bedrock error codes that mean "try again elsewhere" rather than "this request is wrong"
+_RETRYABLE_BEDROCK_CODES = {
+    "ThrottlingException", "ServiceUnavailableException", "InternalServerException",
+    "ModelNotReadyException", "ModelTimeoutException", "TooManyRequestsException",
+}
+_QUANTILE_RE = re.compile(r"p(\d{1,2})$", re.IGNORECASE)
+
+
+class LLMBackendError(Exception):
+    """An LLM provider answered with an HTTP error."""
+
+    def __init__(self, backend: str, status: int, message: str):
+        super().__init__(f"{backend} returned HTTP {status}: {message[:300]}")
+        self.status = status
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for throttling, 5xx and connection errors, which another attempt may not hit."""
+    if isinstance(error, LLMBackendError):
+        return error.status == 429 or error.status >= 500
+    if isinstance(error, ClientError):
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return error.response.get("Error", {}).get("Code") in _RETRYABLE_BEDROCK_CODES or status == 429 or status >= 500
+    if isinstance(error, (BotocoreConnectionError, requests.ConnectionError, requests.Timeout)):
+        return True
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+class LLMBackend:
+    """
+    One LLM provider. generate() returns the raw generation for the conversation,
+    in the text tool-call format _build_ai_message() parses.
+    """
+
+    name = "backend"
+
+    def generate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        raise NotImplementedError
+
+    async def agenerate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        raise NotImplementedError
+
+
+class BedrockBackend(LLMBackend):
+    """AWS Bedrock invoke_model with the Llama prompt, through the shared pooled clients."""
+
+    name = "bedrock"
+
+    def __init__(self, region_name="us-east-2", aws_access_key_id=None, aws_secret_access_key=None,
+                 aws_session_token=None, client=None):
+        """
+        Args:
+            client: A boto3 bedrock-runtime client to use instead of the shared one
+        """
+        self.credentials = dict(region_name=region_name, aws_access_key_id=aws_access_key_id,
+                                aws_secret_access_key=aws_secret_access_key, aws_session_token=aws_session_token)
+        self.client = client
+
+    def generate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        # Imported here because chat_agent.meta_agent imports this module
+        from chat_agent.meta_agent import get_bedrock_client, invoke_bedrock_directly
+        client = self.client or get_bedrock_client(**self.credentials)
+        return invoke_bedrock_directly(client=client, model_id=model_id, messages=messages, temperature=temperature,
+                                       max_tokens=max_tokens, tools=tools, stream=stream)
+
+    async def agenerate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        from chat_agent.meta_agent import ainvoke_bedrock_directly, get_async_bedrock_client
+        client = await get_async_bedrock_client(**self.credentials)
+        return await ainvoke_bedrock_directly(client=client, model_id=model_id, messages=messages,
+                                              temperature=temperature, max_tokens=max_tokens, tools=tools,
+                                              stream=stream)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    POST {base_url}/chat/completions with the system prompt and tool instructions as the
+    system message and the conversation as user/assistant messages.
+
+    Tool calls use the same <tool_call> text format as the Bedrock prompt, so any chat
+    model can drive the tools without native function calling. Streaming is not used.
+    """
+
+    name = "openai"
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: str = OPENAI_API_KEY, model: str = OPENAI_MODEL):
+        self.endpoint = f"{base_url.rstrip('/')}/chat/completions"
+        self.model = model
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        # Not the shared scoring-space session: it retries 429/5xx itself, which would hold
+        # a throttled request here instead of failing over
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=HTTP_POOL_MAXSIZE)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def _payload(self, model_id, messages, temperature, max_tokens, tools):
+        chat = []
+        preamble = build_preamble(messages, tools)
+        if preamble:
+            chat.append({"role": "system", "content": preamble})
+        for msg in messages:
+            chat.extend({"role": entry["role"], "content": entry["content"]} for entry in render_message(msg))
+        return {"model": self.model or model_id, "messages": chat, "temperature": temperature, "max_tokens": max_tokens}
+
+    def _cache_key(self, payload):
+        if not get_completion_cache().enabled:
+            return None
+        prompt = json.dumps(payload["messages"], ensure_ascii=False)
+        return completion_key(f"{self.name}:{payload['model']}", prompt, payload["temperature"], payload["max_tokens"])
+
+    def _parse(self, status: int, text: str) -> str:
+        if status != 200:
+            raise LLMBackendError(self.name, status, text)
+        response_json = json.loads(text)
+        if not response_json.get("choices"):
+            raise ValueError(f"Invalid response format: 'choices' field missing: {text[:300]}")
+        content = response_json["choices"][0].get("message", {}).get("content")
+        if not isinstance(content, str):
+            raise ValueError(f"Invalid response format: no text content: {text[:300]}")
+        return content
+
+    def generate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        payload = self._payload(model_id, messages, temperature, max_tokens, tools)
+        cache_key = self._cache_key(payload)
+        if cache_key is not None and (cached := get_completion_cache().get(cache_key)) is not None:
+            print(f"--- Completion cache hit ({cache_key[:12]}) ---")
+            return cached
+        response = self._session.post(self.endpoint, headers=self.headers, json=payload,
+                                      timeout=(DEFAULT_TIMEOUT[0], 300))
+        generated = self._parse(response.status_code, response.text)
+        if cache_key is not None:
+            get_completion_cache().put(cache_key, payload["model"], generated)
+        return generated
+
+    async def agenerate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        from tools.utils.http_session import get_async_http_client
+        payload = self._payload(model_id, messages, temperature, max_tokens, tools)
+        cache_key = self._cache_key(payload)
+        if cache_key is not None and (cached := get_completion_cache().get(cache_key)) is not None:
+            print(f"--- Completion cache hit ({cache_key[:12]}) ---")
+            return cached
+        response = await get_async_http_client().post(self.endpoint, headers=self.headers, json=payload, timeout=300)
+        generated = self._parse(response.status_code, response.text)
+        if cache_key is not None:
+            get_completion_cache().put(cache_key, payload["model"], generated)
+        return generated
+
+
+def parse_hedge_after(value: str):
+    """Return None (no hedging), ("quantile", q) or ("fixed", seconds) for an LLM_HEDGE_AFTER value."""
+    value = (value or "").strip()
+    if not value or value == "0":
+        return None
+    if match := _QUANTILE_RE.match(value):
+        return ("quantile", int(match.group(1)) / 100)
+    return ("fixed", float(value))
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LLM_HEDGE_MAX_WORKERS, thread_name_prefix="llm-hedge")
+    return _executor
+
+
+class FailoverBackend(LLMBackend):
+    """
+    Tries its backends in order, moving to the next one when a call fails with a
+    throttling, 5xx or connection error; other errors are raised immediately.
+
+    With hedging on, a call still running after the hedge delay gets a second request
+    (to the next backend, or the same one if there is no other) and whichever answers
+    first wins. At most one hedge is sent per call, so hedging at p95 costs about 5% more
+    requests. The delay is a fixed number of seconds or a quantile of the latencies of the
+    backend being hedged; a quantile only applies once HEDGE_MIN_SAMPLES calls succeeded.
+    """
+
+    def __init__(self, backends, hedge_after: str = ""):
+        """
+        Args:
+            backends: LLMBackends in failover order
+            hedge_after: An LLM_HEDGE_AFTER value ("" for no hedging, "p95", or seconds)
+        """
+        if not backends:
+            raise ValueError("FailoverBackend needs at least one backend")
+        self.backends = list(backends)
+        self.name = "+".join(backend.name for backend in self.backends)
+        self.hedge = parse_hedge_after(hedge_after)
+        self._lock = threading.Lock()
+        self._recent = {index: deque(maxlen=HEDGE_WINDOW) for index in range(len(self.backends))}
+        self._stats = {
+            index: {"backend": backend.name, "calls": 0, "errors": 0, "failovers": 0, "hedges": 0, "hedge_wins": 0,
+                    "latency": Histogram([0.5, 1, 2, 5, 10, 20, 40, 80])}
+            for index, backend in enumerate(self.backends)
+        }
+
+    def hedge_delay(self, index: int):
+        """Seconds after which a call to backend `index` is hedged, or None."""
+        if self.hedge is None:
+            return None
+        kind, value = self.hedge
+        if kind == "fixed":
+            return value
+        with self._lock:
+            recent = sorted(self._recent[index])
+        if len(recent) < HEDGE_MIN_SAMPLES:
+            return None
+        return recent[min(len(recent) - 1, int(value * len(recent)))]
+
+    def _next_index(self, index: int) -> int:
+        return min(index + 1, len(self.backends) - 1)
+
+    def _count(self, index: int, key: str):
+        with self._lock:
+            self._stats[index][key] += 1
+
+    def _succeeded(self, index: int, seconds: float, hedge: bool):
+        with self._lock:
+            self._stats[index]["calls"] += 1
+            self._stats[index]["hedge_wins"] += hedge
+            self._recent[index].append(seconds)
+        self._stats[index]["latency"].observe(seconds)
+
+    def _failed(self, index: int, error: Exception) -> bool:
+        """Record a failed attempt; True if the error allows failing over."""
+        self._count(index, "errors")
+        print(f"--- LLM backend {self.backends[index].name} failed: {error} ---")
+        return is_retryable(error)
+
+    def _can_fail_over(self, index: int, error: Exception) -> bool:
+        if not self._failed(index, error) or index == len(self.backends) - 1:
+            return False
+        print(f"--- Failing over from {self.backends[index].name} to {self.backends[index + 1].name} ---")
+        self._count(index, "failovers")
+        return True
+
+    def _attempt(self, index: int, hedge: bool, args):
+        """Run one request; returns (index, hedge, seconds, generation, error)."""
+        start = time.perf_counter()
+        try:
+            generated = self.backends[index].generate(*args)
+        except Exception as e:
+            return index, hedge, time.perf_counter() - start, None, e
+        return index, hedge, time.perf_counter() - start, generated, None
+
+    async def _aattempt(self, index: int, hedge: bool, args):
+        start = time.perf_counter()
+        try:
+            generated = await self.backends[index].agenerate(*args)
+        except Exception as e:
+            return index, hedge, time.perf_counter() - start, None, e
+        return index, hedge, time.perf_counter() - start, generated, None
+
+    def _start_hedge(self, index: int, delay: float) -> int:
+        target = self._next_index(index)
+        print(f"--- LLM call to {self.backends[index].name} slower than {delay:.1f}s; "
+              f"hedging with {self.backends[target].name} ---")
+        self._count(index, "hedges")
+        return target
+
+    def _settle(self, results):
+        """
+        Handle finished attempts, successes first.
+
+        Returns:
+            (generation, None) for a success, else (None, (index, error)) of the last failure.
+        """
+        failure = None
+        for index, hedge, seconds, generated, error in sorted(results, key=lambda result: result[4] is not None):
+            if error is None:
+                self._succeeded(index, seconds, hedge)
+                return generated, None
+            failure = (index, error)
+        return None, failure
+
+    def generate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        args = (model_id, messages, temperature, max_tokens, tools, stream)
+        if self.hedge is None:
+            for index in range(len(self.backends)):
+                generated, failure = self._settle([self._attempt(index, False, args)])
+                if failure is None:
+                    return generated
+                if not self._can_fail_over(*failure):
+                    raise failure[1]
+
+        executor = _get_executor()
+        # `started` is the furthest backend a request went to; failover continues after it
+        started, hedged = 0, False
+        pending = {executor.submit(self._attempt, 0, False, args)}
+        while True:
+            delay = None if hedged else self.hedge_delay(started)
+            done, pending = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = True
+                started = self._start_hedge(started, delay)
+                pending.add(executor.submit(self._attempt, started, True, args))
+                continue
+            generated, failure = self._settle([future.result() for future in done])
+            if failure is None:
+                # The losing request cannot be interrupted; its result is discarded
+                return generated
+            if pending:
+                self._failed(*failure)
+                continue
+            if not self._can_fail_over(started, failure[1]):
+                raise failure[1]
+            started, hedged = started + 1, False
+            pending = {executor.submit(self._attempt, started, False, args)}
+
+    async def agenerate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False) -> str:
+        """Async variant of generate(); the losing request of a hedge is cancelled."""
+        args = (model_id, messages, temperature, max_tokens, tools, stream)
+        if self.hedge is None:
+            for index in range(len(self.backends)):
+                generated, failure = self._settle([await self._aattempt(index, False, args)])
+                if failure is None:
+                    return generated
+                if not self._can_fail_over(*failure):
+                    raise failure[1]
+
+        started, hedged = 0, False
+        pending = {asyncio.ensure_future(self._aattempt(0, False, args))}
+        try:
+            while True:
+                delay = None if hedged else self.hedge_delay(started)
+                done, pending = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    started = self._start_hedge(started, delay)
+                    pending.add(asyncio.ensure_future(self._aattempt(started, True, args)))
+                    continue
+                generated, failure = self._settle([task.result() for task in done])
+                if failure is None:
+                    return generated
+                if pending:
+                    self._failed(*failure)
+                    continue
+                if not self._can_fail_over(started, failure[1]):
+                    raise failure[1]
+                started, hedged = started + 1, False
+                pending = {asyncio.ensure_future(self._aattempt(started, False, args))}
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Calls, errors, failovers, hedges sent and won, and latency histogram per backend."""
+        with self._lock:
+            return {
+                stats["backend"]: {**{key: value for key, value in stats.items() if key not in ("backend", "latency")},
+                                   "latency_seconds": stats["latency"].snapshot()}
+                for stats in self._stats.values()
+            }
+
+
+def create_backend(name: str, **bedrock_options) -> LLMBackend:
+    """Return the backend called `name` in LLM_BACKENDS ("bedrock" or "openai")."""
+    if name == "bedrock":
+        return BedrockBackend(**bedrock_options)
+    if name == "openai":
+        return OpenAICompatibleBackend(OPENAI_BASE_URL, OPENAI_API_KEY, OPENAI_MODEL)
+    raise ValueError(f"Unknown LLM backend '{name}' (expected 'bedrock' or 'openai')")
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+def get_llm_backend(region_name="us-east-2", aws_access_key_id=None, aws_secret_access_key=None,
+                    aws_session_token=None) -> FailoverBackend:
+    """
+    Return the process-wide FailoverBackend over LLM_BACKENDS for these AWS settings.
+
+    Args:
+        region_name / aws_*: Passed to the Bedrock backend, if it is one of LLM_BACKENDS
+    """
+    key = (region_name, aws_access_key_id, aws_secret_access_key, aws_session_token)
+    backend = _backends.get(key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(key)
+            if backend is None:
+                names = [name.strip().lower() for name in LLM_BACKENDS.split(",") if name.strip()]
+                backend = FailoverBackend([
+                    create_backend(name, region_name=region_name, aws_access_key_id=aws_access_key_id,
+                                   aws_secret_access_key=aws_secret_access_key, aws_session_token=aws_session_token)
+                    for name in names
+                ], hedge_after=LLM_HEDGE_AFTER)
+                _backends[key] = backend
+    return backend
+
+
+def get_llm_backend_stats() -> dict:
+    """FailoverBackend.stats() for every backend chain created in this process."""
+    with _backends_lock:
+        return {backend.name: backend.stats() for backend in _backends.values()}
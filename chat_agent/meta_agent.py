@@ -1,7 +1,16 @@
+import asyncio
 import json
+import os
+import threading
 import boto3
 from botocore.config import Config
 
+from chat_agent.completion_cache import CompletionCacheMiss, completion_key, get_completion_cache
+from chat_agent.llm_backend import get_llm_backend
+from chat_agent.prompt_builder import get_prompt_builder
+from chat_agent.prompt_compaction import estimate_tokens, record_compaction
+from chat_agent.rate_limiter import get_rate_limiter
+
 from langchain_core.messages import (
     AnyMessage, AIMessage, HumanMessage, SystemMessage, ToolMessage, BaseMessage
 )
@@ -10,124 +19,272 @@ from typing import TypedDict, Annotated, List, Dict, Any, Sequence, Optional
 
 # ToolCall is needed for constructing the AIMessage with tool calls
 from langchain_core.messages import ToolCall
+from langchain_core.messages.tool import invalid_tool_call
+from chat_agent.tool_call_parser import parse_tool_calls
 
 # We'll use direct Bedrock API calls instead of BedrockLLM
 
 # --- AWS Bedrock Configuration ---
-def get_bedrock_client(region_name="us-east-2", 
-                      aws_access_key_id=None,
-                      aws_secret_access_key=None,
-                      aws_session_token=None):
-    """
-    Create and return a boto3 Bedrock client with the specified configuration.
-    """
+# Max HTTP connections kept alive per client; raise it when many questions run concurrently
+BEDROCK_MAX_POOL_CONNECTIONS = int(os.getenv("BEDROCK_MAX_POOL_CONNECTIONS", "10"))
+# Max Bedrock invocations started per minute across all threads (0 disables the limit)
+BEDROCK_MAX_CALLS_PER_MINUTE = int(os.getenv("BEDROCK_MAX_CALLS_PER_MINUTE", "0"))
+get_rate_limiter("bedrock", BEDROCK_MAX_CALLS_PER_MINUTE)
+# Stream generations and stop at the first complete tool call / FINAL ANSWER line
+BEDROCK_STREAMING = os.getenv("BEDROCK_STREAMING", "0").lower() in ("1", "true", "yes")
+
+# Process-wide registry of Bedrock clients keyed by region/credentials/pool size.
+# boto3 clients are thread-safe, so one client (and its connection pool) is shared
+# by every turn of every ReAct loop instead of being rebuilt per call.
+_bedrock_clients = {}
+_bedrock_clients_lock = threading.Lock()
+
+def _create_bedrock_client(region_name, aws_access_key_id, aws_secret_access_key,
+                           aws_session_token, max_pool_connections):
+    config = Config(
+        region_name=region_name,
+        signature_version="v4",
+        retries={"max_attempts": 3, "mode": "standard"},
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=True
+    )
+
     # If credentials are provided, use them directly
     if aws_access_key_id and aws_secret_access_key:
-        return boto3.client(
-            'bedrock-runtime',
+        session = boto3.Session(
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
             aws_session_token=aws_session_token,
             region_name=region_name
         )
-    
-    # Otherwise, use the default credentials from the environment or config
-    config = Config(
+    else:
+        # Otherwise, use the default credentials from the environment or config
+        session = boto3.Session()
+    return session.client("bedrock-runtime", config=config)
+
+def get_bedrock_client(region_name="us-east-2", 
+                      aws_access_key_id=None,
+                      aws_secret_access_key=None,
+                      aws_session_token=None,
+                      max_pool_connections=None):
+    """
+    Return a shared boto3 Bedrock client for the given region and credentials.
+
+    The client is created on first use and reused by later calls with the same
+    region, credentials and pool size, so credential resolution, endpoint loading
+    and TLS connection setup are only paid once per process.
+    """
+    if max_pool_connections is None:
+        max_pool_connections = BEDROCK_MAX_POOL_CONNECTIONS
+    key = (region_name, aws_access_key_id, aws_secret_access_key, aws_session_token, max_pool_connections)
+
+    client = _bedrock_clients.get(key)
+    if client is not None:
+        return client
+
+    with _bedrock_clients_lock:
+        client = _bedrock_clients.get(key)
+        if client is None:
+            client = _create_bedrock_client(
+                region_name, aws_access_key_id, aws_secret_access_key,
+                aws_session_token, max_pool_connections
+            )
+            _bedrock_clients[key] = client
+    return client
+
+def clear_bedrock_clients():
+    """Drop all cached Bedrock clients, e.g. after rotating credentials."""
+    with _bedrock_clients_lock:
+        _bedrock_clients.clear()
+
+# Async clients are bound to the event loop that created them, so they are kept per loop
+_async_bedrock_clients = {}
+
+async def get_async_bedrock_client(region_name="us-east-2",
+                                   aws_access_key_id=None,
+                                   aws_secret_access_key=None,
+                                   aws_session_token=None,
+                                   max_pool_connections=None):
+    """
+    Return a shared aiobotocore Bedrock client for the running event loop.
+
+    Like get_bedrock_client(), the client is created once per region, credentials and
+    pool size, and its connections are reused by every coroutine on the loop.
+    """
+    if max_pool_connections is None:
+        max_pool_connections = BEDROCK_MAX_POOL_CONNECTIONS
+    loop = asyncio.get_running_loop()
+    key = (loop, region_name, aws_access_key_id, aws_secret_access_key, aws_session_token, max_pool_connections)
+    entry = _async_bedrock_clients.get(key)
+    if entry is None:
+        # Store the pending creation so concurrent coroutines share one client
+        entry = loop.create_task(_create_async_bedrock_client(
+            region_name, aws_access_key_id, aws_secret_access_key,
+            aws_session_token, max_pool_connections
+        ))
+        _async_bedrock_clients[key] = entry
+    try:
+        return await asyncio.shield(entry)
+    except Exception:
+        _async_bedrock_clients.pop(key, None)
+        raise
+
+async def _create_async_bedrock_client(region_name, aws_access_key_id, aws_secret_access_key,
+                                       aws_session_token, max_pool_connections):
+    # aiobotocore is only needed by the async agent path
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+
+    config = AioConfig(
         region_name=region_name,
         signature_version="v4",
-        retries={"max_attempts": 3, "mode": "standard"}
+        retries={"max_attempts": 3, "mode": "standard"},
+        max_pool_connections=max_pool_connections
     )
-    
-    session = boto3.Session()
-    return session.client("bedrock-runtime", config=config)
+    credentials = {}
+    if aws_access_key_id and aws_secret_access_key:
+        credentials = {
+            "aws_access_key_id": aws_access_key_id,
+            "aws_secret_access_key": aws_secret_access_key,
+            "aws_session_token": aws_session_token
+        }
+    context = get_session().create_client("bedrock-runtime", config=config, **credentials)
+    client = await context.__aenter__()
+    client._context = context
+    return client
+
+async def close_async_bedrock_clients():
+    """Close the async Bedrock clients created on the running event loop."""
+    loop = asyncio.get_running_loop()
+    for key in [key for key in _async_bedrock_clients if key[0] is loop]:
+        entry = _async_bedrock_clients.pop(key)
+        if entry.done() and not entry.exception():
+            client = entry.result()
+            await client._context.__aexit__(None, None, None)
+
+# --- Streaming Bedrock API Call Function ---
+TOOL_CALL_END = "</tool_call>"
+FINAL_ANSWER_MARKER = "FINAL ANSWER:"
+
+def _find_stop_index(text, scan_from, final_answer_at=-1):
+    """
+    Look for a point where generation can stop in the text added since `scan_from`.
+
+    Generation stops right after the first complete </tool_call>, or at the end of the
+    line containing FINAL ANSWER: once that line is terminated.
+
+    Returns:
+        (stop_index, final_answer_at): stop_index is None if generation should go on;
+        final_answer_at remembers where FINAL ANSWER: was seen for the next call.
+    """
+    end_tag = text.find(TOOL_CALL_END, max(0, scan_from - len(TOOL_CALL_END)))
+    if end_tag != -1:
+        return end_tag + len(TOOL_CALL_END), final_answer_at
+    if final_answer_at == -1:
+        final_answer_at = text.find(FINAL_ANSWER_MARKER, max(0, scan_from - len(FINAL_ANSWER_MARKER)))
+    if final_answer_at != -1:
+        line_end = text.find("\n", max(final_answer_at, scan_from))
+        if line_end != -1:
+            return line_end, final_answer_at
+    return None, final_answer_at
+
+def invoke_bedrock_streaming(client, model_id, body):
+    """
+    Calls invoke_model_with_response_stream and returns the generated text as soon as
+    it contains a complete tool call or FINAL ANSWER line.
+
+    Closing the stream early stops reading the rest of the generation, which cuts both
+    latency and the output tokens consumed.
+    """
+    get_rate_limiter("bedrock").acquire()
+    response = client.invoke_model_with_response_stream(
+        modelId=model_id,
+        body=body
+    )
+    event_stream = response.get('body')
+
+    text = ""
+    final_answer_at = -1
+    stop_reason = None
+    try:
+        for event in event_stream:
+            chunk = event.get('chunk')
+            if not chunk:
+                # Modeled exceptions arrive as events, e.g. throttlingException
+                error = next(iter(event), "unknown")
+                raise RuntimeError(f"Bedrock stream error: {error}: {event[error]}")
+            payload = json.loads(chunk.get('bytes'))
+            piece = payload.get("generation", payload.get("completion", "")) or ""
+            if piece:
+                scan_from = len(text)
+                text += piece
+                stop_index, final_answer_at = _find_stop_index(text, scan_from, final_answer_at)
+                if stop_index is not None:
+                    text = text[:stop_index]
+                    stop_reason = "early_stop"
+                    break
+            if payload.get("stop_reason"):
+                stop_reason = payload["stop_reason"]
+    finally:
+        if stop_reason == "early_stop" and hasattr(event_stream, "close"):
+            event_stream.close()
+
+    print(f"--- Bedrock stream finished ({stop_reason}) after {len(text)} characters ---")
+    return text
+
+async def ainvoke_bedrock_streaming(client, model_id, body):
+    """Async variant of invoke_bedrock_streaming() for an aiobotocore client."""
+    await get_rate_limiter("bedrock").acquire_async()
+    response = await client.invoke_model_with_response_stream(
+        modelId=model_id,
+        body=body
+    )
+    event_stream = response.get('body')
+
+    text = ""
+    final_answer_at = -1
+    stop_reason = None
+    try:
+        async for event in event_stream:
+            chunk = event.get('chunk')
+            if not chunk:
+                error = next(iter(event), "unknown")
+                raise RuntimeError(f"Bedrock stream error: {error}: {event[error]}")
+            payload = json.loads(chunk.get('bytes'))
+            piece = payload.get("generation", payload.get("completion", "")) or ""
+            if piece:
+                scan_from = len(text)
+                text += piece
+                stop_index, final_answer_at = _find_stop_index(text, scan_from, final_answer_at)
+                if stop_index is not None:
+                    text = text[:stop_index]
+                    stop_reason = "early_stop"
+                    break
+            if payload.get("stop_reason"):
+                stop_reason = payload["stop_reason"]
+    finally:
+        if stop_reason == "early_stop":
+            event_stream.close()
+
+    print(f"--- Bedrock stream finished ({stop_reason}) after {len(text)} characters ---")
+    return text
 
 # --- Direct Bedrock API Call Function ---
-def invoke_bedrock_directly(client, model_id, messages, temperature=0.2, max_tokens=5000, tools=None):
+def _prepare_request(model_id, messages, temperature, max_tokens, tools, stream=False):
     """
-    Makes a direct API call to AWS Bedrock without using the LangChain wrapper.
-    
-    Args:
-        client: The boto3 Bedrock client
-        model_id: The Bedrock model ID to use
-        messages: List of message objects
-        temperature: Temperature for generation
-        max_tokens: Maximum number of tokens to generate
-        tools: List of tools available for the model to use
+    Build the Llama request body and look it up in the completion cache.
+
+    Returns:
+        (body, cache_key, cached): cache_key is None when the cache is off;
+        cached is the stored completion on a cache hit, None otherwise.
     """
-    # Build the system prompt with tool descriptions
-    system_parts = []
-    system_message = None
-    
-    # Extract system message if present
-    for msg in messages:
-        if isinstance(msg, SystemMessage):
-            system_message = msg.content
-            break
-    
-    if system_message:
-        system_parts.append(system_message)
-    
-    # Add tool descriptions to system prompt if tools are provided
-    if tools:
-        tools_section = ["\n\nAVAILABLE TOOLS:", "When you need to use a tool, use the following format:",
-                        "<tool_call>", "name=<tool_name>", "args={\"arg1\": \"value1\", \"arg2\": \"value2\"}", "</tool_call>",
-                        "The available tools are:"]
-        
-        for tool in tools:
-            try:
-                if hasattr(tool, 'name') and hasattr(tool, 'description'):
-                    tool_name = tool.name
-                    tool_desc = tool.description
-                elif callable(tool):
-                    tool_name = getattr(tool, '__name__', 'tool')
-                    tool_desc = getattr(tool, '__doc__', f'A function called {tool_name}')
-                else:
-                    continue
-                    
-                tools_section.append(f"- {tool_name}: {tool_desc}")
-            except Exception as e:
-                print(f"Error processing tool {tool}: {e}")
-                continue
-        
-        system_parts.append("\n".join(tools_section))
-    
-    # Build conversation in the format Llama expects
-    conversation = []
-    for msg in messages:
-        if isinstance(msg, SystemMessage):
-            continue  # Already handled in system_parts
-        elif isinstance(msg, HumanMessage):
-            conversation.append({"role": "user", "content": msg.content})
-        elif isinstance(msg, AIMessage):
-            if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                # Handle tool calls in the assistant's message
-                for tool_call in msg.tool_calls:
-                    tool_name = tool_call['name']
-                    tool_args = tool_call['args']
-                    tool_call_str = f"<tool_call>\nname={tool_name}\nargs={tool_args}\n</tool_call>"
-                    conversation.append({"role": "assistant", "content": tool_call_str})
-            else:
-                conversation.append({"role": "assistant", "content": msg.content})
-        elif isinstance(msg, ToolMessage):
-            # Format tool messages with the result
-            conversation.append({"role": "user", "content": f"<tool_result>\n{msg.content}\n</tool_result>"})
-    
-    # Combine system parts with the conversation
-    full_system_prompt = "\n\n".join(system_parts)
-    
-    # Format the final prompt
-    prompt_parts = [full_system_prompt]
-    for msg in conversation:
-        if msg["role"] == "user":
-            prompt_parts.append(f"User: {msg['content']}")
-        else:
-            prompt_parts.append(f"Assistant: {msg['content']}")
-    
-    # Add assistant's turn
-    prompt_parts.append("Assistant:")
-    
-    # Join all parts to form the final prompt
-    final_prompt = "\n\n".join(prompt_parts)
+    # Build the prompt incrementally: the system+tools preamble is cached per tool set
+    # and only messages added since the previous turn are rendered
+    builder = get_prompt_builder(messages, tools)
+    final_prompt, tokens_saved = builder.build(messages)
+    if tokens_saved:
+        print(f"--- Compacted old tool results, saved ~{tokens_saved} prompt tokens ---")
+    record_compaction(builder.task_key, estimate_tokens(final_prompt), tokens_saved)
     
     # Prepare the request body for Llama model
     request_body = {
@@ -143,11 +300,57 @@ def invoke_bedrock_directly(client, model_id, messages, temperature=0.2, max_tok
     # Convert to JSON string
     body = json.dumps(request_body)
 
+    # Serve repeated prompts from the completion cache when it is enabled
+    cache = get_completion_cache()
+    cache_key = None
+    cached = None
+    if cache.enabled:
+        cache_key = completion_key(model_id, request_body["prompt"], temperature, max_tokens, stream=stream)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            print(f"--- Completion cache hit ({cache_key[:12]}) ---")
+    return body, cache_key, cached
+
+def _extract_generation(response_body):
+    # Extract the generated text
+    if "generation" in response_body:
+        return response_body["generation"]
+    elif "completion" in response_body:
+        return response_body["completion"]
+    else:
+        raise ValueError(f"Unexpected response format: {response_body}")
+
+def invoke_bedrock_directly(client, model_id, messages, temperature=0.2, max_tokens=5000, tools=None,
+                            stream=BEDROCK_STREAMING):
+    """
+    Makes a direct API call to AWS Bedrock without using the LangChain wrapper.
+    
+    Args:
+        client: The boto3 Bedrock client
+        model_id: The Bedrock model ID to use
+        messages: List of message objects
+        temperature: Temperature for generation
+        max_tokens: Maximum number of tokens to generate
+        tools: List of tools available for the model to use
+        stream: Use invoke_model_with_response_stream and stop at the first complete
+                tool call or FINAL ANSWER line
+    """
+    body, cache_key, cached = _prepare_request(model_id, messages, temperature, max_tokens, tools, stream)
+    if cached is not None:
+        return cached
+
+    if stream:
+        generated = invoke_bedrock_streaming(client, model_id, body)
+        if cache_key is not None:
+            get_completion_cache().put(cache_key, model_id, generated)
+        return generated
+
     success = False
     attempts = 0
 
     while not success and attempts < 2:
-        # Make the API call
+        # Make the API call, respecting the process-wide Bedrock rate limit
+        get_rate_limiter("bedrock").acquire()
         response = client.invoke_model(
             modelId=model_id,
             body=body
@@ -163,13 +366,95 @@ def invoke_bedrock_directly(client, model_id, messages, temperature=0.2, max_tok
             print(f"Invalid response format: {response_body}")
             attempts += 1
     
-    # Extract the generated text
-    if "generation" in response_body:
-        return response_body["generation"]
-    elif "completion" in response_body:
-        return response_body["completion"]
-    else:
-        raise ValueError(f"Unexpected response format: {response_body}")
+    generated = _extract_generation(response_body)
+    if cache_key is not None and success:
+        get_completion_cache().put(cache_key, model_id, generated)
+    return generated
+
+async def ainvoke_bedrock_directly(client, model_id, messages, temperature=0.2, max_tokens=5000, tools=None,
+                                   stream=BEDROCK_STREAMING):
+    """
+    Async variant of invoke_bedrock_directly() for an aiobotocore Bedrock client.
+    """
+    body, cache_key, cached = _prepare_request(model_id, messages, temperature, max_tokens, tools, stream)
+    if cached is not None:
+        return cached
+
+    if stream:
+        generated = await ainvoke_bedrock_streaming(client, model_id, body)
+        if cache_key is not None:
+            get_completion_cache().put(cache_key, model_id, generated)
+        return generated
+
+    success = False
+    attempts = 0
+
+    while not success and attempts < 2:
+        await get_rate_limiter("bedrock").acquire_async()
+        response = await client.invoke_model(
+            modelId=model_id,
+            body=body
+        )
+        async with response['body'] as stream_body:
+            response_body = json.loads(await stream_body.read())
+        if response['ResponseMetadata']['HTTPStatusCode'] == 200:
+            success = True
+        else:
+            print(f"Invalid response format: {response_body}")
+            attempts += 1
+
+    generated = _extract_generation(response_body)
+    if cache_key is not None and success:
+        get_completion_cache().put(cache_key, model_id, generated)
+    return generated
+
+
+def _build_ai_message(response_text: str) -> AIMessage:
+    """Turn the raw generation into an AIMessage, extracting any tool calls."""
+    print(f"--- Received response from AWS Bedrock ---")
+    print(f"Response: {response_text[:500]}...")  # Show more of the response for debugging
+    
+    # Check if the response contains tool calls
+    if "<tool_call>" in response_text:
+        calls, errors = parse_tool_calls(response_text)
+        for error in errors:
+            print(f"Failed to parse tool call ({error.error}): {error.raw[:200]}")
+
+        if calls or errors:
+            # Valid calls become tool_calls; malformed ones are kept as invalid_tool_calls
+            # so the tools node can report the parse error back to the model
+            return AIMessage(
+                content=response_text,
+                tool_calls=[
+                    {
+                        'name': call.name,
+                        'args': call.args,
+                        'id': f"call_{i}"  # Generate a unique ID for each tool call
+                    }
+                    for i, call in enumerate(calls)
+                ],
+                invalid_tool_calls=[
+                    invalid_tool_call(
+                        name=error.name,
+                        args=error.raw.strip(),
+                        id=f"call_{len(calls) + i}",
+                        error=error.error
+                    )
+                    for i, error in enumerate(errors)
+                ]
+            )
+    
+    # If no tool calls, return a regular AIMessage
+    return AIMessage(content=response_text)
+
+def _log_invocation(model_name, tools):
+    print(f"--- Invoking AWS Bedrock Llama 405B model: {model_name} ---")
+    
+    # Log tools if provided
+    if tools:
+        print(f"--- Note: {len(tools)} tools provided ---")
+        for tool in tools:
+            print(f"Tool: {tool.name} - {tool.description}")
 
 
 # --- Custom LLM Invocation Function for AWS Bedrock Llama 405B ---
@@ -184,94 +469,90 @@ def invoke_llm_manually(
     region_name: str = "us-east-2",
     aws_access_key_id: Optional[str] = None,
     aws_secret_access_key: Optional[str] = None,
-    aws_session_token: Optional[str] = None
+    aws_session_token: Optional[str] = None,
+    stream: bool = BEDROCK_STREAMING
 ) -> AIMessage:
     """
     Invokes the AWS Bedrock Llama 405B model, handles the response, and constructs
     an AIMessage, supporting tool calls if provided.
+
+    The call goes through chat_agent.llm_backend, which can fail over to other
+    providers (LLM_BACKENDS) and hedge slow requests (LLM_HEDGE_AFTER).
     """
     try:
-        # Create a Bedrock client
-        client = get_bedrock_client(
+        # The backend chain from LLM_BACKENDS (Bedrock by default), with failover and hedging
+        backend = get_llm_backend(
             region_name=region_name,
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
             aws_session_token=aws_session_token
         )
         
-        print(f"--- Invoking AWS Bedrock Llama 405B model: {model_name} ---")
-        
-        # Log tools if provided
-        if tools:
-            print(f"--- Note: {len(tools)} tools provided ---")
-            for tool in tools:
-                print(f"Tool: {tool.name} - {tool.description}")
+        _log_invocation(model_name, tools)
         
-        # Make direct API call to Bedrock with tools
         try:
-            response_text = invoke_bedrock_directly(
-                client=client,
+            response_text = backend.generate(
                 model_id=model_name,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                tools=tools
+                tools=tools,
+                stream=stream
             )
-            
-            print(f"--- Received response from AWS Bedrock ---")
-            print(f"Response: {response_text[:500]}...")  # Show more of the response for debugging
-            
-            # Check if the response contains tool calls
-            if "<tool_call>" in response_text and "</tool_call>" in response_text:
-                # Extract tool call information
-                import re
-                tool_call_matches = re.findall(
-                    r'<tool_call>(.*?)</tool_call>', 
-                    response_text, 
-                    re.DOTALL
-                )
-                
-                tool_calls = []
-                for match in tool_call_matches:
-                    # Parse the tool call (this is a simplified example)
-                    # You might need to adjust this based on your model's output format
-                    tool_name_match = re.search(r'name=(.*?)\n', match)
-                    tool_args_match = re.search(r'args=(\{.*?\})', match, re.DOTALL)
-                    
-                    if tool_name_match and tool_args_match:
-                        tool_name = tool_name_match.group(1)
-                        try:
-                            tool_args = eval(tool_args_match.group(1))  # Be careful with eval in production
-                            tool_calls.append({
-                                'name': tool_name,
-                                'args': tool_args
-                            })
-                        except:
-                            print(f"Failed to parse tool args: {tool_args_match.group(1)}")
-                
-                if tool_calls:
-                    # Create an AIMessage with tool calls
-                    return AIMessage(
-                        content=response_text,
-                        tool_calls=[
-                            {
-                                'name': call['name'],
-                                'args': call['args'],
-                                'id': f"call_{i}"  # Generate a unique ID for each tool call
-                            }
-                            for i, call in enumerate(tool_calls)
-                        ]
-                    )
-            
-            # If no tool calls, return a regular AIMessage
-            return AIMessage(content=response_text)
+            return _build_ai_message(response_text)
             
         except Exception as api_error:
-            print(f"Error in direct Bedrock API call: {str(api_error)}")
+            print(f"Error in LLM backend call: {str(api_error)}")
             import traceback
             traceback.print_exc()
             raise api_error
         
+    except CompletionCacheMiss:
+        # A replay run must stop, not record the error text as the model's answer
+        raise
+    except Exception as e:
+        print(f"Error invoking AWS Bedrock: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return AIMessage(content=f"Error: AWS Bedrock call failed: {str(e)}")
+
+
+async def ainvoke_llm_manually(
+    messages: Sequence[BaseMessage],
+    tools: Sequence[BaseTool] = None,
+    model_name: str = "us.meta.llama3-1-405b-instruct-v1:0",
+    temperature: float = 0.2,
+    max_tokens: int = 5000,
+    region_name: str = "us-east-2",
+    aws_access_key_id: Optional[str] = None,
+    aws_secret_access_key: Optional[str] = None,
+    aws_session_token: Optional[str] = None,
+    stream: bool = BEDROCK_STREAMING
+) -> AIMessage:
+    """
+    Async variant of invoke_llm_manually() using the shared aiobotocore client, so many
+    conversations can wait on Bedrock concurrently without a thread each.
+    """
+    try:
+        backend = get_llm_backend(
+            region_name=region_name,
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            aws_session_token=aws_session_token
+        )
+        _log_invocation(model_name, tools)
+        response_text = await backend.agenerate(
+            model_id=model_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            tools=tools,
+            stream=stream
+        )
+        return _build_ai_message(response_text)
+    except CompletionCacheMiss:
+        # A replay run must stop, not record the error text as the model's answer
+        raise
     except Exception as e:
         print(f"Error invoking AWS Bedrock: {str(e)}")
         import traceback
@@ -0,0 +1,197 @@
+import os
+import re
+import threading
+import time
+from typing import NamedTuple
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from chat_agent.meta_agent import ainvoke_llm_manually, invoke_llm_manually
+from chat_agent.prompt_compaction import estimate_tokens
+from tools.utils.histogram import Histogram
+
+# Set MODEL_ROUTING=1 to send turns to the small tier first
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "0") == "1"
+
+
+class ModelTier(NamedTuple):
+    name: str
+    model_id: str
+    # USD per 1000 tokens, used for the cost estimates in ModelRouter.stats()
+    input_cost_per_1k: float
+    output_cost_per_1k: float
+
+
+SMALL_TIER = ModelTier(
+    name="small",
+    model_id=os.getenv("ROUTER_SMALL_MODEL_ID", "us.meta.llama3-3-70b-instruct-v1:0"),
+    input_cost_per_1k=float(os.getenv("ROUTER_SMALL_INPUT_COST", "0.00072")),
+    output_cost_per_1k=float(os.getenv("ROUTER_SMALL_OUTPUT_COST", "0.00072")),
+)
+LARGE_TIER = ModelTier(
+    name="large",
+    model_id=os.getenv("ROUTER_LARGE_MODEL_ID", "us.meta.llama3-1-405b-instruct-v1:0"),
+    input_cost_per_1k=float(os.getenv("ROUTER_LARGE_INPUT_COST", "0.0024")),
+    output_cost_per_1k=float(os.getenv("ROUTER_LARGE_OUTPUT_COST", "0.0024")),
+)
+
+_FINAL_ANSWER_RE = re.compile(r"FINAL ANSWER:\s*(.*)", re.IGNORECASE)
+_BEDROCK_ERROR_PREFIX = "Error: AWS Bedrock call failed"
+
+
+class RoutingRules:
+    """
+    When a turn goes straight to the large tier, and when a small-tier response is
+    escalated.
+
+    Args:
+        max_question_chars: Questions longer than this start on the large tier
+        max_tool_result_chars: Conversations whose tool results exceed this in total go to the large tier
+        require_final_answer: Escalate a small-tier response that neither calls a tool nor
+                              ends with "FINAL ANSWER: ..."
+        hedges: Final answers containing any of these (case-insensitive) are escalated
+    """
+
+    def __init__(self,
+                 max_question_chars: int = int(os.getenv("ROUTER_MAX_QUESTION_CHARS", "600")),
+                 max_tool_result_chars: int = int(os.getenv("ROUTER_MAX_TOOL_RESULT_CHARS", "6000")),
+                 require_final_answer: bool = True,
+                 hedges=("unknown", "i don't know", "i do not know", "cannot determine", "not sure",
+                         "unable to", "insufficient information")):
+        self.max_question_chars = max_question_chars
+        self.max_tool_result_chars = max_tool_result_chars
+        self.require_final_answer = require_final_answer
+        self.hedges = tuple(hedge.lower() for hedge in hedges)
+
+
+class ModelRouter:
+    """
+    Sends each assistant turn to the small tier unless a rule asks for the large one,
+    and re-runs the turn on the large tier when the small response fails a check.
+
+    Once a conversation has escalated it stays on the large tier: the tier that produced
+    each AIMessage is kept in its response_metadata["model_tier"].
+    """
+
+    def __init__(self, small: ModelTier = SMALL_TIER, large: ModelTier = LARGE_TIER,
+                 rules: RoutingRules = None, invoke=invoke_llm_manually, ainvoke=ainvoke_llm_manually):
+        """
+        Args:
+            invoke / ainvoke: The LLM call, invoke(messages, model_name=..., **kwargs) -> AIMessage;
+                              replaceable with stubs
+        """
+        self.small = small
+        self.large = large
+        self.rules = rules or RoutingRules()
+        self._invoke = invoke
+        self._ainvoke = ainvoke
+        self._lock = threading.Lock()
+        self._tiers = {
+            tier.name: {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0,
+                        "latency": Histogram([0.5, 1, 2, 5, 10, 20, 40, 80])}
+            for tier in (small, large)
+        }
+        self._escalations = {}
+
+    def choose_tier(self, messages):
+        """Return (tier, reason) for the next turn of this conversation."""
+        if any(isinstance(msg, AIMessage) and msg.response_metadata.get("model_tier") == self.large.name
+               for msg in messages):
+            return self.large, "escalated earlier in this conversation"
+        question = next((msg.content for msg in messages if isinstance(msg, HumanMessage)), "")
+        if len(question) > self.rules.max_question_chars:
+            return self.large, f"question longer than {self.rules.max_question_chars} chars"
+        tool_chars = sum(len(msg.content) for msg in messages if isinstance(msg, ToolMessage))
+        if tool_chars > self.rules.max_tool_result_chars:
+            return self.large, f"tool results longer than {self.rules.max_tool_result_chars} chars"
+        return self.small, None
+
+    def check_response(self, message: AIMessage):
+        """Return why a small-tier response should be escalated, or None if it is acceptable."""
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        if content.startswith(_BEDROCK_ERROR_PREFIX):
+            return "model call failed"
+        if getattr(message, "invalid_tool_calls", None):
+            return "malformed tool call"
+        if message.tool_calls:
+            return None
+        match = _FINAL_ANSWER_RE.search(content)
+        if match is None:
+            return "no FINAL ANSWER" if self.rules.require_final_answer else None
+        answer = match.group(1).strip().lower()
+        if not answer:
+            return "empty FINAL ANSWER"
+        if any(hedge in answer for hedge in self.rules.hedges):
+            return "low-confidence FINAL ANSWER"
+        return None
+
+    def _record(self, tier: ModelTier, messages, message: AIMessage, seconds: float):
+        input_tokens = sum(estimate_tokens(str(msg.content)) for msg in messages)
+        output_tokens = estimate_tokens(str(message.content))
+        message.response_metadata["model_tier"] = tier.name
+        message.response_metadata["model_id"] = tier.model_id
+        with self._lock:
+            stats = self._tiers[tier.name]
+            stats["calls"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["output_tokens"] += output_tokens
+            stats["cost"] += (input_tokens * tier.input_cost_per_1k + output_tokens * tier.output_cost_per_1k) / 1000
+        stats["latency"].observe(seconds)
+
+    def _escalate(self, reason: str):
+        print(f"--- Escalating turn from {self.small.model_id} to {self.large.model_id}: {reason} ---")
+        with self._lock:
+            self._escalations[reason] = self._escalations.get(reason, 0) + 1
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        """Run one assistant turn; kwargs are passed to the LLM call (tools, temperature...)."""
+        tier, reason = self.choose_tier(messages)
+        if reason:
+            print(f"--- Routing turn to {tier.model_id}: {reason} ---")
+        start = time.perf_counter()
+        message = self._invoke(messages, model_name=tier.model_id, **kwargs)
+        self._record(tier, messages, message, time.perf_counter() - start)
+        if tier is self.small and (reason := self.check_response(message)):
+            self._escalate(reason)
+            start = time.perf_counter()
+            message = self._invoke(messages, model_name=self.large.model_id, **kwargs)
+            self._record(self.large, messages, message, time.perf_counter() - start)
+        return message
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        """Async variant of invoke()."""
+        tier, reason = self.choose_tier(messages)
+        if reason:
+            print(f"--- Routing turn to {tier.model_id}: {reason} ---")
+        start = time.perf_counter()
+        message = await self._ainvoke(messages, model_name=tier.model_id, **kwargs)
+        self._record(tier, messages, message, time.perf_counter() - start)
+        if tier is self.small and (reason := self.check_response(message)):
+            self._escalate(reason)
+            start = time.perf_counter()
+            message = await self._ainvoke(messages, model_name=self.large.model_id, **kwargs)
+            self._record(self.large, messages, message, time.perf_counter() - start)
+        return message
+
+    def stats(self) -> dict:
+        """Calls, estimated tokens and cost (USD) and latency histogram per tier, plus escalation reasons."""
+        with self._lock:
+            tiers = {
+                name: {**{key: value for key, value in stats.items() if key != "latency"},
+                       "latency_seconds": stats["latency"].snapshot()}
+                for name, stats in self._tiers.items()
+            }
+            return {"tiers": tiers, "escalations": dict(self._escalations)}
+
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide ModelRouter configured from the ROUTER_* environment."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
@@ -0,0 +1,186 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from chat_agent.prompt_compaction import compact_conversation, estimate_tokens
+
+# Conversations whose rendered prompt is kept for incremental reuse
+MAX_CACHED_CONVERSATIONS = 256
+
+
+def _tool_spec(tool):
+    """Return (name, description) for a LangChain tool or plain callable, or None."""
+    if hasattr(tool, 'name') and hasattr(tool, 'description'):
+        return (tool.name, tool.description)
+    if callable(tool):
+        tool_name = getattr(tool, '__name__', 'tool')
+        return (tool_name, getattr(tool, '__doc__', f'A function called {tool_name}'))
+    return None
+
+
+@lru_cache(maxsize=64)
+def _build_preamble(system_message, tool_specs):
+    system_parts = []
+    if system_message:
+        system_parts.append(system_message)
+
+    # Add tool descriptions to system prompt if tools are provided
+    if tool_specs is not None:
+        tools_section = ["\n\nAVAILABLE TOOLS:", "When you need to use a tool, use the following format:",
+                        "<tool_call>", "name=<tool_name>", "args={\"arg1\": \"value1\", \"arg2\": \"value2\"}", "</tool_call>",
+                        "The available tools are:"]
+        for tool_name, tool_desc in tool_specs:
+            tools_section.append(f"- {tool_name}: {tool_desc}")
+        system_parts.append("\n".join(tools_section))
+
+    return "\n\n".join(system_parts)
+
+
+def build_preamble(messages, tools=None) -> str:
+    """
+    Return the system prompt plus the AVAILABLE TOOLS section.
+
+    The formatted text is cached per (system message, tool names/descriptions), so it is
+    only rendered once per tool set.
+    """
+    system_message = next((msg.content for msg in messages if isinstance(msg, SystemMessage)), None)
+    tool_specs = None
+    if tools:
+        specs = []
+        for tool in tools:
+            try:
+                spec = _tool_spec(tool)
+            except Exception as e:
+                print(f"Error processing tool {tool}: {e}")
+                continue
+            if spec is not None:
+                specs.append(spec)
+        tool_specs = tuple(specs)
+    return _build_preamble(system_message, tool_specs)
+
+
+def render_message(msg):
+    """Render one message into the conversation entries the Llama prompt expects."""
+    if isinstance(msg, HumanMessage):
+        return [{"role": "user", "content": msg.content}]
+    if isinstance(msg, AIMessage):
+        invalid_calls = getattr(msg, 'invalid_tool_calls', None) or []
+        if (hasattr(msg, 'tool_calls') and msg.tool_calls) or invalid_calls:
+            # Handle tool calls in the assistant's message
+            entries = [
+                {"role": "assistant", "content": f"<tool_call>\nname={tool_call['name']}\nargs={tool_call['args']}\n</tool_call>"}
+                for tool_call in msg.tool_calls
+            ]
+            # Malformed calls are echoed back verbatim so the model sees what it wrote
+            entries.extend(
+                {"role": "assistant", "content": f"<tool_call>\n{invalid_call['args']}\n</tool_call>"}
+                for invalid_call in invalid_calls
+            )
+            return entries
+        return [{"role": "assistant", "content": msg.content}]
+    if isinstance(msg, ToolMessage):
+        # Format tool messages with the result
+        return [{"role": "user", "content": f"<tool_result>\n{msg.content}\n</tool_result>", "tool_result": True}]
+    return []
+
+
+def _format_entry(entry) -> str:
+    if entry["role"] == "user":
+        return f"User: {entry['content']}"
+    return f"Assistant: {entry['content']}"
+
+
+def _same_message(old, new) -> bool:
+    return old is new or (old.id is not None and old.id == new.id)
+
+
+class PromptBuilder:
+    """
+    Builds the flat Llama prompt for one conversation, turn over turn.
+
+    The builder remembers which messages it has rendered; when the next turn's message
+    list extends the previous one, only the new messages are rendered and appended.
+    If the history was rewritten the prompt is rebuilt from scratch.
+    """
+
+    def __init__(self, preamble: str):
+        self.preamble = preamble
+        self.system_tokens = estimate_tokens(preamble)
+        self.messages = []
+        self.conversation = []
+        self.body = ""
+        self.task_key = ""
+
+    def _reset(self):
+        self.messages = []
+        self.conversation = []
+        self.body = ""
+        self.task_key = ""
+
+    def build(self, messages):
+        """
+        Return (prompt, tokens_saved) for the full message list.
+
+        tokens_saved is the number of tokens removed by compaction on this turn.
+        """
+        messages = [msg for msg in messages if not isinstance(msg, SystemMessage)]
+        known = len(self.messages)
+        if known > len(messages) or not all(
+            _same_message(old, new) for old, new in zip(self.messages, messages[:known])
+        ):
+            self._reset()
+            known = 0
+
+        new_entries = []
+        for msg in messages[known:]:
+            for entry in render_message(msg):
+                entry["tokens"] = estimate_tokens(entry["content"])
+                new_entries.append(entry)
+        self.messages = messages
+
+        if not self.task_key:
+            self.task_key = next((e["content"] for e in new_entries if e["role"] == "user"), "")
+
+        self.conversation.extend(new_entries)
+        compacted, tokens_saved = compact_conversation(self.conversation, system_tokens=self.system_tokens)
+        if tokens_saved:
+            # History changed; keep the compacted form so later turns extend it
+            self.conversation = compacted
+            self.body = "\n\n".join(_format_entry(entry) for entry in compacted)
+        elif new_entries:
+            new_body = "\n\n".join(_format_entry(entry) for entry in new_entries)
+            self.body = f"{self.body}\n\n{new_body}" if self.body else new_body
+
+        parts = [self.preamble]
+        if self.body:
+            parts.append(self.body)
+        # Add assistant's turn
+        parts.append("Assistant:")
+        return "\n\n".join(parts).strip(), tokens_saved
+
+
+_builders = OrderedDict()
+_builders_lock = threading.Lock()
+
+def get_prompt_builder(messages, tools=None) -> PromptBuilder:
+    """
+    Return the PromptBuilder for this conversation, keyed by its preamble and first message.
+
+    The most recently used MAX_CACHED_CONVERSATIONS builders are kept.
+    """
+    preamble = build_preamble(messages, tools)
+    first = next((msg for msg in messages if not isinstance(msg, SystemMessage)), None)
+    first_key = (first.id or id(first)) if first is not None else None
+    key = (preamble, first_key)
+    with _builders_lock:
+        builder = _builders.get(key)
+        if builder is None:
+            builder = PromptBuilder(preamble)
+            _builders[key] = builder
+            while len(_builders) > MAX_CACHED_CONVERSATIONS:
+                _builders.popitem(last=False)
+        else:
+            _builders.move_to_end(key)
+    return builder
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import threading
+
+# Approximate prompt budget (in tokens) before old tool results get truncated
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "24000"))
+# The most recent tool results are always kept verbatim
+KEEP_RECENT_TOOL_RESULTS = int(os.getenv("KEEP_RECENT_TOOL_RESULTS", "2"))
+# Characters kept from the start and end of a compacted tool result
+COMPACTED_HEAD_CHARS = 600
+COMPACTED_TAIL_CHARS = 200
+
+# Rough characters-per-token ratio for Llama-style tokenizers on English text
+CHARS_PER_TOKEN = 4
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting; avoids loading a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate(text: str) -> str:
+    keep = COMPACTED_HEAD_CHARS + COMPACTED_TAIL_CHARS
+    if len(text) <= keep + 100:
+        return text
+    omitted = len(text) - keep
+    return (
+        f"{text[:COMPACTED_HEAD_CHARS]}\n"
+        f"[... {omitted} characters of this earlier tool result were omitted to save space ...]\n"
+        f"{text[-COMPACTED_TAIL_CHARS:]}"
+    )
+
+
+def compact_conversation(conversation, system_tokens: int = 0, budget: int = None,
+                         keep_recent: int = None):
+    """
+    Truncate old tool results until the conversation fits the token budget.
+
+    Args:
+        conversation: List of {"role", "content", "tokens"?, "tool_result"?} dicts, oldest first.
+                      Entries with "tool_result": True are eligible for compaction.
+        system_tokens: Tokens already used by the system prompt
+        budget: Token budget for the whole prompt (defaults to PROMPT_TOKEN_BUDGET)
+        keep_recent: Number of most recent tool results never compacted
+
+    Returns:
+        (conversation, tokens_saved): A new list (entries are copied only when changed).
+    """
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    keep_recent = KEEP_RECENT_TOOL_RESULTS if keep_recent is None else keep_recent
+
+    tokens = [msg.get("tokens") or estimate_tokens(msg["content"]) for msg in conversation]
+    total = system_tokens + sum(tokens)
+    if not budget or total <= budget:
+        return conversation, 0
+
+    tool_indexes = [i for i, msg in enumerate(conversation) if msg.get("tool_result")]
+    candidates = tool_indexes[:-keep_recent] if keep_recent else tool_indexes
+
+    compacted = list(conversation)
+    saved = 0
+    for i in candidates:
+        if total <= budget:
+            break
+        content = compacted[i]["content"]
+        shortened = _truncate(content)
+        if shortened is content:
+            continue
+        new_tokens = estimate_tokens(shortened)
+        saved += tokens[i] - new_tokens
+        total -= tokens[i] - new_tokens
+        compacted[i] = dict(compacted[i], content=shortened, tokens=new_tokens)
+    return compacted, saved
+
+
+def record_compaction(task_key: str, prompt_tokens: int, tokens_saved: int):
+    """Accumulate per-task prompt and saved token counts."""
+    key = hashlib.sha256(task_key.encode("utf-8")).hexdigest()[:16]
+    with _stats_lock:
+        entry = _stats.setdefault(key, {"task": task_key[:80], "turns": 0, "prompt_tokens": 0, "tokens_saved": 0})
+        entry["turns"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["tokens_saved"] += tokens_saved
+
+
+def get_compaction_stats() -> dict:
+    """Return per-task compaction stats keyed by a hash of the task's first user message."""
+    with _stats_lock:
+        return {key: dict(value) for key, value in _stats.items()}
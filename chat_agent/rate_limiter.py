@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces out calls to a provider so that at most
+    `max_calls_per_minute` requests start in any rolling minute.
+
+    A limit of 0 or None disables limiting.
+    """
+
+    def __init__(self, max_calls_per_minute=None):
+        self.max_calls_per_minute = max_calls_per_minute
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _reserve(self) -> float:
+        """Reserve the next call slot and return how long the caller must wait for it."""
+        if not self.max_calls_per_minute:
+            return 0.0
+        interval = 60.0 / self.max_calls_per_minute
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + interval
+        return slot - now
+
+    def acquire(self):
+        """Blocks until the caller is allowed to issue its next request."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Like acquire(), but waits without blocking the event loop."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+# One limiter per provider, shared by every thread in the process
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, max_calls_per_minute=None) -> RateLimiter:
+    """
+    Returns the shared RateLimiter for `provider`, creating it on first use.
+    Passing `max_calls_per_minute` updates the limit of an existing limiter.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = RateLimiter(max_calls_per_minute)
+            _limiters[provider] = limiter
+        elif max_calls_per_minute is not None:
+            limiter.max_calls_per_minute = max_calls_per_minute
+    return limiter
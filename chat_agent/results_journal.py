@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still serialized within this process
+    fcntl = None
+
+RESULTS_JOURNAL_PATH = os.getenv("RESULTS_JOURNAL_PATH", "output.jsonl")
+# The JSON-array file older runs rewrote at the end; imported once if no journal exists
+LEGACY_OUTPUT_PATH = "output.txt"
+
+
+class ResultsJournal:
+    """
+    Append-only JSONL journal of submitted answers with an in-memory task_id index.
+
+    Every answer is written as one line and fsynced before append() returns, so a
+    crashed run resumes from everything answered so far. Appends take an exclusive
+    flock, and each writer first indexes lines other processes appended since its
+    last read, so several runs can share one journal.
+    """
+
+    def __init__(self, path: str = RESULTS_JOURNAL_PATH, legacy_path: str = LEGACY_OUTPUT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._answers = {}
+        self._offset = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        with self._lock, self._file_lock():
+            self._read_new()
+            self._repair_tail()
+            if not self._answers and legacy_path and os.path.exists(legacy_path):
+                self._import_legacy(legacy_path)
+
+    def _file_lock(self):
+        return _FileLock(self._fd)
+
+    def _repair_tail(self):
+        # A crash mid-write can leave a partial last line; drop it so the next append starts clean
+        size = os.fstat(self._fd).st_size
+        if self._offset < size:
+            print(f"Results journal {self.path}: dropping {size - self._offset} bytes of an incomplete last entry")
+            os.ftruncate(self._fd, self._offset)
+
+    def _read_new(self):
+        """Index the complete lines appended after self._offset."""
+        with open(self.path, "rb") as journal:
+            journal.seek(self._offset)
+            data = journal.read()
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                answer = json.loads(line)
+            except ValueError:
+                print(f"Results journal {self.path}: skipping unreadable entry {line[:80]!r}")
+                continue
+            self._answers[answer.get("task_id")] = answer
+        self._offset += end
+
+    def _write(self, answer: dict):
+        data = (json.dumps(answer, ensure_ascii=False) + "\n").encode("utf-8")
+        view = memoryview(data)
+        while view:
+            written = os.write(self._fd, view)
+            view = view[written:]
+        os.fsync(self._fd)
+        self._offset = os.fstat(self._fd).st_size
+        self._answers[answer.get("task_id")] = answer
+
+    def _import_legacy(self, legacy_path: str):
+        try:
+            with open(legacy_path, "r") as legacy:
+                answers = json.load(legacy)
+        except (OSError, ValueError) as e:
+            print(f"Could not import {legacy_path} into the results journal: {e}")
+            return
+        for answer in answers:
+            if answer.get("task_id") not in self._answers:
+                self._write(answer)
+        print(f"Imported {len(answers)} answers from {legacy_path} into {self.path}")
+
+    def append(self, answer: dict):
+        """Durably record one answer ({"task_id", "question", "submitted_answer"})."""
+        with self._lock, self._file_lock():
+            self._read_new()
+            self._write(answer)
+
+    def __contains__(self, task_id) -> bool:
+        with self._lock:
+            return task_id in self._answers
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._answers)
+
+    def task_ids(self) -> set:
+        with self._lock:
+            return set(self._answers)
+
+    def answers(self, task_order=None) -> list:
+        """
+        The latest answer per task.
+
+        Args:
+            task_order: task_ids (e.g. of the question list) giving the order of the result;
+                        answers for tasks not in it follow in the order they were first
+                        answered. Without it, answers are in first-answered order, which
+                        with several workers is completion order.
+        """
+        with self._lock:
+            answers = dict(self._answers)
+        if task_order is None:
+            return list(answers.values())
+        ordered = [answers.pop(task_id) for task_id in dict.fromkeys(task_order) if task_id in answers]
+        return ordered + list(answers.values())
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _FileLock:
+    """Exclusive flock on the journal for the duration of a with-block (no-op without fcntl)."""
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
@@ -0,0 +1,148 @@
+import ast
+import json
+import re
+from typing import List, NamedTuple, Optional
+
+TOOL_CALL_START = "<tool_call>"
+TOOL_CALL_END = "</tool_call>"
+
+_NAME_RE = re.compile(r"^[ \t]*name[ \t]*[=:][ \t]*[\"'`]?([^\n\"'`]*?)[\"'`]?[ \t]*$", re.MULTILINE)
+_ARGS_RE = re.compile(r"^[ \t]*args[ \t]*[=:][ \t]*", re.MULTILINE)
+_JSON_LITERALS_RE = re.compile(r"\b(true|false|null)\b")
+# What json/ast raise on malformed, unhashable ({[1]: 2}) or too deeply nested args
+_ARGS_ERRORS = (ValueError, SyntaxError, TypeError, RecursionError, MemoryError)
+
+
+class ParsedToolCall(NamedTuple):
+    name: str
+    args: dict
+
+
+class ToolCallError(NamedTuple):
+    name: Optional[str]
+    raw: str
+    error: str
+
+
+def _match_braces(text: str, start: int) -> int:
+    """Return the index just past the brace closing text[start], honouring quoted strings, or -1."""
+    depth = 0
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def _parse_args(raw: str):
+    """Parse a dict literal written as JSON or Python (single quotes, True/None...)."""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(raw)
+    except (ValueError, SyntaxError):
+        pass
+    # Python-style quotes mixed with JSON literals, e.g. {'flag': true}
+    return ast.literal_eval(_JSON_LITERALS_RE.sub(lambda m: {"true": "True", "false": "False", "null": "None"}[m.group(1)], raw))
+
+
+def parse_tool_call_block(block: str):
+    """
+    Parse the body of one <tool_call> block.
+
+    Returns:
+        ParsedToolCall on success, ToolCallError describing what was wrong otherwise.
+    """
+    name_match = _NAME_RE.search(block)
+    name = name_match.group(1).strip() if name_match else None
+    if not name:
+        return ToolCallError(None, block, "missing 'name=<tool_name>' line")
+
+    args_match = _ARGS_RE.search(block)
+    if not args_match:
+        return ToolCallError(name, block, "missing 'args={...}' line")
+    brace = block.find("{", args_match.end())
+    if brace == -1:
+        return ToolCallError(name, block, "args must be a JSON object like {\"arg\": \"value\"}")
+    end = _match_braces(block, brace)
+    if end == -1:
+        return ToolCallError(name, block, "args object is not closed")
+
+    raw_args = block[brace:end]
+    try:
+        args = _parse_args(raw_args)
+    except _ARGS_ERRORS:
+        return ToolCallError(name, block, f"args could not be parsed as JSON: {raw_args[:100]}")
+    if not isinstance(args, dict):
+        return ToolCallError(name, block, "args must be a JSON object")
+    return ParsedToolCall(name, args)
+
+
+class ToolCallParser:
+    """
+    Incremental parser for <tool_call> blocks in model output.
+
+    feed() accepts text as it arrives and returns the results of blocks completed by it;
+    each block is scanned once. finish() reports a block left open at the end.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        results = []
+        while True:
+            start = self._buffer.find(TOOL_CALL_START, self._pos)
+            if start == -1:
+                # Keep a possible partial start tag for the next chunk
+                self._pos = max(self._pos, len(self._buffer) - len(TOOL_CALL_START) + 1)
+                break
+            end = self._buffer.find(TOOL_CALL_END, start + len(TOOL_CALL_START))
+            if end == -1:
+                self._pos = start
+                break
+            results.append(parse_tool_call_block(self._buffer[start + len(TOOL_CALL_START):end]))
+            self._pos = end + len(TOOL_CALL_END)
+        return results
+
+    def finish(self) -> list:
+        start = self._buffer.find(TOOL_CALL_START, self._pos)
+        if start == -1:
+            return []
+        block = self._buffer[start + len(TOOL_CALL_START):]
+        name_match = _NAME_RE.search(block)
+        name = name_match.group(1).strip() if name_match else None
+        return [ToolCallError(name, block, "tool call is missing its closing </tool_call> tag")]
+
+
+def parse_tool_calls(text: str):
+    """
+    Parse every <tool_call> block in a complete model response.
+
+    Returns:
+        (calls, errors): lists of ParsedToolCall and ToolCallError in order of appearance.
+    """
+    parser = ToolCallParser()
+    results = parser.feed(text) + parser.finish()
+    calls: List[ParsedToolCall] = [r for r in results if isinstance(r, ParsedToolCall)]
+    errors: List[ToolCallError] = [r for r in results if isinstance(r, ToolCallError)]
+    return calls, errors
@@ -0,0 +1,400 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+# Threads shared by every ParallelToolNode in the process
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+# Seconds a single tool call may run before its result is reported as a timeout
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "300"))
+
+# Max concurrent calls per tool across the whole process; tools not listed are unbounded.
+# Transcription is CPU/memory heavy, searches are cheap. board_to_fen is left unbounded
+# because concurrent boards are batched into one forward pass of a shared model.
+DEFAULT_TOOL_CONCURRENCY = {
+    "Transcribe Audio": 1,
+    "youtube_processor": 1,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_tool_gates = {}
+_tool_gates_lock = threading.Lock()
+# Tool calls answered from an earlier identical call instead of running the tool
+_memo_stats = {"hits": 0, "loops": 0}
+_memo_stats_lock = threading.Lock()
+
+# After this many identical calls in one run the model is told to stop repeating it
+LOOP_WARNING_REPEATS = 2
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+    return _executor
+
+
+class ToolGate:
+    """
+    Admits at most `limit` concurrent calls of one tool (unbounded if falsy).
+
+    Calls over the limit wait in a FIFO queue instead of in a pool thread, so a busy tool
+    does not hold threads other tools need. A call is handed to its executor only when
+    a slot is free. A call that timed out keeps its slot until it really returns, since
+    its thread cannot be interrupted; the limit bounds work actually running.
+    """
+
+    def __init__(self, limit: int = None):
+        self.limit = limit
+        self._running = 0
+        self._queue = deque()
+        self._lock = threading.Lock()
+
+    def submit(self, executor, fn, *args) -> Future:
+        """
+        Run fn(*args) on `executor` once a slot is free.
+
+        Returns:
+            A Future with a `started` Event, set when the call starts running (or is
+            cancelled), and `started_at`, the time.monotonic() it started at.
+        """
+        future = Future()
+        future.started = threading.Event()
+        future.started_at = None
+        job = (executor, fn, args, future)
+        with self._lock:
+            if self.limit and self._running >= self.limit:
+                self._queue.append(job)
+                return future
+            self._running += 1
+        executor.submit(self._run, job)
+        return future
+
+    def _run(self, job):
+        executor, fn, args, future = job
+        try:
+            running = future.set_running_or_notify_cancel()
+            future.started_at = time.monotonic()
+            future.started.set()
+            if running:
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                next_job = self._queue.popleft() if self._queue else None
+                if next_job is None:
+                    self._running -= 1
+            if next_job is not None:
+                next_job[0].submit(self._run, next_job)
+
+
+def get_tool_gate(tool_name: str, limit: int = None) -> ToolGate:
+    """
+    Return the process-wide ToolGate of a tool.
+
+    Args:
+        limit: Used when the gate is created; defaults to DEFAULT_TOOL_CONCURRENCY
+    """
+    with _tool_gates_lock:
+        gate = _tool_gates.get(tool_name)
+        if gate is None:
+            gate = ToolGate(DEFAULT_TOOL_CONCURRENCY.get(tool_name) if limit is None else limit)
+            _tool_gates[tool_name] = gate
+    return gate
+
+
+def wait_started(future: Future, timeout: float):
+    """
+    Return future.result(), allowing `timeout` seconds from when the call started running.
+    Time spent queued behind the tool's concurrency limit does not count.
+    """
+    future.started.wait()
+    return future.result(timeout=max(0.0, future.started_at + timeout - time.monotonic()))
+
+
+async def await_started(future: Future, timeout: float):
+    """Async variant of wait_started(); raises asyncio.TimeoutError."""
+    wrapped = asyncio.wrap_future(future)
+    while True:
+        # While the call is queued its deadline is unknown: check again after `timeout`
+        queued = future.started_at is None
+        remaining = timeout if queued else future.started_at + timeout - time.monotonic()
+        try:
+            return await asyncio.wait_for(asyncio.shield(wrapped), timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+            if not queued:
+                raise
+
+
+def _canonical(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def tool_call_key(tool_call: dict) -> str:
+    """Memo key of a tool call: its name plus JSON of its args with sorted keys and stripped strings."""
+    args = json.dumps(_canonical(tool_call.get("args")), sort_keys=True, ensure_ascii=False, default=str)
+    return f"{tool_call['name']}:{args}"
+
+
+def get_tool_memo_stats() -> dict:
+    with _memo_stats_lock:
+        return dict(_memo_stats)
+
+
+def is_error_output(output) -> bool:
+    """True for the failures tools return instead of raising: "Error..." strings, {"error": ...}
+    and {"file_type": "error"} dicts."""
+    if isinstance(output, str):
+        return output.lstrip().lower().startswith("error")
+    if isinstance(output, dict):
+        return "error" in output or output.get("file_type") == "error"
+    return False
+
+
+def format_tool_output(output) -> str:
+    """Convert a tool result to ToolMessage content, like LangGraph's ToolNode does."""
+    if isinstance(output, str):
+        return output
+    try:
+        return json.dumps(output, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return str(output)
+
+
+class ParallelToolNode:
+    """
+    A node that runs the tools requested in the last AIMessage concurrently.
+
+    Calls share a bounded thread pool, each tool name can be capped with a process-wide
+    concurrency limit (see ToolGate), and every call has a timeout counted from when it
+    starts running. The ToolMessages are returned in the same order as the tool calls.
+
+    With `memoize`, a call identical to an earlier successful one in the same run (same
+    tool, same canonical args) is not run again: it gets the earlier result plus a note
+    telling the model it is repeating itself. Identical calls within one turn run once.
+    Failures (exceptions, timeouts and error results such as "Error: ..." strings) are
+    marked status="error" and never reused.
+    """
+
+    def __init__(self, tools: list, concurrency_limits: dict = None, timeout: float = TOOL_CALL_TIMEOUT,
+                 memoize: bool = True) -> None:
+        self.tools_by_name = {tool.name: tool for tool in tools}
+        self.concurrency_limits = dict(DEFAULT_TOOL_CONCURRENCY if concurrency_limits is None else concurrency_limits)
+        self.timeout = timeout
+        self.memoize = memoize
+
+    def _submit(self, tool_call: dict) -> Future:
+        tool = self.tools_by_name[tool_call["name"]]
+        gate = get_tool_gate(tool_call["name"], self.concurrency_limits.get(tool_call["name"], 0))
+        return gate.submit(_get_executor(), tool.invoke, tool_call["args"])
+
+    async def _arun_tool(self, tool_call: dict):
+        if self.concurrency_limits.get(tool_call["name"]):
+            # Limited tools share the thread-side ToolGate with sync calls and prefetches,
+            # so one limit holds across all of them; the timeout excludes queueing
+            return await await_started(self._submit(tool_call), self.timeout)
+        tool = self.tools_by_name[tool_call["name"]]
+        return await asyncio.wait_for(tool.ainvoke(tool_call["args"]), timeout=self.timeout)
+
+    @staticmethod
+    def _last_ai_message(inputs: dict) -> AIMessage:
+        if messages := inputs.get("messages", []):
+            message = messages[-1]
+        else:
+            raise ValueError("No message found in input")
+        if not isinstance(message, AIMessage):
+            raise ValueError("Last message is not an AIMessage with tool calls")
+        return message
+
+    def _unknown_tool_error(self, tool_call: dict) -> ValueError:
+        return ValueError(
+            f"{tool_call['name']} is not a valid tool, try one of [{', '.join(self.tools_by_name)}]."
+        )
+
+    @staticmethod
+    def _error_message(tool_call: dict, content: str) -> ToolMessage:
+        return ToolMessage(
+            content=content,
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            status="error",
+        )
+
+    @staticmethod
+    def _result_message(tool_call: dict, output) -> ToolMessage:
+        # Failures reported as results are marked as errors so they are never memoized
+        return ToolMessage(
+            content=format_tool_output(output),
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            status="error" if is_error_output(output) else "success",
+        )
+
+    def _timeout_message(self, tool_call: dict) -> ToolMessage:
+        return self._error_message(
+            tool_call, f"Error: {tool_call['name']} did not finish within {self.timeout:g} seconds."
+        )
+
+    @staticmethod
+    def _previous_results(messages) -> dict:
+        """Map tool_call_key -> (successful content, times called) from the run so far."""
+        counts = {}
+        results = {}
+        # Tool call ids (call_0, call_1...) repeat on every turn, so a ToolMessage is only
+        # matched against the calls of the AIMessage it answers
+        keys_by_id = {}
+        for msg in messages:
+            if isinstance(msg, AIMessage):
+                keys_by_id = {}
+                for tool_call in msg.tool_calls:
+                    key = tool_call_key(tool_call)
+                    keys_by_id[tool_call["id"]] = key
+                    counts[key] = counts.get(key, 0) + 1
+            elif isinstance(msg, ToolMessage) and msg.status != "error" and msg.tool_call_id in keys_by_id:
+                # Keep the first real result; later ones are memo replies carrying a note
+                key = keys_by_id[msg.tool_call_id]
+                results.setdefault(key, msg.content)
+        return {key: (content, counts[key]) for key, content in results.items()}
+
+    def _plan(self, inputs: dict, message: AIMessage):
+        """
+        Split this turn's calls into ones to run and ones answered from the memo.
+
+        Returns:
+            (run_first, memo): run_first maps call index -> index of the first identical
+            call in this turn; memo maps call index -> ToolMessage answered without running.
+        """
+        run_first = {}
+        memo = {}
+        if not self.memoize:
+            return {i: i for i in range(len(message.tool_calls))}, memo
+        # The current AIMessage is the last one; only earlier turns count as history
+        previous = self._previous_results(inputs.get("messages", [])[:-1])
+        first_index = {}
+        for i, tool_call in enumerate(message.tool_calls):
+            key = tool_call_key(tool_call)
+            if key in previous:
+                content, times = previous[key]
+                memo[i] = self._memo_message(tool_call, content, times + 1)
+            else:
+                run_first[i] = first_index.setdefault(key, i)
+        return run_first, memo
+
+    @staticmethod
+    def _memo_message(tool_call: dict, content: str, times: int) -> ToolMessage:
+        loop = times > LOOP_WARNING_REPEATS
+        with _memo_stats_lock:
+            _memo_stats["hits"] += 1
+            _memo_stats["loops"] += loop
+        if loop:
+            note = (f"[Note: this is call number {times} of {tool_call['name']} with these exact arguments and "
+                    "the result has not changed. Do not call it again; answer with the information you have "
+                    "or try a different tool or arguments.]")
+        else:
+            note = (f"[Note: {tool_call['name']} was already called with these exact arguments; "
+                    "this is the earlier result. Use it instead of repeating the call.]")
+        return ToolMessage(
+            content=f"{content}\n\n{note}",
+            name=tool_call["name"],
+            tool_call_id=tool_call["id"],
+            status="success",
+        )
+
+    @staticmethod
+    def _invalid_call_messages(message: AIMessage) -> list:
+        # Tool calls the parser could not read are answered with the parse error,
+        # so the model can correct the call on its next turn
+        outputs = []
+        for invalid_call in getattr(message, "invalid_tool_calls", None) or []:
+            outputs.append(
+                ToolMessage(
+                    content=(
+                        f"Error: could not parse tool call for '{invalid_call.get('name') or 'unknown'}': "
+                        f"{invalid_call.get('error')}. Use the format:\n"
+                        "<tool_call>\nname=<tool_name>\nargs={\"arg1\": \"value1\"}\n</tool_call>"
+                    ),
+                    name=invalid_call.get("name") or "invalid_tool_call",
+                    tool_call_id=invalid_call["id"],
+                    status="error",
+                )
+            )
+        return outputs
+
+    def __call__(self, inputs: dict):
+        message = self._last_ai_message(inputs)
+        tool_calls = message.tool_calls
+        run_first, memo = self._plan(inputs, message)
+        futures = {}
+        for i, tool_call in enumerate(tool_calls):
+            if run_first.get(i) == i and tool_call["name"] in self.tools_by_name:
+                futures[i] = self._submit(tool_call)
+
+        outputs = []
+        for i, tool_call in enumerate(tool_calls):
+            if i in memo:
+                outputs.append(memo[i])
+                continue
+            future = futures.get(run_first[i])
+            try:
+                if future is None:
+                    raise self._unknown_tool_error(tool_call)
+                output = wait_started(future, self.timeout)
+            except FutureTimeoutError:
+                outputs.append(self._timeout_message(tool_call))
+                continue
+            except Exception as e:
+                outputs.append(self._error_message(tool_call, f"Error: {repr(e)}\n Please fix your mistakes."))
+                continue
+            outputs.append(self._result_message(tool_call, output))
+        outputs.extend(self._invalid_call_messages(message))
+        return {"messages": outputs}
+
+    async def acall(self, inputs: dict):
+        """
+        Async variant of __call__: the calls run as coroutines on the current event loop,
+        except calls of concurrency-limited tools, which go through the tool's ToolGate.
+        """
+        message = self._last_ai_message(inputs)
+        tool_calls = message.tool_calls
+        run_first, memo = self._plan(inputs, message)
+        # Identical calls in this turn await the same task
+        tasks = {
+            i: asyncio.ensure_future(self._arun_tool(tool_call))
+            for i, tool_call in enumerate(tool_calls)
+            if run_first.get(i) == i and tool_call["name"] in self.tools_by_name
+        }
+
+        async def run(i, tool_call):
+            if i in memo:
+                return memo[i]
+            try:
+                task = tasks.get(run_first[i])
+                if task is None:
+                    raise self._unknown_tool_error(tool_call)
+                output = await task
+            except asyncio.TimeoutError:
+                return self._timeout_message(tool_call)
+            except Exception as e:
+                return self._error_message(tool_call, f"Error: {repr(e)}\n Please fix your mistakes.")
+            return self._result_message(tool_call, output)
+
+        # gather() keeps the results in call order
+        outputs = list(await asyncio.gather(*(run(i, tool_call) for i, tool_call in enumerate(tool_calls))))
+        outputs.extend(self._invalid_call_messages(message))
+        return {"messages": outputs}
@@ -0,0 +1,54 @@
+"""
+Per-question graph setup cost, before and after caching the compiled graph.
+
+"before" builds and compiles the StateGraph for every question, as __call__ did before
+get_graph() existed; "after" goes through get_graph(), which compiles once per agent.
+No model or tool is called: only the setup each question pays before invoke().
+
+    python scripts/graph_compile_bench.py
+    python scripts/graph_compile_bench.py --questions 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from agent import BasicAgent
+
+
+def time_setup(setup, questions: int) -> list:
+    """Return the seconds `setup()` took for each of `questions` calls."""
+    timings = []
+    for _ in range(questions):
+        start = time.perf_counter()
+        setup()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: list):
+    print(f"{label:>7}: total {sum(timings) * 1000:8.1f} ms, "
+          f"mean {statistics.mean(timings) * 1000:7.3f} ms, "
+          f"max {max(timings) * 1000:7.3f} ms per question")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=50, help="Questions simulated (default: %(default)s)")
+    args = parser.parse_args()
+
+    agent = BasicAgent()
+    before = time_setup(agent._build_graph, args.questions)
+    after = time_setup(agent.get_graph, args.questions)
+    report("before", before)
+    report("after", after)
+    print(f"speedup: {sum(before) / sum(after):.0f}x over {args.questions} questions "
+          f"({len(agent._graph_cache)} graph compiled)")
+
+
+if __name__ == "__main__":
+    main()
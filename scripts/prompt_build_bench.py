@@ -0,0 +1,89 @@
+"""
+Incremental vs full prompt build over a long conversation.
+
+Simulates a ReAct run of --turns assistant turns, each a tool call plus its result,
+and times building the Llama prompt before every turn two ways:
+
+- full: a fresh PromptBuilder and an uncached preamble every turn, i.e. re-rendering
+  the whole history as the prompt code did before PromptBuilder existed
+- incremental: one PromptBuilder reused across turns via get_prompt_builder()
+
+The two prompts must be identical on every turn, including once compaction kicks in
+(raise --tool-chars past PROMPT_TOKEN_BUDGET); exits non-zero otherwise.
+
+    python scripts/prompt_build_bench.py
+    python scripts/prompt_build_bench.py --turns 50 --tool-chars 1500 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from chat_agent.prompt_builder import PromptBuilder, _build_preamble, get_prompt_builder
+from tools.registry import get_lazy_tools
+
+
+def conversation(turns: int, tool_chars: int, question_id: str):
+    """Yield the message list before each assistant turn."""
+    messages = [SystemMessage(content="You are a general AI assistant."),
+                HumanMessage(content="Which year was the album released?", id=question_id)]
+    yield list(messages)
+    for turn in range(turns):
+        messages.append(AIMessage(content="", id=f"ai-{turn}", tool_calls=[
+            {"name": "duckduckgo_search", "args": {"query": f"album release year {turn}"}, "id": "call_0"}]))
+        messages.append(ToolMessage(content=f"result {turn} " + "x" * tool_chars, tool_call_id="call_0",
+                                    id=f"tool-{turn}"))
+        yield list(messages)
+
+
+def full_build(messages, tools):
+    # Bypass the preamble cache and the per-conversation builder
+    preamble = _build_preamble.__wrapped__(*_preamble_args(messages, tools))
+    return PromptBuilder(preamble).build(messages)[0]
+
+
+def _preamble_args(messages, tools):
+    system_message = next((msg.content for msg in messages if isinstance(msg, SystemMessage)), None)
+    return system_message, tuple((tool.name, tool.description) for tool in tools)
+
+
+def incremental_build(messages, tools):
+    return get_prompt_builder(messages, tools).build(messages)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=50, help="Assistant turns (default: %(default)s)")
+    parser.add_argument("--tool-chars", type=int, default=1500, help="Characters per tool result (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=10, help="Conversations timed per mode (default: %(default)s)")
+    args = parser.parse_args()
+
+    tools = get_lazy_tools()
+
+    timings = {}
+    prompts = {}
+    for name, build in (("full", full_build), ("incremental", incremental_build)):
+        # Each repetition is a new conversation, so it gets a new incremental builder
+        runs = [list(conversation(args.turns, args.tool_chars, f"{name}-{i}")) for i in range(args.repeat)]
+        start = time.perf_counter()
+        for turns in runs:
+            prompts[name] = [build(messages, tools) for messages in turns]
+        timings[name] = (time.perf_counter() - start) / args.repeat
+
+    same = prompts["full"] == prompts["incremental"]
+    print(f"{args.turns} turns, {args.tool_chars}-char tool results, final prompt "
+          f"{len(prompts['full'][-1])} chars")
+    for name, seconds in timings.items():
+        print(f"{name:>12}: {seconds * 1000:8.2f} ms per conversation")
+    print(f"     speedup: {timings['full'] / timings['incremental']:.1f}x, "
+          f"prompts {'identical' if same else 'DIFFER'}")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Cold-start import benchmark for the entry points.
+
+Runs each entry point's module body (not its __main__ block) in a fresh interpreter
+with `python -X importtime` and reports the total import time and the heaviest
+top-level imports. Exits non-zero when a forbidden module (one that should only load
+when its tool is used) is imported at startup, or when --max-ms is exceeded.
+
+    python scripts/startup_importtime.py
+    python scripts/startup_importtime.py --max-ms 4000 --runs 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ["app.py", "random-app.py"]
+# Heavy dependencies that tools import on first use; they must not load at startup
+FORBIDDEN_MODULES = ["tensorflow", "keras", "board_to_fen", "vosk", "yt_dlp"]
+
+
+def measure(entry_point: str):
+    """
+    Import one entry point in a fresh interpreter.
+
+    Returns:
+        (total_ms, imports, top_level): total_ms is the summed cumulative time of the
+        top-level imports; imports and top_level map module names to cumulative ms.
+    """
+    code = f"import runpy; runpy.run_path({entry_point!r}, run_name='startup_importtime')"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {entry_point} failed:\n{result.stderr[-2000:]}")
+
+    total_us = 0
+    imports = {}
+    top_level = {}
+    started = False
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        cumulative_us = int(cumulative)
+        module = name.strip()
+        if not started:
+            # Everything before runpy is interpreter startup (site, encodings...)
+            started = module == "runpy" and not name.startswith("  ")
+            continue
+        imports[module] = cumulative_us / 1000
+        if not name.startswith("  "):
+            total_us += cumulative_us
+            top_level[module] = cumulative_us / 1000
+    return total_us / 1000, imports, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the entry points.")
+    parser.add_argument("entry_points", nargs="*", default=ENTRY_POINTS)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per entry point; the fastest is reported")
+    parser.add_argument("--top", type=int, default=10, help="Number of heaviest top-level imports to list")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if an entry point takes longer than this")
+    args = parser.parse_args()
+
+    failed = False
+    for entry_point in args.entry_points:
+        runs = [measure(entry_point) for _ in range(max(1, args.runs))]
+        total_ms, imports, top_level = min(runs, key=lambda run: run[0])
+        print(f"{entry_point}: {total_ms:.0f} ms (best of {len(runs)})")
+        for module, ms in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {ms:8.1f} ms  {module}")
+
+        loaded = sorted({m for m in imports for f in FORBIDDEN_MODULES if m == f or m.startswith(f + ".")})
+        if loaded:
+            print(f"  FAIL: imported at startup: {', '.join(loaded[:10])}")
+            failed = True
+        if args.max_ms is not None and total_ms > args.max_ms:
+            print(f"  FAIL: {total_ms:.0f} ms exceeds --max-ms {args.max_ms:g}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
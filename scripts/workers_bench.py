@@ -0,0 +1,69 @@
+"""
+Speedup of app.py --workers with a sleeping fake agent, and result-order check.
+
+Each fake question sleeps for a random time (so later questions often finish first)
+and answers with its own task_id. Every worker count is run through
+app.run_questions(), threaded and with --async, and the results must come back in
+question order. Exits non-zero if they do not.
+
+    python scripts/workers_bench.py
+    python scripts/workers_bench.py --questions 40 --workers 1 4 8 --sleep 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app import run_questions
+
+
+class SleepingAgent:
+    """Stands in for BasicAgent: sleeps instead of calling the model, answers with the task_id."""
+
+    def __init__(self, delays: dict):
+        self.delays = delays
+
+    def __call__(self, question: str, task_id: str = None) -> str:
+        time.sleep(self.delays[question])
+        return f"answer to {question}"
+
+    async def acall(self, question: str, task_id: str = None) -> str:
+        await asyncio.sleep(self.delays[question])
+        return f"answer to {question}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--questions", type=int, default=20, help="Fake questions (default: %(default)s)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8], help="Worker counts to compare")
+    parser.add_argument("--sleep", type=float, default=0.1, help="Mean seconds per question (default: %(default)s)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    items = [{"task_id": f"task-{i}", "question": f"question {i}", "file_name": ""} for i in range(args.questions)]
+    agent = SleepingAgent({item["question"]: rng.uniform(0, 2 * args.sleep) for item in items})
+    expected = [f"answer to {item['question']}" for item in items]
+
+    ok = True
+    baseline = None
+    for use_async in (False, True):
+        for workers in args.workers:
+            start = time.perf_counter()
+            results = run_questions(agent, items, workers, use_async)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            in_order = [answer["submitted_answer"] for answer, _ in results] == expected
+            ok = ok and in_order
+            mode = "async" if use_async else "threads"
+            print(f"{mode:>7} workers={workers:<3} {elapsed:6.2f}s  speedup {baseline / elapsed:5.1f}x  "
+                  f"{'in question order' if in_order else 'OUT OF ORDER'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import pytest
+from botocore.stub import Stubber
+
+from chat_agent import meta_agent
+from tests.stubs import FAKE_CREDENTIALS
+
+
+@pytest.fixture
+def bedrock_stub():
+    """Stubber on the shared Bedrock client for FAKE_CREDENTIALS."""
+    meta_agent.clear_bedrock_clients()
+    client = meta_agent.get_bedrock_client(**FAKE_CREDENTIALS)
+    with Stubber(client) as stubber:
+        yield stubber
+    meta_agent.clear_bedrock_clients()
@@ -0,0 +1,93 @@
+"""Local stand-ins for the services the agent talks to."""
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from botocore.response import StreamingBody
+
+# Explicit fake credentials, so no AWS configuration is read
+FAKE_CREDENTIALS = {"region_name": "us-east-2", "aws_access_key_id": "test", "aws_secret_access_key": "test"}
+
+
+def generation_response(text: str) -> dict:
+    """A stubbed invoke_model response carrying a Llama generation."""
+    body = json.dumps({"generation": text}).encode("utf-8")
+    return {
+        "body": StreamingBody(io.BytesIO(body), len(body)),
+        "contentType": "application/json",
+        "ResponseMetadata": {"HTTPStatusCode": 200},
+    }
+
+
+class StubHTTPServer:
+    """
+    Local HTTP server for tests. `respond(method, path, headers, body)` returns
+    (status, headers, body bytes); every request is recorded in `requests`.
+    """
+
+    def __init__(self, respond):
+        stub = self
+        self.requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stub.requests.append((self.command, self.path, dict(self.headers), body))
+                status, headers, payload = respond(self.command, self.path, self.headers, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _handle
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeStreamingClient:
+    """
+    Bedrock client stand-in serving invoke_model_with_response_stream from a list of text
+    pieces, and invoke_model with the concatenated text.
+    """
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.calls = []
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        self.calls.append("stream")
+        events = [{"chunk": {"bytes": json.dumps({"generation": piece}).encode("utf-8")}} for piece in self.pieces]
+        return {"body": iter(events)}
+
+    def invoke_model(self, modelId, body):
+        self.calls.append("invoke")
+        return generation_response("".join(self.pieces))
+
+
+class EchoAgent:
+    """BasicAgent stand-in answering with the question itself."""
+
+    def __call__(self, question: str, task_id: str = None) -> str:
+        return f"echo: {question}"
+
+
+def echo_warm_up(preload):
+    """worker_pool warm_up that builds an EchoAgent and loads nothing."""
+    return EchoAgent()
@@ -0,0 +1,30 @@
+from langchain_core.messages import HumanMessage
+
+from chat_agent import meta_agent
+from tests.stubs import FAKE_CREDENTIALS, generation_response
+
+
+def test_clients_are_shared_per_region_and_credentials():
+    meta_agent.clear_bedrock_clients()
+    first = meta_agent.get_bedrock_client(**FAKE_CREDENTIALS)
+    assert meta_agent.get_bedrock_client(**FAKE_CREDENTIALS) is first
+    assert meta_agent.get_bedrock_client(**{**FAKE_CREDENTIALS, "region_name": "us-west-2"}) is not first
+    assert meta_agent.get_bedrock_client(**FAKE_CREDENTIALS, max_pool_connections=50) is not first
+    meta_agent.clear_bedrock_clients()
+
+
+def test_react_loop_builds_one_client(bedrock_stub, monkeypatch):
+    created = []
+    create = meta_agent._create_bedrock_client
+    monkeypatch.setattr(meta_agent, "_create_bedrock_client", lambda *args: created.append(args) or create(*args))
+
+    messages = [HumanMessage(content="What is 2 + 2?")]
+    for turn in range(10):
+        bedrock_stub.add_response("invoke_model", generation_response(f"Thinking, turn {turn}."))
+        reply = meta_agent.invoke_llm_manually(messages, model_name="test-model", stream=False, **FAKE_CREDENTIALS)
+        assert reply.content == f"Thinking, turn {turn}."
+        messages = messages + [reply]
+
+    # The fixture created the client; none of the 10 turns built another
+    assert created == []
+    bedrock_stub.assert_no_pending_responses()
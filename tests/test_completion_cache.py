@@ -0,0 +1,33 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from chat_agent import completion_cache, meta_agent
+from chat_agent.completion_cache import CompletionCache, CompletionCacheMiss
+from tests.stubs import FAKE_CREDENTIALS, generation_response
+
+
+def use_cache(monkeypatch, tmp_path, mode: str) -> CompletionCache:
+    cache = CompletionCache(str(tmp_path / "completions.sqlite"), mode=mode)
+    monkeypatch.setattr(completion_cache, "_cache", cache)
+    return cache
+
+
+def ask(question: str, **kwargs):
+    return meta_agent.invoke_llm_manually([HumanMessage(content=question)], model_name="test-model",
+                                          **FAKE_CREDENTIALS, **kwargs)
+
+
+def test_repeated_prompt_is_served_from_the_cache(bedrock_stub, monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path, "on")
+    bedrock_stub.add_response("invoke_model", generation_response("FINAL ANSWER: 4"))
+
+    assert ask("What is 2 + 2?", stream=False).content == "FINAL ANSWER: 4"
+    assert ask("What is 2 + 2?", stream=False).content == "FINAL ANSWER: 4"
+    assert (cache.hits, cache.misses) == (1, 1)
+    bedrock_stub.assert_no_pending_responses()
+
+
+def test_replay_miss_is_raised_not_answered(bedrock_stub, monkeypatch, tmp_path):
+    use_cache(monkeypatch, tmp_path, "replay")
+    with pytest.raises(CompletionCacheMiss):
+        ask("Never asked before?", stream=False)
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import os
+import threading
+
+import pytest
+
+from tests.stubs import StubHTTPServer
+from tools.utils import file_api_handler, file_cache
+from tools.utils.file_cache import TaskFileCache
+
+
+class FileServer:
+    """Serves /files/<task_id> with an ETag and answers If-None-Match with 304."""
+
+    def __init__(self):
+        self.files = {}
+
+    def respond(self, method, path, headers, body):
+        task_id = path.rsplit("/", 1)[-1]
+        content = self.files.get(task_id)
+        if content is None:
+            return 404, {}, b"not found"
+        etag = f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Disposition": f'attachment; filename="{task_id}.txt"'}, content
+
+
+@pytest.fixture
+def server(monkeypatch):
+    files = FileServer()
+    with StubHTTPServer(files.respond) as stub:
+        monkeypatch.setattr(file_api_handler, "SCORING_API_URL", stub.url)
+        stub.files = files.files
+        yield stub
+
+
+def use_cache(monkeypatch, tmp_path, **kwargs) -> TaskFileCache:
+    cache = TaskFileCache(str(tmp_path / "cache"), **kwargs)
+    monkeypatch.setattr(file_cache, "_cache", cache)
+    return cache
+
+
+def conditional_requests(stub):
+    return [headers.get("If-None-Match") is not None for _, _, headers, _ in stub.requests]
+
+
+def test_fresh_entry_is_served_without_a_request(server, monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path)
+    server.files["a"] = b"alpha"
+
+    assert file_api_handler.download_task_file("a") == ("a.txt", b"alpha")
+    assert file_api_handler.download_task_file("a") == ("a.txt", b"alpha")
+
+    assert len(server.requests) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "revalidations": 0}
+
+
+def test_async_download_counts_one_miss(server, monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path)
+    server.files["a"] = b"alpha"
+
+    filename, path = asyncio.run(file_api_handler.adownload_task_file_to_path("a"))
+    assert filename == "a.txt"
+    assert asyncio.run(file_api_handler.adownload_task_file_to_path("a")) == (filename, path)
+
+    assert len(server.requests) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "revalidations": 0}
+
+
+def test_stale_entry_is_revalidated_with_its_etag(server, monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path, max_age=0)
+    server.files["a"] = b"alpha"
+
+    file_api_handler.download_task_file("a")
+    assert file_api_handler.download_task_file("a") == ("a.txt", b"alpha")
+    # Unconditional fetch, then a conditional one answered with 304
+    assert conditional_requests(server) == [False, True]
+    assert cache.stats()["revalidations"] == 1
+
+    server.files["a"] = b"alpha, edited"
+    assert file_api_handler.download_task_file("a") == ("a.txt", b"alpha, edited")
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_entries_are_evicted(server, monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path, max_bytes=250)
+    for task_id in ("a", "b", "c"):
+        server.files[task_id] = task_id.encode() * 100
+
+    file_api_handler.download_task_file("a")
+    file_api_handler.download_task_file("b")
+    os.utime(cache._entry_path("a"), (0, 0))  # a is the least recently used
+    file_api_handler.download_task_file("c")
+
+    assert cache.get_entry("a") is None
+    assert cache.get_entry("b") is not None and cache.get_entry("c") is not None
+    assert len(os.listdir(cache.blob_dir)) == 2
+
+
+def test_concurrent_downloads_leave_one_consistent_entry(server, monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path, max_age=0)
+    server.files["a"] = b"x" * 100_000
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(file_api_handler.download_task_file("a")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [("a.txt", b"x" * 100_000)] * 8
+    assert not [name for name in os.listdir(cache.blob_dir) if name.startswith(".tmp-")]
+    assert not [name for name in os.listdir(cache.entry_dir) if name.startswith(".tmp-")]
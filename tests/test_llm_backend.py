@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from langchain_core.messages import HumanMessage
+
+from chat_agent import llm_backend, meta_agent
+from chat_agent.llm_backend import (BedrockBackend, FailoverBackend, LLMBackend, LLMBackendError,
+                                    OpenAICompatibleBackend, is_retryable)
+from tests.stubs import StubHTTPServer, generation_response
+
+MESSAGES = [HumanMessage(content="What is 2 + 2?")]
+
+
+class FakeBackend(LLMBackend):
+    """Answers `text` after `delay` seconds, or raises `error`; counts its calls."""
+
+    def __init__(self, name, text="FINAL ANSWER: 4", delay=0.0, error=None):
+        self.name = name
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def generate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+    async def agenerate(self, model_id, messages, temperature=0.2, max_tokens=5000, tools=None, stream=False):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+
+def chat_completion(text: str) -> bytes:
+    return json.dumps({"choices": [{"message": {"role": "assistant", "content": text}}]}).encode("utf-8")
+
+
+def test_openai_compatible_backend_posts_the_conversation():
+    respond = lambda method, path, headers, body: (200, {"Content-Type": "application/json"},
+                                                   chat_completion("FINAL ANSWER: 4"))
+    with StubHTTPServer(respond) as server:
+        backend = OpenAICompatibleBackend(f"{server.url}/v1", api_key="secret", model="local-llama")
+        assert backend.generate("bedrock-model", MESSAGES) == "FINAL ANSWER: 4"
+
+    method, path, headers, body = server.requests[0]
+    payload = json.loads(body)
+    assert (method, path) == ("POST", "/v1/chat/completions")
+    assert headers["Authorization"] == "Bearer secret"
+    assert payload["model"] == "local-llama"
+    assert payload["messages"][-1] == {"role": "user", "content": "What is 2 + 2?"}
+
+
+def test_http_errors_are_retryable_only_for_throttling_and_5xx():
+    respond = lambda method, path, headers, body: (503, {}, b"overloaded")
+    with StubHTTPServer(respond) as server:
+        with pytest.raises(LLMBackendError) as excinfo:
+            OpenAICompatibleBackend(server.url).generate("model", MESSAGES)
+    assert excinfo.value.status == 503
+    assert is_retryable(excinfo.value)
+    assert is_retryable(LLMBackendError("openai", 429, "slow down"))
+    assert not is_retryable(LLMBackendError("openai", 400, "bad request"))
+
+
+def test_bedrock_throttling_fails_over_to_the_next_backend(bedrock_stub):
+    bedrock_stub.add_client_error("invoke_model", service_error_code="ThrottlingException", http_status_code=429)
+    fallback = FakeBackend("openai")
+    backend = FailoverBackend([BedrockBackend(client=bedrock_stub.client), fallback])
+
+    assert backend.generate("test-model", MESSAGES) == "FINAL ANSWER: 4"
+    stats = backend.stats()
+    assert (stats["bedrock"]["errors"], stats["bedrock"]["failovers"]) == (1, 1)
+    assert stats["openai"]["calls"] == 1
+
+
+def test_bedrock_validation_errors_are_raised_without_failover(bedrock_stub):
+    bedrock_stub.add_client_error("invoke_model", service_error_code="ValidationException", http_status_code=400)
+    fallback = FakeBackend("openai")
+    backend = FailoverBackend([BedrockBackend(client=bedrock_stub.client), fallback])
+
+    with pytest.raises(ClientError):
+        backend.generate("test-model", MESSAGES)
+    assert fallback.calls == 0
+
+
+def test_bedrock_backend_returns_the_generation(bedrock_stub):
+    bedrock_stub.add_response("invoke_model", generation_response("FINAL ANSWER: 4"))
+    assert BedrockBackend(client=bedrock_stub.client).generate("test-model", MESSAGES) == "FINAL ANSWER: 4"
+
+
+def test_slow_call_is_hedged_and_the_fast_answer_wins():
+    slow = FakeBackend("slow", text="FINAL ANSWER: slow", delay=0.5)
+    fast = FakeBackend("fast", text="FINAL ANSWER: fast")
+    backend = FailoverBackend([slow, fast], hedge_after="0.05")
+
+    start = time.perf_counter()
+    assert backend.generate("model", MESSAGES) == "FINAL ANSWER: fast"
+    assert time.perf_counter() - start < 0.4
+    stats = backend.stats()
+    assert (stats["slow"]["hedges"], stats["fast"]["hedge_wins"]) == (1, 1)
+
+
+def test_async_hedge_cancels_the_losing_request():
+    slow = FakeBackend("slow", text="FINAL ANSWER: slow", delay=5)
+    fast = FakeBackend("fast", text="FINAL ANSWER: fast")
+    backend = FailoverBackend([slow, fast], hedge_after="0.05")
+
+    start = time.perf_counter()
+    assert asyncio.run(backend.agenerate("model", MESSAGES)) == "FINAL ANSWER: fast"
+    assert time.perf_counter() - start < 1
+    assert backend.stats()["fast"]["hedge_wins"] == 1
+
+
+def test_fast_calls_are_not_hedged():
+    primary = FakeBackend("primary")
+    secondary = FakeBackend("secondary")
+    backend = FailoverBackend([primary, secondary], hedge_after="0.5")
+
+    assert backend.generate("model", MESSAGES) == "FINAL ANSWER: 4"
+    assert (primary.calls, secondary.calls) == (1, 0)
+
+
+def test_quantile_delay_applies_after_enough_samples():
+    backend = FailoverBackend([FakeBackend("primary")], hedge_after="p95")
+
+    for _ in range(llm_backend.HEDGE_MIN_SAMPLES - 1):
+        backend.generate("model", MESSAGES)
+    assert backend.hedge_delay(0) is None
+    backend.generate("model", MESSAGES)
+    assert backend.hedge_delay(0) is not None
+    assert backend.hedge_delay(0) <= max(backend._recent[0])
+
+
+def test_primary_failing_while_the_hedge_is_pending_waits_for_the_hedge():
+    primary = FakeBackend("primary", delay=0.1, error=LLMBackendError("primary", 503, "overloaded"))
+    hedge = FakeBackend("hedge", text="FINAL ANSWER: hedged", delay=0.2)
+    backend = FailoverBackend([primary, hedge], hedge_after="0.02")
+
+    assert backend.generate("model", MESSAGES) == "FINAL ANSWER: hedged"
+    stats = backend.stats()
+    assert (stats["primary"]["errors"], stats["primary"]["failovers"]) == (1, 0)
+    assert hedge.calls == 1 and stats["hedge"]["hedge_wins"] == 1
+
+
+def test_invoke_llm_manually_through_the_openai_backend(monkeypatch):
+    respond = lambda method, path, headers, body: (200, {"Content-Type": "application/json"},
+                                                   chat_completion("FINAL ANSWER: 4"))
+    with StubHTTPServer(respond) as server:
+        monkeypatch.setattr(llm_backend, "LLM_BACKENDS", "openai")
+        monkeypatch.setattr(llm_backend, "OPENAI_BASE_URL", server.url)
+        monkeypatch.setattr(llm_backend, "_backends", {})
+        message = meta_agent.invoke_llm_manually(MESSAGES, model_name="test-model", stream=False)
+
+    assert message.content == "FINAL ANSWER: 4"
+    assert len(server.requests) == 1
+    assert llm_backend.get_llm_backend_stats()["openai"]["openai"]["calls"] == 1
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from chat_agent.model_router import ModelRouter, ModelTier, RoutingRules
+
+SMALL = ModelTier("small", "small-model", 0.001, 0.002)
+LARGE = ModelTier("large", "large-model", 0.01, 0.02)
+
+TOOL_CALL = {"name": "duckduckgo_search", "args": {"query": "x"}, "id": "call_0"}
+
+# (small-tier response, escalation reason or None)
+CORPUS = [
+    (dict(content="FINAL ANSWER: 3"), None),
+    (dict(content="Thought: search first", tool_calls=[TOOL_CALL]), None),
+    (dict(content="The answer is probably 3."), "no FINAL ANSWER"),
+    (dict(content="FINAL ANSWER:   "), "empty FINAL ANSWER"),
+    (dict(content="FINAL ANSWER: Unknown"), "low-confidence FINAL ANSWER"),
+    (dict(content="final answer: I don't know the year"), "low-confidence FINAL ANSWER"),
+    (dict(content="Error: AWS Bedrock call failed: ThrottlingException"), "model call failed"),
+    (dict(content="", invalid_tool_calls=[{"name": "duckduckgo_search", "args": "{bad",
+                                           "id": "call_0", "error": "unparsable args"}]), "malformed tool call"),
+]
+
+
+class StubLLM:
+    """Answers each model with the next of its scripted responses and records the calls."""
+
+    def __init__(self, small=(), large=()):
+        self.responses = {SMALL.model_id: list(small), LARGE.model_id: list(large)}
+        self.calls = []
+
+    def invoke(self, messages, model_name, **kwargs):
+        self.calls.append(model_name)
+        return AIMessage(**self.responses[model_name].pop(0))
+
+    async def ainvoke(self, messages, model_name, **kwargs):
+        return self.invoke(messages, model_name, **kwargs)
+
+
+def make_router(llm, **rules):
+    return ModelRouter(SMALL, LARGE, RoutingRules(**rules), invoke=llm.invoke, ainvoke=llm.ainvoke)
+
+
+def conversation(question="How many albums?", tool_results=()):
+    messages = [SystemMessage(content="system"), HumanMessage(content=question)]
+    for i, result in enumerate(tool_results):
+        messages.append(AIMessage(content="", tool_calls=[{**TOOL_CALL, "id": f"call_{i}"}]))
+        messages.append(ToolMessage(content=result, tool_call_id=f"call_{i}"))
+    return messages
+
+
+@pytest.mark.parametrize("response,reason", CORPUS)
+def test_check_response_corpus(response, reason):
+    assert make_router(StubLLM()).check_response(AIMessage(**response)) == reason
+
+
+@pytest.mark.parametrize("response,reason", CORPUS)
+def test_small_responses_escalate_only_when_a_check_fails(response, reason):
+    llm = StubLLM(small=[response], large=[dict(content="FINAL ANSWER: 4")])
+    router = make_router(llm)
+
+    message = router.invoke(conversation())
+
+    if reason is None:
+        assert llm.calls == [SMALL.model_id]
+        assert message.response_metadata["model_tier"] == "small"
+    else:
+        assert llm.calls == [SMALL.model_id, LARGE.model_id]
+        assert message.content == "FINAL ANSWER: 4"
+        assert message.response_metadata["model_tier"] == "large"
+        assert router.stats()["escalations"] == {reason: 1}
+
+
+def test_missing_final_answer_is_accepted_when_not_required():
+    router = make_router(StubLLM(), require_final_answer=False)
+    assert router.check_response(AIMessage(content="The answer is 3.")) is None
+
+
+def test_long_inputs_go_straight_to_the_large_tier():
+    router = make_router(StubLLM(), max_question_chars=20, max_tool_result_chars=100)
+
+    assert router.choose_tier(conversation()) == (SMALL, None)
+    assert router.choose_tier(conversation("q" * 21))[0] is LARGE
+    assert router.choose_tier(conversation(tool_results=["x" * 60]))[0] is SMALL
+    assert router.choose_tier(conversation(tool_results=["x" * 60, "x" * 60]))[0] is LARGE
+
+
+def test_conversation_stays_on_the_large_tier_after_escalating():
+    llm = StubLLM(small=[dict(content="no answer yet")],
+                  large=[dict(content="", tool_calls=[TOOL_CALL]), dict(content="FINAL ANSWER: 4")])
+    router = make_router(llm)
+    messages = conversation()
+
+    messages.append(router.invoke(messages))
+    messages.append(ToolMessage(content="result", tool_call_id="call_0"))
+    router.invoke(messages)
+
+    assert llm.calls == [SMALL.model_id, LARGE.model_id, LARGE.model_id]
+    assert router.choose_tier(messages)[1] == "escalated earlier in this conversation"
+
+
+def test_async_invoke_escalates_like_invoke():
+    llm = StubLLM(small=[dict(content="FINAL ANSWER: not sure")], large=[dict(content="FINAL ANSWER: 4")])
+    router = make_router(llm)
+
+    message = asyncio.run(router.ainvoke(conversation()))
+
+    assert message.content == "FINAL ANSWER: 4"
+    assert llm.calls == [SMALL.model_id, LARGE.model_id]
+
+
+def test_stats_count_calls_tokens_and_cost_per_tier():
+    llm = StubLLM(small=[dict(content="FINAL ANSWER: 3"), dict(content="hmm")],
+                  large=[dict(content="FINAL ANSWER: 4")])
+    router = make_router(llm)
+
+    router.invoke(conversation())
+    router.invoke(conversation())
+    stats = router.stats()
+
+    small, large = stats["tiers"]["small"], stats["tiers"]["large"]
+    assert (small["calls"], large["calls"]) == (2, 1)
+    assert small["input_tokens"] > 0 and small["output_tokens"] > 0
+    assert small["cost"] == pytest.approx((small["input_tokens"] * 0.001 + small["output_tokens"] * 0.002) / 1000)
+    assert large["cost"] == pytest.approx((large["input_tokens"] * 0.01 + large["output_tokens"] * 0.02) / 1000)
+    assert stats["escalations"] == {"no FINAL ANSWER": 1}
@@ -0,0 +1,69 @@
+import asyncio
+import sys
+import types
+from collections import OrderedDict
+
+import pytest
+
+from tools import prefetch, registry
+
+TOOL = "Transcribe Audio"
+
+
+@pytest.fixture
+def fake_transcriber(monkeypatch):
+    """Point the transcription tool at a module answering from `outputs`; returns (outputs, calls)."""
+    outputs, calls = [], []
+
+    def transcribe(task_id):
+        calls.append(task_id)
+        return outputs.pop(0)
+
+    async def atranscribe(task_id):
+        return transcribe(task_id)
+
+    module = types.ModuleType("fake_transcriber")
+    module.transcribe, module.atranscribe = transcribe, atranscribe
+    monkeypatch.setitem(sys.modules, "fake_transcriber", module)
+    monkeypatch.setitem(registry.TOOL_SPECS, TOOL, registry.TOOL_SPECS[TOOL]._replace(
+        module="fake_transcriber", func="transcribe", coroutine="atranscribe"))
+    monkeypatch.setattr(prefetch, "_results", OrderedDict())
+    return outputs, calls
+
+
+def start_prefetch(arg):
+    prefetch._start(TOOL, arg)
+    prefetch._results[(TOOL, arg)].result(timeout=5)
+
+
+def test_prefetched_result_is_used(fake_transcriber):
+    outputs, calls = fake_transcriber
+    outputs.append("hello")
+    start_prefetch("task-1")
+
+    assert registry.lazy_tool(TOOL).func("task-1") == "hello"
+    assert calls == ["task-1"]
+
+
+@pytest.mark.parametrize("error", ["Error transcribing audio: ffmpeg exited with 1",
+                                   {"error": "download failed"}])
+def test_prefetched_error_is_retried_and_forgotten(fake_transcriber, error):
+    outputs, calls = fake_transcriber
+    outputs.extend([error, "hello", "hello again"])
+    start_prefetch("task-1")
+    tool = registry.lazy_tool(TOOL)
+
+    assert tool.func("task-1") == "hello"
+    assert tool.func("task-1") == "hello again"
+    assert calls == ["task-1"] * 3
+    assert (TOOL, "task-1") not in prefetch._results
+
+
+def test_async_prefetched_error_is_retried(fake_transcriber):
+    outputs, calls = fake_transcriber
+    outputs.extend(["Error transcribing audio: ffmpeg exited with 1", "hello"])
+    start_prefetch("task-1")
+
+    assert asyncio.run(registry.lazy_tool(TOOL).coroutine("task-1")) == "hello"
+    assert calls == ["task-1"] * 2
+    assert (TOOL, "task-1") not in prefetch._results
@@ -0,0 +1,51 @@
+import os
+
+from chat_agent.results_journal import ResultsJournal
+
+
+def answer(task_id: str, text: str = None) -> dict:
+    return {"task_id": task_id, "question": f"question {task_id}", "submitted_answer": text or f"answer {task_id}"}
+
+
+def open_journal(tmp_path) -> ResultsJournal:
+    return ResultsJournal(str(tmp_path / "output.jsonl"), legacy_path=None)
+
+
+def test_answers_follow_the_question_order(tmp_path):
+    with open_journal(tmp_path) as journal:
+        # Workers finish out of order; "old" is from an earlier run with other questions
+        for task_id in ("old", "c", "a", "b"):
+            journal.append(answer(task_id))
+        journal.append(answer("a", "corrected"))
+
+        assert [a["task_id"] for a in journal.answers()] == ["old", "c", "a", "b"]
+        ordered = journal.answers(["a", "b", "c"])
+        assert [a["task_id"] for a in ordered] == ["a", "b", "c", "old"]
+        assert ordered[0]["submitted_answer"] == "corrected"
+
+
+def test_reopened_journal_resumes_and_drops_a_partial_line(tmp_path):
+    with open_journal(tmp_path) as journal:
+        journal.append(answer("a"))
+        journal.append(answer("b"))
+    with open(tmp_path / "output.jsonl", "ab") as f:
+        f.write(b'{"task_id": "c", "question"')  # crash mid-write
+
+    with open_journal(tmp_path) as journal:
+        assert journal.task_ids() == {"a", "b"}
+        journal.append(answer("c"))
+    with open_journal(tmp_path) as journal:
+        assert [a["task_id"] for a in journal.answers()] == ["a", "b", "c"]
+
+
+def test_close_is_idempotent_and_releases_the_file(tmp_path):
+    journal = open_journal(tmp_path)
+    fd = journal._fd
+    with journal:
+        pass
+    journal.close()
+    try:
+        os.fstat(fd)
+        assert False, "journal file descriptor still open"
+    except OSError:
+        pass
@@ -0,0 +1,32 @@
+from langchain_core.messages import HumanMessage
+
+from chat_agent import completion_cache, meta_agent
+from chat_agent.completion_cache import CompletionCache
+from tests.stubs import FakeStreamingClient
+
+PIECES = ["Let me search.\n<tool_", "call>\nname=duckduckgo_search\nargs={\"query\": \"x\"}\n</tool_call>",
+          "\nUser: an invented tool result", "\nFINAL ANSWER: made up"]
+
+
+def generate(client, stream):
+    return meta_agent.invoke_bedrock_directly(client, "test-model", [HumanMessage(content="q", id="q")],
+                                              stream=stream)
+
+
+def test_stream_stops_after_the_first_tool_call():
+    client = FakeStreamingClient(PIECES)
+    text = generate(client, stream=True)
+    assert text.endswith("</tool_call>")
+    assert "invented" not in text
+
+
+def test_truncated_stream_is_not_served_to_a_full_call(monkeypatch, tmp_path):
+    monkeypatch.setattr(completion_cache, "_cache", CompletionCache(str(tmp_path / "c.sqlite"), mode="on"))
+    client = FakeStreamingClient(PIECES)
+
+    assert generate(client, stream=True).endswith("</tool_call>")
+    assert generate(client, stream=False) == "".join(PIECES)
+    # Each mode is then served from its own cache entry
+    assert generate(client, stream=True).endswith("</tool_call>")
+    assert generate(client, stream=False) == "".join(PIECES)
+    assert client.calls == ["stream", "invoke"]
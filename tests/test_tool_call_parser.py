@@ -0,0 +1,86 @@
+import os
+import random
+
+import pytest
+
+from chat_agent.tool_call_parser import ParsedToolCall, ToolCallError, ToolCallParser, parse_tool_calls
+
+SAMPLE_OUTPUT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_outputs",
+                             "output_working_custom_mistral.txt")
+
+# (model output, expected calls, expected number of errors)
+CORPUS = [
+    ('<tool_call>\nname=duckduckgo_search\nargs={"query": "Mercedes Sosa albums"}\n</tool_call>',
+     [("duckduckgo_search", {"query": "Mercedes Sosa albums"})], 0),
+    ("<tool_call>\nname=file_downloader\nargs={'task_id': 'cca530fc'}\n</tool_call>",
+     [("file_downloader", {"task_id": "cca530fc"})], 0),
+    ("<tool_call>\nname: \"board_to_fen\"\nargs: {'task_id': 'x', 'flip': true, 'hint': null}\n</tool_call>",
+     [("board_to_fen", {"task_id": "x", "flip": True, "hint": None})], 0),
+    ('<tool_call>\nname=duckduckgo_search\nargs={"query": "a {braced} \\"quoted\\" query"} trailing junk\n</tool_call>',
+     [("duckduckgo_search", {"query": 'a {braced} "quoted" query'})], 0),
+    ('Thought.\n<tool_call>\nname=a\nargs={"q": 1}\n</tool_call>\nMore.\n<tool_call>\nname=b\nargs={"q": 2}\n</tool_call>',
+     [("a", {"q": 1}), ("b", {"q": 2})], 0),
+    ("<tool_call>\nargs={\"query\": \"x\"}\n</tool_call>", [], 1),
+    ("<tool_call>\nname=duckduckgo_search\n</tool_call>", [], 1),
+    ("<tool_call>\nname=duckduckgo_search\nargs={\"query\": \"x\"\n</tool_call>", [], 1),
+    ("<tool_call>\nname=duckduckgo_search\nargs=[\"x\"]\n</tool_call>", [], 1),
+    ("<tool_call>\nname=duckduckgo_search\nargs={\"query\": \"never closed\"}", [], 1),
+    ("<tool_call>\nname=x\nargs={[1]: 2}\n</tool_call>", [], 1),
+    ("<tool_call>\nname=x\nargs=" + '{"a": ' * 2000 + "1" + "}" * 2000 + "\n</tool_call>", [], 1),
+    ("FINAL ANSWER: 3", [], 0),
+]
+
+
+@pytest.mark.parametrize("text,expected_calls,expected_errors", CORPUS)
+def test_corpus(text, expected_calls, expected_errors):
+    calls, errors = parse_tool_calls(text)
+    assert [(call.name, call.args) for call in calls] == expected_calls
+    assert len(errors) == expected_errors
+    assert all(error.error for error in errors)
+
+
+def long_generations():
+    """Corpus entries embedded in a long real model output."""
+    with open(SAMPLE_OUTPUT, "r") as f:
+        filler = f.read()
+    for text, _, _ in CORPUS:
+        yield f"{filler[:5000]}\n{text}\n{filler[5000:]}"
+
+
+def chunked(text: str, rng: random.Random) -> list:
+    parser = ToolCallParser()
+    results = []
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 40)
+        results.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    return results + parser.finish()
+
+
+def test_streamed_chunks_parse_like_the_whole_text():
+    rng = random.Random(0)
+    for text in long_generations():
+        parser = ToolCallParser()
+        whole = parser.feed(text) + parser.finish()
+        for _ in range(20):
+            assert chunked(text, rng) == whole
+
+
+# literal_eval warns about the invalid escapes the mutations create
+@pytest.mark.filterwarnings("ignore::DeprecationWarning", "ignore::SyntaxWarning")
+def test_mutated_outputs_never_raise():
+    rng = random.Random(1)
+    alphabet = "{}[]'\"\\:=,\n <>/tool_callnameargs"
+    for _ in range(3000):
+        text, _, _ = rng.choice(CORPUS)
+        chars = list(text)
+        for _ in range(rng.randint(1, 8)):
+            position = rng.randrange(len(chars) + 1)
+            if rng.random() < 0.5 and chars:
+                del chars[min(position, len(chars) - 1)]
+            else:
+                chars.insert(position, rng.choice(alphabet))
+        calls, errors = parse_tool_calls("".join(chars))
+        assert all(isinstance(call, ParsedToolCall) and isinstance(call.args, dict) for call in calls)
+        assert all(isinstance(error, ToolCallError) for error in errors)
@@ -0,0 +1,138 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import Tool
+
+from chat_agent.tool_executor import ParallelToolNode
+
+
+def make_node(calls):
+    def web_search(query):
+        calls.append(("web_search", query))
+        return f"SEARCH RESULT for {query}"
+
+    def file_downloader(task_id):
+        calls.append(("file_downloader", task_id))
+        return {"file_type": "text", "content": f"FILE {task_id}"}
+
+    def transcribe(task_id):
+        calls.append(("transcribe", task_id))
+        return "Error transcribing audio: decoder busy"
+
+    return ParallelToolNode([
+        Tool(name="web_search", func=web_search, description="search"),
+        Tool(name="file_downloader", func=file_downloader, description="download"),
+        Tool(name="transcribe", func=transcribe, description="transcribe"),
+    ])
+
+
+def turn(name, arg):
+    # _build_ai_message numbers tool calls from call_0 on every turn
+    return AIMessage(content="", tool_calls=[{"name": name, "args": {"__arg1": arg}, "id": "call_0"}])
+
+
+def run_turns(node, turns):
+    messages = [HumanMessage(content="question")]
+    for name, arg in turns:
+        messages.append(turn(name, arg))
+        messages.extend(node({"messages": messages})["messages"])
+    return messages
+
+
+def test_memo_matches_results_to_their_own_turn():
+    calls = []
+    node = make_node(calls)
+    messages = run_turns(node, [("web_search", "X"), ("file_downloader", "T"), ("file_downloader", "T")])
+
+    last = messages[-1]
+    assert isinstance(last, ToolMessage)
+    assert "FILE T" in last.content
+    assert "SEARCH RESULT" not in last.content
+    assert "already called" in last.content
+    assert calls == [("web_search", "X"), ("file_downloader", "T")]
+
+
+def test_error_results_are_not_memoized():
+    calls = []
+    node = make_node(calls)
+    messages = run_turns(node, [("transcribe", "A"), ("transcribe", "A")])
+
+    assert messages[2].status == "error"
+    assert messages[-1].status == "error"
+    assert "already called" not in messages[-1].content
+    assert calls == [("transcribe", "A"), ("transcribe", "A")]
+
+
+def test_queued_calls_do_not_time_out_or_block_other_tools(monkeypatch):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from chat_agent import tool_executor
+
+    monkeypatch.setattr(tool_executor, "_executor", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(tool_executor, "_tool_gates", {})
+    finished = {}
+
+    def slow(task_id):
+        time.sleep(0.3)
+        finished[task_id] = time.monotonic()
+        return f"slow {task_id}"
+
+    def fast(query):
+        finished[query] = time.monotonic()
+        return f"fast {query}"
+
+    node = ParallelToolNode(
+        [Tool(name="slow", func=slow, description="slow"), Tool(name="fast", func=fast, description="fast")],
+        concurrency_limits={"slow": 1},
+        timeout=0.5,
+    )
+    tool_calls = [{"name": "slow", "args": {"__arg1": str(i)}, "id": f"call_{i}"} for i in range(3)]
+    tool_calls.append({"name": "fast", "args": {"__arg1": "q"}, "id": "call_3"})
+    start = time.monotonic()
+    outputs = node({"messages": [AIMessage(content="", tool_calls=tool_calls)]})["messages"]
+
+    # Each slow call runs 0.3s of its 0.5s budget; waiting for the slot is not counted
+    assert [message.status for message in outputs] == ["success"] * 4
+    # The slow calls queue in the gate, not in the two pool threads
+    assert finished["q"] - start < 0.2
+
+
+def test_async_calls_share_the_tool_limit_with_prefetches(monkeypatch):
+    import asyncio
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from chat_agent import tool_executor
+
+    monkeypatch.setattr(tool_executor, "_executor", ThreadPoolExecutor(max_workers=4))
+    monkeypatch.setattr(tool_executor, "_tool_gates", {})
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def transcribe(task_id):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.2)
+        with lock:
+            running["now"] -= 1
+        return f"transcript {task_id}"
+
+    async def search(query):
+        return f"SEARCH RESULT for {query}"
+
+    node = ParallelToolNode(
+        [Tool(name="transcribe", func=transcribe, description="transcribe"),
+         Tool(name="web_search", func=None, coroutine=search, description="search")],
+        concurrency_limits={"transcribe": 1},
+        timeout=0.3,
+    )
+    # A prefetch holds the single slot when the agent's calls arrive
+    prefetch = tool_executor.get_tool_gate("transcribe", 1).submit(tool_executor._get_executor(), transcribe, "P")
+    tool_calls = [{"name": "transcribe", "args": {"__arg1": str(i)}, "id": f"call_{i}"} for i in range(2)]
+    tool_calls.append({"name": "web_search", "args": {"__arg1": "q"}, "id": "call_2"})
+    outputs = asyncio.run(node.acall({"messages": [AIMessage(content="", tool_calls=tool_calls)]}))["messages"]
+
+    assert prefetch.result() == "transcript P"
+    assert running["max"] == 1
+    # Each call waits up to 0.4s for the slot but runs 0.2s of its 0.3s budget
+    assert [message.status for message in outputs] == ["success"] * 3
+    assert [message.content for message in outputs] == ["transcript 0", "transcript 1", "SEARCH RESULT for q"]
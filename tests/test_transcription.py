@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from tools import transcribe_audio, youtube
+
+needs_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+# The repository only carries the model's small files; the acoustic model is downloaded separately
+needs_vosk_model = pytest.mark.skipif(
+    not os.path.isfile(os.path.join(transcribe_audio.VOSK_MODEL_PATH, "am", "final.mdl")),
+    reason="Vosk model not found at VOSK_MODEL_PATH")
+
+
+class FakeRecognizer:
+    """Emits a result for the first chunk and keeps the last words for FinalResult()."""
+
+    def __init__(self):
+        self.received = 0
+
+    def AcceptWaveform(self, data):
+        self.received += len(data)
+        return self.received == len(data)
+
+    def Result(self):
+        return json.dumps({"text": "hello"})
+
+    def FinalResult(self):
+        return json.dumps({"text": "world"})
+
+
+@pytest.fixture
+def fake_recognizer(monkeypatch):
+    recognizer = FakeRecognizer()
+    monkeypatch.setattr(transcribe_audio, "acquire_recognizer", lambda: recognizer)
+    monkeypatch.setattr(transcribe_audio, "release_recognizer", lambda recognizer: None)
+    return recognizer
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    """One second of tone in an .m4a container, like a YouTube audio-only stream."""
+    path = tmp_path / "clip.m4a"
+    subprocess.run(["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+                    "-c:a", "aac", str(path)], check=True)
+    return path
+
+
+def test_trailing_speech_from_final_result_is_kept(fake_recognizer):
+    assert transcribe_audio.transcribe_pcm_stream([b"\0" * 8000] * 3) == {"transcription": "hello world"}
+
+
+@needs_ffmpeg
+def test_local_media_file_is_piped_through_ffmpeg(fake_recognizer, media_file):
+    assert transcribe_audio.transcribe_audio_from_path(str(media_file)) == {"transcription": "hello world"}
+    # One second of 16 kHz mono 16-bit PCM, give or take the encoder's padding
+    assert abs(fake_recognizer.received - transcribe_audio.SAMPLE_RATE * 2) < 4096
+
+
+@needs_ffmpeg
+def test_undecodable_file_is_reported(fake_recognizer, tmp_path):
+    path = tmp_path / "broken.m4a"
+    path.write_bytes(b"not audio")
+    with pytest.raises(RuntimeError, match="ffmpeg failed to decode audio"):
+        transcribe_audio.transcribe_audio_from_path(str(path))
+
+
+@needs_ffmpeg
+@needs_vosk_model
+def test_youtube_processor_transcribes_the_downloaded_file(monkeypatch, media_file):
+    def download(url, directory):
+        return shutil.copy(media_file, directory)
+    monkeypatch.setattr(youtube, "download_youtube_audio", download)
+
+    result = youtube.youtube_processor("https://www.youtube.com/watch?v=local")
+
+    assert "error" not in result
+    assert isinstance(result["transcription"], str)
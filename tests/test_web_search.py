@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from tools import web_search
+from tools.web_search import CachedSearch, SearchCache, SearchRateLimited
+
+
+class StubBackend:
+    """Search backend stand-in: optional delay, optional rate-limit errors first."""
+
+    def __init__(self, delay: float = 0.0, rate_limited: int = 0):
+        self.delay = delay
+        self.rate_limited = rate_limited
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str) -> str:
+        with self._lock:
+            self.queries.append(query)
+            limited = len(self.queries) <= self.rate_limited
+        time.sleep(self.delay)
+        if limited:
+            raise RuntimeError("https://duckduckgo.com 202 Ratelimit")
+        return f"results for {query}"
+
+
+def cached_search(tmp_path, backend, **kwargs) -> CachedSearch:
+    return CachedSearch(backend=backend, cache=SearchCache(str(tmp_path / "search.sqlite")), **kwargs)
+
+
+def test_near_identical_queries_share_one_cached_result(tmp_path):
+    backend = StubBackend()
+    search = cached_search(tmp_path, backend)
+    assert search.search("Mercedes Sosa albums") == "results for Mercedes Sosa albums"
+    assert search.search("  mercedes   SOSA albums?") == "results for Mercedes Sosa albums"
+    assert backend.queries == ["Mercedes Sosa albums"]
+    assert search.stats["hits"] == 1
+
+
+def test_concurrent_identical_queries_are_coalesced(tmp_path):
+    backend = StubBackend(delay=0.2)
+    search = cached_search(tmp_path, backend)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(search.search("same query"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["results for same query"] * 5
+    assert len(backend.queries) == 1
+
+
+def test_rate_limits_back_off_then_retry(tmp_path):
+    backend = StubBackend(rate_limited=2)
+    search = cached_search(tmp_path, backend, backoff_base=0.01)
+    assert search.search("q") == "results for q"
+    assert search.stats["rate_limited"] == 2
+
+    stuck = cached_search(tmp_path, StubBackend(rate_limited=10), max_retries=1, backoff_base=0.01)
+    with pytest.raises(SearchRateLimited):
+        stuck.search("other")
+
+
+def test_searches_are_unthrottled_by_default(tmp_path):
+    assert web_search.SEARCH_MAX_CALLS_PER_MINUTE == 0
+    search = cached_search(tmp_path, StubBackend())
+    start = time.monotonic()
+    for i in range(30):
+        search.search(f"query {i}")
+    assert time.monotonic() - start < 1.0
@@ -0,0 +1,17 @@
+from tests.stubs import echo_warm_up
+from worker_pool import WorkerPool
+
+
+def test_answers_of_retiring_workers_are_delivered():
+    pool = WorkerPool(workers=2, preload=[], max_tasks=1, warm_up=echo_warm_up)
+    answers = []
+    pool.start()
+    for i in range(12):
+        assert pool.submit({"task_id": f"task-{i}", "question": f"question {i}"}, answers.append)
+    pool.drain()
+    pool.run()
+
+    assert sorted(answer["task_id"] for answer in answers) == sorted(f"task-{i}" for i in range(12))
+    assert [answer for answer in answers if "error" in answer] == []
+    assert all(answer["submitted_answer"] == f"echo: {answer['question']}" for answer in answers)
+    assert pool.stats["answered"] == 12
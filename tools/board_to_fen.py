@@ -1,6 +1,146 @@
-from board_to_fen.predict import get_fen_from_image
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from importlib import resources
+
+import numpy as np
+from board_to_fen import saved_models
+from board_to_fen.utils import Decoder_FEN, Tiler
 from langchain.tools import Tool
-from tools.file_downloader import get_task_file
+from tools.registry import tool_description
+from tools.file_downloader import aget_task_file, get_task_file
+from tools.utils.histogram import Histogram
+
+# Max boards (64 squares each) classified in one forward pass
+FEN_BATCH_MAX_BOARDS = int(os.getenv("FEN_BATCH_MAX_BOARDS", "8"))
+# How long the batcher waits for more boards after the first one arrives
+FEN_BATCH_WAIT_SECONDS = float(os.getenv("FEN_BATCH_WAIT_MS", "5")) / 1000
+SQUARE_SIZE = 50
+# Output classes of board_to_fen's model, in the order of its softmax
+SQUARE_CATEGORIES = ["bishop_black", "bishop_white", "empty", "king_black", "king_white", "knight_black",
+                     "knight_white", "pawn_black", "pawn_white", "queen_black", "queen_white", "rook_black",
+                     "rook_white"]
+
+_model = None
+_model_lock = threading.Lock()
+_batcher = None
+_batcher_lock = threading.Lock()
+
+_load_seconds = Histogram([0.5, 1, 2, 5, 10, 30])
+_board_latency = Histogram([0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5])
+_batch_boards = Histogram([1, 2, 4, 8, 16, 32])
+
+def get_fen_model():
+    """Return the process-wide board_to_fen Keras model, loading and warming it up on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from keras import models
+                start = time.perf_counter()
+                with resources.as_file(resources.files(saved_models) / "november_model") as model_path:
+                    model = models.load_model(str(model_path))
+                # The first call builds the predict function; do it before any request waits on it
+                model.predict_on_batch(np.zeros((1, SQUARE_SIZE, SQUARE_SIZE, 3), dtype=np.float32))
+                elapsed = time.perf_counter() - start
+                _load_seconds.observe(elapsed)
+                print(f"Loaded board_to_fen model in {elapsed:.2f}s")
+                _model = model
+    return _model
+
+def preload_fen_model():
+    """Load the FEN classifier eagerly, e.g. at worker startup, so the first board is not slowed down."""
+    get_fen_model()
+
+def board_tiles(image) -> np.ndarray:
+    """Split a board image into its 64 squares as a (64, 50, 50, 3) array, rank 8 first."""
+    tiles = Tiler().get_tiles(img=image)
+    return np.stack([np.asarray(tile) for tile in tiles])
+
+
+class FenBatcher:
+    """
+    Groups the squares of boards submitted from concurrent requests into one
+    forward pass of the shared model.
+
+    A single thread owns the model: it takes the first queued board, waits up to
+    `max_wait` for more (at most `max_boards`), and resolves each board's future with
+    its 64 square labels.
+    """
+
+    def __init__(self, max_boards: int = FEN_BATCH_MAX_BOARDS, max_wait: float = FEN_BATCH_WAIT_SECONDS):
+        self.max_boards = max(1, max_boards)
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="fen-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, tiles: np.ndarray) -> Future:
+        """Queue one board's (64, 50, 50, 3) tiles; the future resolves to its square labels."""
+        future = Future()
+        self._queue.put((tiles, future, time.perf_counter()))
+        return future
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_boards:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                model = get_fen_model()
+                probabilities = model.predict_on_batch(np.concatenate([tiles for tiles, _, _ in batch]))
+                labels = [SQUARE_CATEGORIES[i] for i in np.argmax(probabilities, axis=1)]
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            _batch_boards.observe(len(batch))
+            offset = 0
+            for tiles, future, submitted in batch:
+                future.set_result(labels[offset:offset + len(tiles)])
+                offset += len(tiles)
+                _board_latency.observe(time.perf_counter() - submitted)
+
+
+def get_fen_batcher() -> FenBatcher:
+    """Return the process-wide FenBatcher, starting its thread on first use."""
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = FenBatcher()
+    return _batcher
+
+def get_fen_metrics() -> dict:
+    """Return histograms of model load time, per-board latency (seconds) and boards per batch."""
+    return {
+        "load_seconds": _load_seconds.snapshot(),
+        "board_latency_seconds": _board_latency.snapshot(),
+        "batch_boards": _batch_boards.snapshot(),
+    }
+
+def fen_from_image(image, end_of_row='/', black_view=False) -> str:
+    """Same result as board_to_fen.predict.get_fen_from_image, using the shared model and batcher."""
+    squares = get_fen_batcher().submit(board_tiles(image)).result()
+    return Decoder_FEN().fen_decode(squares=squares, end_of_row=end_of_row, black_view=black_view)
+
+async def afen_from_image(image, end_of_row='/', black_view=False) -> str:
+    """Async variant of fen_from_image(); waits for the batch without blocking the event loop."""
+    tiles = await asyncio.to_thread(board_tiles, image)
+    squares = await asyncio.wrap_future(get_fen_batcher().submit(tiles))
+    return Decoder_FEN().fen_decode(squares=squares, end_of_row=end_of_row, black_view=black_view)
 
 def board_to_fen(task_id: str):
     """
@@ -18,12 +158,21 @@ def board_to_fen(task_id: str):
     # Check if we got a valid image
     if result.get('file_type') == 'png' and 'content' in result:
         img = result['content']  # This should be a PIL Image object
-        return get_fen_from_image(img)
+        return fen_from_image(img)
+    else:
+        return f"Error: Could not process image for task {task_id}. File type: {result.get('file_type')}. Stop processing immediately and report an error."
+
+async def aboard_to_fen(task_id: str):
+    """Async variant of board_to_fen()."""
+    result = await aget_task_file(task_id)
+    if result.get('file_type') == 'png' and 'content' in result:
+        return await afen_from_image(result['content'])
     else:
         return f"Error: Could not process image for task {task_id}. File type: {result.get('file_type')}. Stop processing immediately and report an error."
 
 board_to_fen_tool = Tool(
     name="board_to_fen",
     func=board_to_fen,
-    description="Converts a chessboard image to a FEN string. Provide the task_id to analyze the chess position. Do NOT use the file_downloader tool before this one."
+    coroutine=aboard_to_fen,
+    description=tool_description("board_to_fen")
 )
\ No newline at end of file
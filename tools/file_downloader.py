@@ -1,12 +1,13 @@
+import asyncio
 import requests
 import os
 import json
-import io
 import pandas as pd
 from enum import Enum
 from typing import Dict, Any
-from tools.utils.file_api_handler import download_task_file
+from tools.utils.file_api_handler import adownload_task_file_to_path, download_task_file_to_path
 from langchain.tools import Tool
+from tools.registry import tool_description
 from PIL import Image
 
 class FileType(Enum):
@@ -32,10 +33,18 @@ def get_task_file(task_id: str) -> Dict[str, Any]:
         - content_type: The content-type of the file
         - filename: The original filename of the downloaded file
     """
-    
+    # Get filename and the path of the cached file; the content is read from disk as needed
+    return load_task_file(task_id, download_task_file_to_path(task_id))
+
+async def aget_task_file(task_id: str) -> Dict[str, Any]:
+    """Async variant of get_task_file(): downloads with async HTTP and parses the file in a worker thread."""
+    download_result = await adownload_task_file_to_path(task_id)
+    return await asyncio.to_thread(load_task_file, task_id, download_result)
+
+def load_task_file(task_id: str, download_result) -> Dict[str, Any]:
+    """Parse a downloaded task file, given the (filename, path) returned by the download helpers."""
     try:
-        # Get filename and file content from download_task_file
-        filename, file_content = download_task_file(task_id)
+        filename, file_path = download_result
         
         # Determine file type from filename extension
         file_extension = os.path.splitext(filename)[1].lower() if filename else ''
@@ -62,32 +71,35 @@ def get_task_file(task_id: str) -> Dict[str, Any]:
         # Process content based on file type
         if file_type == FileType.JSON:
             try:
-                content = json.loads(file_content.decode('utf-8'))
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = json.load(f)
             except (UnicodeDecodeError, json.JSONDecodeError):
                 # If decoding as JSON fails, treat as binary
-                content = file_content
+                content = "This type of file format is not supported."
                 file_type = FileType.BINARY
         elif file_type == FileType.EXCEL:
             # For Excel files, use pandas to read the data
             try:
-                excel_file = io.BytesIO(file_content)
-                content = pd.read_excel(excel_file)
+                content = pd.read_excel(file_path)
             except Exception as e:
                 print(f"Error parsing Excel file: {e}")
                 # If parsing as Excel fails, treat as binary
-                content = file_content
+                content = "This type of file format is not supported."
                 file_type = FileType.BINARY
         elif file_type == FileType.PNG:
-            content = Image.open(io.BytesIO(file_content))
+            # Opening by path lets PIL close the file once the pixels are loaded
+            content = Image.open(file_path)
+            content.load()
         elif file_type == FileType.MP3:
-            content = file_content
+            content = file_path
         elif file_type in [FileType.PYTHON, FileType.TEXT, FileType.CSV]:
             # For text-based files, return the string representation
             try:
-                content = file_content.decode('utf-8')
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
             except UnicodeDecodeError:
                 # If decoding as text fails, treat as binary
-                content = file_content
+                content = "This type of file format is not supported."
                 file_type = FileType.BINARY
         else:
             content = "This type of file format is not supported."
@@ -124,6 +136,6 @@ def get_task_file(task_id: str) -> Dict[str, Any]:
 file_downloader_tool = Tool(
     name="file_downloader",
     func=get_task_file,
-    description="Downloads a file associated with a task ID and returns its contents. IMPORTANT: You must use the exact task_id provided in the question (e.g., 'cca530fc-4052-43b2-b130-b30968d8aa44'). Do not make up or guess a task_id. Works for files of type: text, json, python, csv, excel. Do NOT use for audio, images, or videos including YouTube."
-    # ALWAYS USE THIS TOOL FIRST when a question mentions any file or external resource. 
+    coroutine=aget_task_file,
+    description=tool_description("file_downloader"),
 )
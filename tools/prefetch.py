@@ -0,0 +1,138 @@
+import importlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_agent.tool_executor import get_tool_gate
+from tools.utils.histogram import Histogram
+
+# Set TOOL_PREFETCH=0 to disable speculative attachment processing
+TOOL_PREFETCH = os.getenv("TOOL_PREFETCH", "1") != "0"
+PREFETCH_MAX_WORKERS = int(os.getenv("PREFETCH_MAX_WORKERS", "2"))
+# Prefetched results kept for tool calls that have not arrived yet
+MAX_PREFETCHED_RESULTS = 64
+
+_YOUTUBE_URL_RE = re.compile(r"https?://(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)[\w-]+")
+# Attachment extension -> tool the model will call for it
+_ATTACHMENT_TOOLS = {
+    ".mp3": "Transcribe Audio",
+    ".py": "file_downloader",
+    ".xlsx": "file_downloader",
+    ".xls": "file_downloader",
+    ".csv": "file_downloader",
+    ".json": "file_downloader",
+    ".txt": "file_downloader",
+    ".md": "file_downloader",
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+_first_tool_result = {
+    True: Histogram([0.5, 1, 2, 5, 10, 20, 40, 80]),
+    False: Histogram([0.5, 1, 2, 5, 10, 20, 40, 80]),
+}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PREFETCH_MAX_WORKERS, thread_name_prefix="prefetch")
+    return _executor
+
+
+def _call_tool(tool_name: str, arg):
+    from tools.registry import TOOL_SPECS
+    spec = TOOL_SPECS[tool_name]
+    start = time.perf_counter()
+    result = getattr(importlib.import_module(spec.module), spec.func)(arg)
+    print(f"Prefetched {tool_name}({arg!r}) in {time.perf_counter() - start:.1f}s")
+    return result
+
+
+def _start(tool_name: str, arg):
+    key = (tool_name, arg)
+    with _results_lock:
+        if key in _results:
+            return
+        # Same per-tool limit as the agent's calls, so prefetched transcriptions do not
+        # run on top of a full set of agent ones
+        _results[key] = get_tool_gate(tool_name).submit(_get_executor(), _call_tool, tool_name, arg)
+        while len(_results) > MAX_PREFETCHED_RESULTS:
+            _results.popitem(last=False)
+
+
+def _prefetch_attachment(question: str, task_id: str):
+    from tools.utils.file_api_handler import download_task_file_to_path
+    # Downloading also warms the file cache for whichever tool ends up reading it
+    filename, _ = download_task_file_to_path(task_id)
+    extension = os.path.splitext(filename or "")[1].lower()
+    tool_name = _ATTACHMENT_TOOLS.get(extension)
+    if extension == ".png" and "chess" in question.lower():
+        tool_name = "board_to_fen"
+    if tool_name:
+        _start(tool_name, task_id)
+
+
+def prefetch(question: str, task_id: str = None) -> bool:
+    """
+    Start downloading and preprocessing what the question will most likely ask a tool for.
+
+    The attachment of `task_id` is downloaded, then transcribed (.mp3), run through the
+    FEN classifier (.png chess boards) or parsed (.py, .xlsx, .csv...); YouTube URLs in
+    the question are transcribed. Work runs on a small background pool.
+
+    Returns:
+        True if anything was started.
+    """
+    if not TOOL_PREFETCH:
+        return False
+    started = False
+    if task_id:
+        _get_executor().submit(_prefetch_attachment, question, task_id)
+        started = True
+    for url in _YOUTUBE_URL_RE.findall(question or ""):
+        _start("youtube_processor", url)
+        started = True
+    return started
+
+
+def take_prefetched(tool_name: str, arg):
+    """
+    Return the Future of a prefetch for this tool call, or None.
+
+    A prefetch still queued for a slot of the tool's concurrency limit is cancelled and
+    None returned: the calling tool may hold that slot, and would wait on it forever.
+    """
+    with _results_lock:
+        future = _results.get((tool_name, arg))
+    if future is not None and future.cancel():
+        return None
+    return future
+
+
+def drop_prefetched(tool_name: str, arg, future):
+    """Forget a failed prefetch, so the next call for it runs the tool."""
+    with _results_lock:
+        if _results.get((tool_name, arg)) is future:
+            del _results[(tool_name, arg)]
+
+
+def record_first_tool_result(seconds: float, prefetched: bool):
+    """Record the time from a question's arrival to its first tool result."""
+    _first_tool_result[prefetched].observe(seconds)
+
+
+def get_prefetch_metrics() -> dict:
+    """Time-to-first-tool-result histograms for questions with and without a prefetch."""
+    return {
+        "with_prefetch": _first_tool_result[True].snapshot(),
+        "without_prefetch": _first_tool_result[False].snapshot(),
+    }
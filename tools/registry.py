@@ -0,0 +1,112 @@
+import asyncio
+import importlib
+from typing import NamedTuple
+
+from langchain.tools import Tool
+
+from chat_agent.tool_executor import is_error_output
+from tools.prefetch import drop_prefetched, take_prefetched
+
+
+class ToolSpec(NamedTuple):
+    name: str
+    module: str
+    func: str
+    coroutine: str
+    description: str
+
+
+# Tool name, where its implementation lives and what the model is told about it.
+# Only this table is imported at startup; a tool's module (and its TensorFlow, Vosk,
+# yt-dlp, pandas... dependencies) is imported the first time the tool is called.
+TOOL_SPECS = {spec.name: spec for spec in (
+    ToolSpec(
+        name="duckduckgo_search",
+        module="tools.web_search",
+        func="web_search",
+        coroutine="aweb_search",
+        # Same description as DuckDuckGoSearchRun, so prompts are unchanged
+        description="A wrapper around DuckDuckGo Search. Useful for when you need to answer questions about current events. Input should be a search query.",
+    ),
+    ToolSpec(
+        name="file_downloader",
+        module="tools.file_downloader",
+        func="get_task_file",
+        coroutine="aget_task_file",
+        description="Downloads a file associated with a task ID and returns its contents. IMPORTANT: You must use the exact task_id provided in the question (e.g., 'cca530fc-4052-43b2-b130-b30968d8aa44'). Do not make up or guess a task_id. Works for files of type: text, json, python, csv, excel. Do NOT use for audio, images, or videos including YouTube.",
+        # ALWAYS USE THIS TOOL FIRST when a question mentions any file or external resource.
+    ),
+    ToolSpec(
+        name="board_to_fen",
+        module="tools.board_to_fen",
+        func="board_to_fen",
+        coroutine="aboard_to_fen",
+        description="Converts a chessboard image to a FEN string. Provide the task_id to analyze the chess position. Do NOT use the file_downloader tool before this one.",
+    ),
+    ToolSpec(
+        name="Transcribe Audio",
+        module="tools.transcribe_audio",
+        func="transcribe_audio_from_task",
+        coroutine="atranscribe_audio_from_task",
+        description="Transcribe text from an audio file. Provide the task_id to analyze the audio. Do NOT use the file_downloader tool before this one.",
+    ),
+    ToolSpec(
+        name="youtube_processor",
+        module="tools.youtube",
+        func="youtube_processor",
+        coroutine="ayoutube_processor",
+        description="Extract and transcribe the audio from a YouTube video. Provide the URL to analyze the YouTube link (e.g. https://www.youtube.com/watch?v=...). Use this tool when the quesiton calls for processing YouTube videos and urls.",
+    ),
+)}
+
+
+def tool_description(name: str) -> str:
+    return TOOL_SPECS[name].description
+
+
+def lazy_tool(name: str) -> Tool:
+    """
+    Return a Tool for `name` that imports its implementation on first invocation.
+
+    Args:
+        name: A key of TOOL_SPECS
+
+    Returns:
+        A Tool with the same name, description and sync/async behaviour as the eager one.
+        A call whose result was already started by tools.prefetch waits for that instead,
+        unless the prefetch failed or returned an error.
+    """
+    spec = TOOL_SPECS[name]
+
+    def prefetched(args, kwargs):
+        return take_prefetched(name, args[0]) if len(args) == 1 and not kwargs else None
+
+    def func(*args, **kwargs):
+        if (future := prefetched(args, kwargs)) is not None:
+            try:
+                result = future.result()
+                if not is_error_output(result):
+                    return result
+            except Exception:
+                pass
+            # A failed prefetch is dropped and retried as a normal call
+            drop_prefetched(name, args[0], future)
+        return getattr(importlib.import_module(spec.module), spec.func)(*args, **kwargs)
+
+    async def coroutine(*args, **kwargs):
+        if (future := prefetched(args, kwargs)) is not None:
+            try:
+                result = await asyncio.wrap_future(future)
+                if not is_error_output(result):
+                    return result
+            except Exception:
+                pass
+            drop_prefetched(name, args[0], future)
+        return await getattr(importlib.import_module(spec.module), spec.coroutine)(*args, **kwargs)
+
+    return Tool(name=spec.name, func=func, coroutine=coroutine, description=spec.description)
+
+
+def get_lazy_tools(names=None) -> list:
+    """Return lazy Tools for `names` (default: every registered tool, in registry order)."""
+    return [lazy_tool(name) for name in (TOOL_SPECS if names is None else names)]
@@ -1,53 +1,175 @@
-import wave
+import asyncio
 import json
+import os
+import queue
+import subprocess
+import threading
+import time
 import numpy as np
 from vosk import Model, KaldiRecognizer
-from pydub import AudioSegment
-from io import BytesIO
 from langchain.tools import Tool
-from tools.utils.file_api_handler import download_task_file
+from tools.registry import tool_description
+from tools.utils.file_api_handler import adownload_task_file_to_path, download_task_file_to_path
+
+VOSK_MODEL_PATH = os.getenv("VOSK_MODEL_PATH", "model/vosk-model-small-en-us-0.15")
+SAMPLE_RATE = 16000
+# Max idle recognizers kept for reuse; more can be created under load
+RECOGNIZER_POOL_SIZE = int(os.getenv("VOSK_RECOGNIZER_POOL_SIZE", "4"))
+
+_model = None
+_model_lock = threading.Lock()
+_recognizer_pool = queue.Queue(maxsize=RECOGNIZER_POOL_SIZE)
+
+def get_vosk_model():
+    """Return the process-wide Vosk model, loading it from disk on first use."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                start = time.perf_counter()
+                _model = Model(VOSK_MODEL_PATH)
+                print(f"Loaded Vosk model from {VOSK_MODEL_PATH} in {time.perf_counter() - start:.2f}s")
+    return _model
+
+def preload_vosk_model():
+    """Load the Vosk model eagerly, e.g. at worker startup, so the first transcription is not slowed down."""
+    get_vosk_model()
+
+def acquire_recognizer():
+    """Take an idle 16 kHz recognizer from the pool, or create one sharing the loaded model."""
+    try:
+        return _recognizer_pool.get_nowait()
+    except queue.Empty:
+        return KaldiRecognizer(get_vosk_model(), SAMPLE_RATE)
+
+def release_recognizer(recognizer):
+    """Reset a recognizer and return it to the pool (dropped if the pool is full)."""
+    recognizer.Reset()
+    try:
+        _recognizer_pool.put_nowait(recognizer)
+    except queue.Full:
+        pass
 
 def transcribe_audio_from_task(task_id):
     """Transcribe an audio file directly from the task_id without using file_downloader tool."""
     try:
-        # Get the file directly using download_task_file
-        filename, file_content = download_task_file(task_id)
+        # Get the cached file path directly using download_task_file_to_path
+        filename, file_path = download_task_file_to_path(task_id)
         
         # Check if we got a valid audio file by extension
         file_extension = filename.lower().split('.')[-1] if filename else ''
         if file_extension != 'mp3':
             return f"Error: File is not an MP3 audio file. File type: {file_extension}"
         
-        return transcribe_audio_from_file(file_content)
+        return transcribe_audio_from_path(file_path, input_format=file_extension)
+        
+    except Exception as e:
+        return f"Error transcribing audio: {str(e)}"
+
+async def atranscribe_audio_from_task(task_id):
+    """Async variant of transcribe_audio_from_task(); decoding and recognition run in a worker thread."""
+    try:
+        filename, file_path = await adownload_task_file_to_path(task_id)
+        
+        file_extension = filename.lower().split('.')[-1] if filename else ''
+        if file_extension != 'mp3':
+            return f"Error: File is not an MP3 audio file. File type: {file_extension}"
+        
+        return await asyncio.to_thread(transcribe_audio_from_path, file_path, file_extension)
         
     except Exception as e:
         return f"Error transcribing audio: {str(e)}"
 
-def transcribe_audio_from_binary(file_content):
-    # Convert MP3 binary data to WAV format
-    audio = AudioSegment.from_file(BytesIO(file_content), format="mp3")
-    audio = audio.set_channels(1).set_frame_rate(16000)
+def decode_audio_to_pcm(source, input_format=None, chunk_frames=4000):
+    """
+    Decode audio to 16 kHz mono 16-bit PCM with an ffmpeg pipe, yielding chunks as they are produced.
+
+    Args:
+        source: Raw encoded audio bytes, or a path to an audio file
+        input_format: Optional ffmpeg input format (e.g. "mp3"); probed from the data if omitted
+        chunk_frames: Number of PCM frames per yielded chunk
+
+    Yields:
+        bytes: PCM chunks of up to chunk_frames * 2 bytes
+    """
+    from_bytes = isinstance(source, (bytes, bytearray, memoryview))
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if input_format:
+        cmd += ["-f", input_format]
+    cmd += ["-i", "pipe:0" if from_bytes else str(source),
+            "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"]
+
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if from_bytes else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    )
 
-    # Save as WAV in memory
-    buffer = BytesIO()
-    audio.export(buffer, format="wav")
-    buffer.seek(0)
+    # Feed the encoded bytes from a separate thread so ffmpeg can decode while we read
+    writer = None
+    if from_bytes:
+        def feed():
+            try:
+                view = memoryview(source)
+                for offset in range(0, len(view), 65536):
+                    process.stdin.write(view[offset:offset + 65536])
+            except (OSError, ValueError):
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+        writer = threading.Thread(target=feed, daemon=True)
+        writer.start()
 
-    # Load audio into Wave format
-    with wave.open(buffer, 'rb') as wf:
-        model = Model("model/vosk-model-small-en-us-0.15")
-        recognizer = KaldiRecognizer(model, wf.getframerate())
+    chunk_bytes = chunk_frames * 2
+    try:
+        while (data := process.stdout.read(chunk_bytes)):
+            yield data
+    finally:
+        process.stdout.close()
+        if writer is not None:
+            writer.join()
+        stderr = process.stderr.read().decode("utf-8", errors="replace").strip()
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio (exit code {returncode}): {stderr}")
+
+def transcribe_pcm_stream(chunks):
+    """
+    Feed 16 kHz mono PCM chunks into a pooled recognizer as they arrive.
 
+    Returns:
+        Dictionary with the transcription, including any trailing speech from FinalResult()
+    """
+    recognizer = acquire_recognizer()
+    try:
         results = []
-        while (data := wf.readframes(4000)):
+        for data in chunks:
             if recognizer.AcceptWaveform(data):
                 result = json.loads(recognizer.Result())
                 results.append(result.get("text", ""))
-        
-        return {"transcription": " ".join(results)}
+        final = json.loads(recognizer.FinalResult())
+        results.append(final.get("text", ""))
+    finally:
+        release_recognizer(recognizer)
+
+    return {"transcription": " ".join(text for text in results if text)}
+
+def transcribe_audio_from_binary(file_content, input_format="mp3"):
+    """Transcribe encoded audio bytes (MP3 by default) without holding decoded copies in memory."""
+    return transcribe_pcm_stream(decode_audio_to_pcm(file_content, input_format=input_format))
+
+def transcribe_audio_from_path(path, input_format=None):
+    """Transcribe an audio or media file on disk, decoding it straight from the file."""
+    return transcribe_pcm_stream(decode_audio_to_pcm(path, input_format=input_format))
 
 transcribe_audio_tool = Tool(
     name="Transcribe Audio",
     func=transcribe_audio_from_task,
-    description="Transcribe text from an audio file. Provide the task_id to analyze the audio. Do NOT use the file_downloader tool before this one.",
+    coroutine=atranscribe_audio_from_task,
+    description=tool_description("Transcribe Audio"),
 )
\ No newline at end of file
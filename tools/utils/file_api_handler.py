@@ -1,32 +1,171 @@
 import re
 import requests
+from tools.utils.file_cache import get_task_file_cache
+from tools.utils.http_session import SCORING_API_URL, astream, get_http_session
 
-def download_task_file(task_id: str):
+# Size of the chunks streamed from the file endpoint to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+def _parse_filename(response, task_id: str) -> str:
+        content_disposition = response.headers.get('content-disposition', '').lower()
+        filename = re.search(r'filename=[\\"\']?([^\\"\';]+)', content_disposition)
+        return filename.group(1) if filename else task_id
+
+def download_task_file_to_path(task_id: str):
+        """
+        Downloads the file for the given task ID into the on-disk task file cache.
+
+        The response body is streamed to disk in chunks, so large attachments never
+        sit in memory. A fresh cached copy is returned without touching the network;
+        a stale one is revalidated with its ETag / Last-Modified headers and reused
+        on a 304 response.
+
+        Args:
+            task_id: The ID of the task whose file needs to be downloaded.
+
+        Returns:
+            (filename, path): The original filename and the path of the cached file if
+                   the request is successful, None otherwise.
+        """
+        endpoint = f"{SCORING_API_URL}/files/{task_id}"
+        session = get_http_session()
+        cache = get_task_file_cache()
+        entry = cache.get_entry(task_id)
+
+        if entry is not None and cache.is_fresh(entry):
+            cached = cache.path_for(task_id, entry)
+            if cached is not None:
+                return cached
+
+        headers = _conditional_headers(entry)
+
+        try:
+            response = session.get(endpoint, stream=True, headers=headers)
+            if response.status_code == 304 and entry is not None:
+                response.close()
+                cache.touch(task_id, refreshed=True)
+                cached = cache.path_for(task_id, entry)
+                if cached is not None:
+                    return cached
+                # The blob vanished between revalidation and read; fetch it unconditionally
+                response = session.get(endpoint, stream=True)
+            with response:
+                response.raise_for_status()  # Raise an exception for bad status codes
+                filename = _parse_filename(response, task_id)
+                return cache.put_stream(
+                    task_id,
+                    filename,
+                    response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE),
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified')
+                )
+
+        except requests.exceptions.RequestException as e:
+            print(f"Error downloading file for task ID '{task_id}': {e}")
+            # Fall back to a stale cached copy rather than failing the tool call
+            if entry is not None:
+                return cache.path_for(task_id, entry)
+            return None
+
+def _conditional_headers(entry) -> dict:
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+async def adownload_task_file_to_path(task_id: str):
+        """
+        Async variant of download_task_file_to_path() using the shared httpx client.
+
+        Returns:
+            (filename, path): The original filename and the path of the cached file if
+                   the request is successful, None otherwise.
+        """
+        import httpx
+
+        endpoint = f"{SCORING_API_URL}/files/{task_id}"
+        cache = get_task_file_cache()
+        entry = cache.get_entry(task_id)
+
+        if entry is not None and cache.is_fresh(entry):
+            cached = cache.path_for(task_id, entry)
+            if cached is not None:
+                return cached
+
+        headers = _conditional_headers(entry)
+        try:
+            async with astream("GET", endpoint, headers=headers) as response:
+                if response.status_code == 304 and entry is not None:
+                    cache.touch(task_id, refreshed=True)
+                    cached = cache.path_for(task_id, entry)
+                    if cached is not None:
+                        return cached
+                else:
+                    response.raise_for_status()
+                    return await _write_async_response(cache, task_id, response)
+            # The blob vanished between revalidation and read; fetch it unconditionally
+            async with astream("GET", endpoint) as response:
+                response.raise_for_status()
+                return await _write_async_response(cache, task_id, response)
+
+        except httpx.HTTPError as e:
+            print(f"Error downloading file for task ID '{task_id}': {e}")
+            # Fall back to a stale cached copy rather than failing the tool call
+            if entry is not None:
+                return cache.path_for(task_id, entry)
+            return None
+
+async def _write_async_response(cache, task_id, response):
+        writer = cache.open_writer()
+        try:
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(
+            task_id,
+            _parse_filename(response, task_id),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified')
+        )
+
+def download_task_file(task_id: str, use_cache: bool = True):
         """
         Downloads the file for the given task ID.
 
+        Prefer download_task_file_to_path() for large files; this reads the whole file into memory.
+
         Args:
             task_id: The ID of the task whose file needs to be downloaded.
+            use_cache: Set to False to bypass the on-disk cache entirely.
 
         Returns:
-            bytes: The content of the file if the request is successful,
+            (filename, bytes): The filename and content of the file if the request is successful,
                    None otherwise.
 
         Raises:
             requests.exceptions.RequestException: If there's an issue with the HTTP request.
         """
-        endpoint = f"https://agents-course-unit4-scoring.hf.space/files/{task_id}"
-        
+        if use_cache:
+            result = download_task_file_to_path(task_id)
+            if result is None:
+                return None
+            filename, path = result
+            with open(path, 'rb') as f:
+                return (filename, f.read())
+
+        endpoint = f"{SCORING_API_URL}/files/{task_id}"
         try:
-            response = requests.get(endpoint, stream=True)
+            response = get_http_session().get(endpoint)
             response.raise_for_status()  # Raise an exception for bad status codes
-            content_type = response.headers.get('Content-Type', '').lower()
-            content_disposition = response.headers.get('content-disposition', '').lower()
-            filename = re.search(r'filename=[\\"\']?([^\\"\';]+)', content_disposition)
 
             # Return the raw content of the file as bytes
-            return (filename.group(1), response.content)
+            return (_parse_filename(response, task_id), response.content)
 
         except requests.exceptions.RequestException as e:
             print(f"Error downloading file for task ID '{task_id}': {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.getenv("TASK_FILE_CACHE_DIR", os.path.join(".cache", "task_files"))
+DEFAULT_MAX_BYTES = int(os.getenv("TASK_FILE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Entries younger than this are served without revalidating against the server
+DEFAULT_MAX_AGE = float(os.getenv("TASK_FILE_CACHE_MAX_AGE", "3600"))
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write `data` to a temp file in the same directory, then rename it over `path`."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class BlobWriter:
+    """Writes one blob to a temp file while hashing it; commit() moves it into the cache."""
+
+    def __init__(self, cache: "TaskFileCache"):
+        self.cache = cache
+        self._digest = hashlib.sha256()
+        self.size = 0
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.blob_dir, prefix=".tmp-")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes):
+        if chunk:
+            self._digest.update(chunk)
+            self.size += len(chunk)
+            self._file.write(chunk)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def commit(self, task_id: str, filename: str, etag: str = None, last_modified: str = None) -> str:
+        """Rename the blob to its content address, record the entry and return (filename, blob_path)."""
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            sha256 = self._digest.hexdigest()
+            blob = self.cache.blob_path(sha256)
+            if os.path.exists(blob):
+                os.remove(self._tmp_path)
+            else:
+                os.replace(self._tmp_path, blob)
+        except BaseException:
+            self.abort()
+            raise
+        cache = self.cache
+        cache._write_entry(task_id, filename, sha256, self.size, etag, last_modified)
+        with cache._lock:
+            cache.misses += 1
+        cache.evict(keep=task_id)
+        return filename, blob
+
+
+class TaskFileCache:
+    """
+    Persistent, size-bounded cache of task attachments.
+
+    Layout:
+        blobs/<sha256>      content-addressed file bodies (shared by identical files)
+        entries/<task_id>   JSON metadata: filename, sha256, size, etag, last_modified, fetched_at
+
+    All writes go through a temp file + os.replace, so concurrent workers never see a
+    partially written entry. Recency is tracked with the entry's mtime and the least
+    recently used entries are evicted once the blobs exceed `max_bytes`.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.entry_dir = os.path.join(directory, "entries")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.entry_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    def _entry_path(self, task_id: str) -> str:
+        return os.path.join(self.entry_dir, hashlib.sha256(task_id.encode("utf-8")).hexdigest())
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256)
+
+    def get_entry(self, task_id: str):
+        """Return the metadata for `task_id`, or None if missing or its blob was evicted."""
+        path = self._entry_path(task_id)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self.blob_path(entry["sha256"])):
+            return None
+        return entry
+
+    def is_fresh(self, entry) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.max_age
+
+    def touch(self, task_id: str, refreshed: bool = False):
+        """Mark an entry as recently used; `refreshed` also resets its revalidation clock."""
+        path = self._entry_path(task_id)
+        if refreshed:
+            with self._lock:
+                self.revalidations += 1
+            entry = self.get_entry(task_id)
+            if entry is not None:
+                entry["fetched_at"] = time.time()
+                _atomic_write(path, json.dumps(entry).encode("utf-8"))
+                return
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def path_for(self, task_id: str, entry=None):
+        """Return (filename, blob_path) for a cached task file and mark it recently used, or None."""
+        entry = entry or self.get_entry(task_id)
+        if entry is None:
+            return None
+        path = self.blob_path(entry["sha256"])
+        if not os.path.exists(path):
+            return None
+        self.touch(task_id)
+        with self._lock:
+            self.hits += 1
+        return entry["filename"], path
+
+    def put(self, task_id: str, filename: str, content: bytes, etag: str = None, last_modified: str = None):
+        """Store `content` for `task_id` and evict old entries if the cache is over budget."""
+        return self.put_stream(task_id, filename, [content], etag=etag, last_modified=last_modified)
+
+    def put_stream(self, task_id: str, filename: str, chunks, etag: str = None, last_modified: str = None):
+        """
+        Store a file for `task_id` from an iterable of byte chunks without buffering it in memory.
+
+        The chunks are hashed while being written to a temp file, which is then renamed
+        to its content address. Returns (filename, blob_path) of the stored file.
+        """
+        writer = self.open_writer()
+        try:
+            for chunk in chunks:
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(task_id, filename, etag=etag, last_modified=last_modified)
+
+    def open_writer(self) -> "BlobWriter":
+        """Start writing a new blob chunk by chunk, e.g. from an async download."""
+        return BlobWriter(self)
+
+    def _write_entry(self, task_id, filename, sha256, size, etag, last_modified):
+        entry = {
+            "task_id": task_id,
+            "filename": filename,
+            "sha256": sha256,
+            "size": size,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        _atomic_write(self._entry_path(task_id), json.dumps(entry).encode("utf-8"))
+
+    def evict(self, keep: str = None):
+        """
+        Remove least recently used entries (and unreferenced blobs) until under `max_bytes`.
+        The entry for `keep` (usually the one just written) is never evicted.
+        """
+        entries = []
+        for name in os.listdir(self.entry_dir):
+            if name.startswith(".tmp-"):
+                continue
+            path = os.path.join(self.entry_dir, name)
+            try:
+                with open(path, "r") as f:
+                    entry = json.load(f)
+                entries.append((os.path.getmtime(path), path, entry))
+            except (OSError, ValueError):
+                continue
+
+        blob_sizes = {}
+        for _, _, entry in entries:
+            blob_sizes[entry["sha256"]] = entry.get("size", 0)
+        total = sum(blob_sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        entries.sort(key=lambda item: item[0])
+        refcounts = {}
+        for _, _, entry in entries:
+            refcounts[entry["sha256"]] = refcounts.get(entry["sha256"], 0) + 1
+
+        for _, path, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and entry.get("task_id") == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            sha256 = entry["sha256"]
+            refcounts[sha256] -= 1
+            if refcounts[sha256] == 0:
+                try:
+                    os.remove(self.blob_path(sha256))
+                except OSError:
+                    pass
+                total -= blob_sizes[sha256]
+            print(f"Evicted cached file for task {entry.get('task_id')} ({entry.get('size', 0)} bytes)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_task_file_cache() -> TaskFileCache:
+    """Return the process-wide task file cache, creating its directory on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TaskFileCache()
+    return _cache
@@ -0,0 +1,40 @@
+import bisect
+import threading
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram.
+
+    Each observation is counted in the first bucket whose upper bound is >= the value;
+    values above the last bound go to "+Inf".
+    """
+
+    def __init__(self, bounds):
+        self.bounds = sorted(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = None
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+            self._max = value if self._max is None else max(self._max, value)
+
+    def snapshot(self) -> dict:
+        """Return {"count", "sum", "mean", "max", "buckets"} with per-bucket counts keyed by "<=bound"."""
+        with self._lock:
+            buckets = {f"<={bound:g}": count for bound, count in zip(self.bounds, self._counts)}
+            buckets["+Inf"] = self._counts[-1]
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "max": self._max,
+                "buckets": buckets,
+            }
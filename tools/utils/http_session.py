@@ -0,0 +1,157 @@
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SCORING_API_URL = "https://agents-course-unit4-scoring.hf.space"
+
+# Connections kept alive per host; should be at least the number of concurrent workers
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+
+# Default (connect, read) timeout applied to every request made through the shared session
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_metrics = {"requests": 0, "retries": 0}
+_metrics_lock = threading.Lock()
+
+
+class _CountingRetry(Retry):
+    """Retry policy that records every retry in the shared HTTP metrics."""
+
+    def increment(self, *args, **kwargs):
+        with _metrics_lock:
+            _metrics["retries"] += 1
+        return super().increment(*args, **kwargs)
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that applies the default timeout and counts requests."""
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = DEFAULT_TIMEOUT
+        with _metrics_lock:
+            _metrics["requests"] += 1
+        return super().send(request, **kwargs)
+
+
+def _build_session() -> requests.Session:
+    retry = _CountingRetry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = _PooledAdapter(
+        pool_connections=4,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide requests.Session used for every call to the scoring space.
+
+    The session keeps per-host keep-alive connection pools, applies connect/read
+    timeouts by default and retries 429/5xx responses with exponential backoff
+    (honouring Retry-After).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get_http_metrics() -> dict:
+    """
+    Return request, retry and connection counters for the shared session.
+
+    connection_reuse_rate is the share of HTTP attempts (requests plus retries) that
+    did not need a new connection.
+    """
+    connections = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    metrics["connections_opened"] = connections
+    attempts = metrics["requests"] + metrics["retries"]
+    if attempts:
+        metrics["connection_reuse_rate"] = max(0.0, 1 - connections / attempts)
+    else:
+        metrics["connection_reuse_rate"] = 0.0
+    return metrics
+
+
+# httpx clients are bound to the event loop that created them, so they are kept per loop
+_async_clients = {}
+
+def get_async_http_client():
+    """
+    Return the shared httpx.AsyncClient for the running event loop, with the same
+    pool size and timeouts as the synchronous session.
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=HTTP_POOL_MAXSIZE),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            follow_redirects=True
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _retry_delay(response, attempt: int) -> float:
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return HTTP_BACKOFF_FACTOR * (2 ** attempt)
+
+
+@asynccontextmanager
+async def astream(method: str, url: str, **kwargs):
+    """
+    Async counterpart of a streamed session request: yields an httpx response whose body
+    has not been read yet, retrying 429/5xx responses with exponential backoff.
+    """
+    client = get_async_http_client()
+    attempt = 0
+    while True:
+        with _metrics_lock:
+            _metrics["requests" if attempt == 0 else "retries"] += 1
+        async with client.stream(method, url, **kwargs) as response:
+            if response.status_code not in RETRY_STATUSES or attempt >= HTTP_MAX_RETRIES:
+                yield response
+                return
+            delay = _retry_delay(response, attempt)
+        attempt += 1
+        await asyncio.sleep(delay)
@@ -0,0 +1,231 @@
+from langchain.tools import Tool
+import asyncio
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+
+from chat_agent.rate_limiter import get_rate_limiter
+from tools.registry import tool_description
+
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join(".cache", "search_results.sqlite"))
+# Seconds a cached result stays valid (0 = never expires)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "86400"))
+# Max searches started per minute; 0 (the default) leaves searches unthrottled
+SEARCH_MAX_CALLS_PER_MINUTE = int(os.getenv("SEARCH_MAX_CALLS_PER_MINUTE", "0"))
+# Retries after the backend reports a rate limit, with exponential backoff
+SEARCH_MAX_RETRIES = int(os.getenv("SEARCH_MAX_RETRIES", "4"))
+SEARCH_BACKOFF_BASE = float(os.getenv("SEARCH_BACKOFF_BASE", "2.0"))
+SEARCH_BACKOFF_MAX = 60.0
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_RATE_LIMIT_RE = re.compile(r"rate ?limit|\b(202|429)\b")
+
+
+class SearchRateLimited(RuntimeError):
+    """Raised when the backend is still rate limiting after all retries."""
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, NFKC-normalize and collapse whitespace so near-identical queries share a key."""
+    query = unicodedata.normalize("NFKC", query or "")
+    query = _WHITESPACE_RE.sub(" ", query).strip().casefold()
+    # Trailing punctuation does not change DuckDuckGo's results
+    return query.rstrip(" ?!.")
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for DuckDuckGo's RatelimitException and the 202/429 errors older versions raise."""
+    if "ratelimit" in type(error).__name__.lower():
+        return True
+    return bool(_RATE_LIMIT_RE.search(str(error).lower()))
+
+
+class SearchCache:
+    """
+    SQLite-backed store of search results keyed by normalized query.
+
+    Entries older than `ttl` are treated as misses.
+    """
+
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, query TEXT, result TEXT, created_at REAL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(query: str) -> str:
+        return hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+
+    def get(self, query: str):
+        """Return the cached result for `query`, or None."""
+        key = self.key(query)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT result, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl and time.time() - row[1] > self.ttl:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                conn.commit()
+                return None
+        return row[0] if row is not None else None
+
+    def put(self, query: str, result: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, query, result, created_at) VALUES (?, ?, ?, ?)",
+                (self.key(query), normalize_query(query), result, time.time())
+            )
+            conn.commit()
+
+
+class CachedSearch:
+    """
+    Caching front for a search backend.
+
+    Results are cached by normalized query. Concurrent calls for the same query share
+    one backend request. Rate-limit errors make every caller back off until the
+    cooldown ends, then the call is retried.
+    """
+
+    def __init__(self, backend=None, cache: SearchCache = None, max_retries: int = SEARCH_MAX_RETRIES,
+                 backoff_base: float = SEARCH_BACKOFF_BASE):
+        """
+        Args:
+            backend: Callable taking a query and returning the result text. Defaults to
+                     LangChain's DuckDuckGoSearchRun, created on first use.
+            cache: Result store (defaults to a SearchCache at SEARCH_CACHE_PATH)
+            max_retries: Retries after a rate-limit error
+            backoff_base: Seconds waited after the first rate-limit error, doubled per retry
+        """
+        self._backend = backend
+        self.cache = cache if cache is not None else SearchCache()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._cooldown_until = 0.0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "rate_limited": 0}
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            from langchain_community.tools import DuckDuckGoSearchRun
+            self._backend = DuckDuckGoSearchRun().run
+        return self._backend
+
+    def _wait_for_cooldown(self):
+        with self._lock:
+            wait = self._cooldown_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+    def _fetch(self, query: str) -> str:
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_cooldown()
+            get_rate_limiter("duckduckgo").acquire()
+            try:
+                return self.backend(query)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                delay = min(SEARCH_BACKOFF_MAX, self.backoff_base * (2 ** attempt)) * random.uniform(0.8, 1.2)
+                print(f"Search rate limited ({e}); backing off {delay:.1f}s (attempt {attempt + 1})")
+                with self._lock:
+                    self.stats["rate_limited"] += 1
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        raise SearchRateLimited(f"Search for {query!r} still rate limited after {self.max_retries} retries")
+
+    def search(self, query: str) -> str:
+        cached = self.cache.get(query)
+        if cached is not None:
+            with self._lock:
+                self.stats["hits"] += 1
+            print(f"Search cache hit: {query!r}")
+            return cached
+
+        key = self.cache.key(query)
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._fetch(query)
+            self.cache.put(query, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+get_rate_limiter("duckduckgo", SEARCH_MAX_CALLS_PER_MINUTE)
+
+_search = None
+_search_lock = threading.Lock()
+
+def get_cached_search() -> CachedSearch:
+    """Return the process-wide CachedSearch backed by DuckDuckGo."""
+    global _search
+    if _search is None:
+        with _search_lock:
+            if _search is None:
+                _search = CachedSearch()
+    return _search
+
+
+def web_search(query: str) -> str:
+    """
+    Search DuckDuckGo, serving repeated queries from the search cache.
+
+    Args:
+        query: The search query
+
+    Returns:
+        The search result snippets as text
+    """
+    return get_cached_search().search(query)
+
+
+async def aweb_search(query: str) -> str:
+    """Async variant of web_search; the search runs in a worker thread."""
+    return await asyncio.to_thread(web_search, query)
+
+
+web_search_tool = Tool(
+    name="duckduckgo_search",
+    func=web_search,
+    coroutine=aweb_search,
+    description=tool_description("duckduckgo_search")
+)
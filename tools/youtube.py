@@ -1,10 +1,52 @@
 from langchain.tools import Tool
+from tools.registry import tool_description
+import asyncio
 import os
 import ssl
 import tempfile
 import uuid
 from yt_dlp import YoutubeDL
-from tools.transcribe_audio import transcribe_audio_from_binary
+from tools.transcribe_audio import transcribe_audio_from_path
+
+def download_youtube_audio(url: str, directory: str) -> str:
+    """
+    Download the best audio-only stream of a YouTube video in its native container.
+
+    No postprocessor runs, so nothing is re-encoded; ffmpeg decodes the stream once,
+    straight to PCM, when it is transcribed.
+
+    Args:
+        url: The YouTube video URL
+        directory: Directory the audio file is written to
+
+    Returns:
+        Path of the downloaded audio file (e.g. .webm or .m4a)
+    """
+    # Disable SSL verification globally (not recommended for production, but useful for debugging)
+    ssl._create_default_https_context = ssl._create_unverified_context
+
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': os.path.join(directory, f"{uuid.uuid4()}.%(ext)s"),
+        'quiet': False,
+        'no_warnings': False,
+        'nocheckcertificate': True  # Disable SSL certificate verification in yt-dlp
+    }
+    with YoutubeDL(ydl_opts) as ydl:
+        print(f"Downloading audio with YoutubeDL...")
+        info = ydl.extract_info(url, download=True)
+        print(f"Download completed successfully")
+        downloads = info.get('requested_downloads') or [info]
+        path = downloads[0].get('filepath') or ydl.prepare_filename(info)
+
+    if not os.path.exists(path):
+        # Fall back to whatever yt-dlp wrote into the directory
+        files = os.listdir(directory)
+        print(f"Files in directory: {files}")
+        if not files:
+            raise FileNotFoundError(f"yt-dlp did not write an audio file for {url}")
+        path = os.path.join(directory, files[0])
+    return path
 
 def youtube_processor(url: str, task_id: str = None):
     """
@@ -22,69 +64,26 @@ def youtube_processor(url: str, task_id: str = None):
         
         # Create a temporary directory to store the audio file
         with tempfile.TemporaryDirectory() as temp_dir:
-            # Generate a unique filename
-            temp_filename = os.path.join(temp_dir, f"{uuid.uuid4()}.mp3")
-            print(f"Temp filename: {temp_filename}")
-            
-            # Use yt-dlp to download the audio
             print(f"Downloading audio from {url}...")
-            
-            # Disable SSL verification globally (not recommended for production, but useful for debugging)
-            ssl._create_default_https_context = ssl._create_unverified_context
-            
-            # Configure yt-dlp options with SSL verification disabled
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': temp_filename,
-                'quiet': False,
-                'no_warnings': False,
-                'nocheckcertificate': True  # Disable SSL certificate verification in yt-dlp
-            }
-
-            # Download the audio
-            with YoutubeDL(ydl_opts) as ydl:
-                print(f"Downloading audio with YoutubeDL...")
-                ydl.download([url])
-                print(f"Download completed successfully")
-            
-            # Find the downloaded file
-            actual_filename = temp_filename
-            if not os.path.exists(actual_filename):
-                # Try with a different extension (yt-dlp might add .mp3 extension)
-                if os.path.exists(f"{temp_filename}.mp3"):
-                    actual_filename = f"{temp_filename}.mp3"
-                else:
-                    # List files in directory to see what was created
-                    files = os.listdir(temp_dir)
-                    print(f"Files in directory: {files}")
-                    # Try to find the downloaded file
-                    for file in files:
-                        if file.endswith(".mp3"):
-                            actual_filename = os.path.join(temp_dir, file)
-                            break
-            
-            print(f"Final audio file: {actual_filename}")
-            
-            # Read the file content as binary
-            with open(actual_filename, 'rb') as f:
-                file_content = f.read()
+            audio_path = download_youtube_audio(url, temp_dir)
+            print(f"Final audio file: {audio_path}")
             
             print(f"Transcribing audio from {url}...")
-            # Pass the binary content to transcribe_audio_from_binary
-            transcription = transcribe_audio_from_binary(file_content)
+            # ffmpeg reads the downloaded stream and pipes 16 kHz mono PCM to Vosk
+            transcription = transcribe_audio_from_path(audio_path)
             print("Transcription completed successfully:   ", transcription["transcription"])
             return transcription
     except Exception as e:
         print(f"Error processing YouTube video to text {url}: {str(e)}")
         return {"error": f"Error processing YouTube video to text {url}: {str(e)}"}
                 
+async def ayoutube_processor(url: str, task_id: str = None):
+    """Async variant of youtube_processor(); download and transcription run in a worker thread."""
+    return await asyncio.to_thread(youtube_processor, url, task_id)
+
 youtube_tool = Tool(
     name="youtube_processor",
     func=youtube_processor,
-    description="Extract and transcribe the audio from a YouTube video. Provide the URL to analyze the YouTube link (e.g. https://www.youtube.com/watch?v=...). Use this tool when the quesiton calls for processing YouTube videos and urls."
+    coroutine=ayoutube_processor,
+    description=tool_description("youtube_processor")
 )
\ No newline at end of file
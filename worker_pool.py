@@ -0,0 +1,395 @@
+"""
+Long-lived worker pool that answers a stream of questions.
+
+Each worker process loads the agent, its tool modules, the Bedrock client, the Vosk
+model and the FEN classifier once, then answers questions until the pool drains.
+Questions are JSON objects with the same fields as questions.json, one per line,
+read from stdin or from clients of a local Unix socket:
+
+    {"task_id": "...", "question": "...", "id": "optional client id"}
+
+Each answer is written back as one JSON line:
+
+    {"id": ..., "task_id": "...", "question": "...", "submitted_answer": "..."}
+    {"id": ..., "task_id": "...", "question": "...", "error": "..."}
+
+The agent's own logging goes to stderr, so stdout only carries answers.
+
+    python worker_pool.py --workers 4 < questions.jsonl > answers.jsonl
+    python worker_pool.py --socket /tmp/agent.sock --max-rss-mb 6000
+
+SIGINT/SIGTERM (or EOF on stdin) drains the pool. New questions are refused, queued
+and running ones are finished, then the workers exit. A second signal stops at once.
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+
+DEFAULT_WORKERS = int(os.getenv("AGENT_WORKERS", "2"))
+# A worker is replaced after a question leaves its resident memory above this (0 = no cap)
+WORKER_MAX_RSS_MB = int(os.getenv("WORKER_MAX_RSS_MB", "0"))
+# A worker is replaced after answering this many questions (0 = never)
+WORKER_MAX_TASKS = int(os.getenv("WORKER_MAX_TASKS", "0"))
+PRELOAD_CHOICES = ["vosk", "fen", "tools"]
+
+def log(*args):
+    print("[worker_pool]", *args, file=sys.stderr, flush=True)
+
+def current_rss_mb() -> float:
+    """Resident memory of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def warm_up(preload):
+    """Build the agent and load everything a question may need, so no answer pays for it."""
+    from agent import BasicAgent
+    from chat_agent.meta_agent import get_bedrock_client
+    agent = BasicAgent()
+    agent.get_graph()
+    get_bedrock_client(region_name=agent.region_name)
+    if "tools" in preload:
+        from tools.registry import TOOL_SPECS
+        for spec in TOOL_SPECS.values():
+            importlib.import_module(spec.module)
+    if "vosk" in preload:
+        from tools.transcribe_audio import preload_vosk_model
+        preload_vosk_model()
+    if "fen" in preload:
+        from tools.board_to_fen import preload_fen_model
+        preload_fen_model()
+    return agent
+
+def worker_main(worker_id, task_queue, result_queue, preload, max_rss_mb, max_tasks, warm_up=warm_up):
+    """
+    Worker process loop: warm up, then answer (request_id, item) tasks until a None
+    sentinel arrives or the memory/task cap is reached.
+    """
+    # stdout carries the answers in stdin mode; send the agent's prints to stderr
+    os.dup2(2, 1)
+    # The parent decides when to stop; workers finish their question and exit on the sentinel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    start = time.perf_counter()
+    try:
+        agent = warm_up(preload)
+    except Exception as e:
+        result_queue.put(("failed", worker_id, f"{type(e).__name__}: {e}"))
+        return
+    result_queue.put(("ready", worker_id, time.perf_counter() - start))
+
+    handled = 0
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        request_id, item = task
+        result_queue.put(("started", worker_id, request_id))
+        response = {"task_id": item.get("task_id"), "question": item.get("question")}
+        try:
+            attachment_id = item.get("task_id") if item.get("file_name") else None
+            response["submitted_answer"] = agent(item.get("question"), attachment_id)
+        except Exception as e:
+            response["error"] = f"AGENT ERROR: {e}"
+        result_queue.put(("result", worker_id, (request_id, response)))
+
+        handled += 1
+        rss_mb = current_rss_mb()
+        if (max_rss_mb and rss_mb > max_rss_mb) or (max_tasks and handled >= max_tasks):
+            result_queue.put(("retire", worker_id, f"{handled} questions, {rss_mb:.0f} MB resident"))
+            break
+
+
+class WorkerPool:
+    """
+    Parent side of the pool: hands questions to the workers, routes answers back to
+    whoever asked, replaces workers that retire or die, and drains on request.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, preload=PRELOAD_CHOICES,
+                 max_rss_mb: int = WORKER_MAX_RSS_MB, max_tasks: int = WORKER_MAX_TASKS, warm_up=warm_up):
+        """
+        Args:
+            warm_up: Called in each worker with the preload list to build its agent; must be
+                     a module-level function, as it is sent to the worker processes
+        """
+        # forkserver forks workers from a clean, single-threaded process; the agent module
+        # is imported there once so each fork starts with it loaded
+        methods = multiprocessing.get_all_start_methods()
+        self.ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if "forkserver" in methods:
+            self.ctx.set_forkserver_preload(["agent"])
+        self.workers = max(1, workers)
+        self.preload = list(preload)
+        self.max_rss_mb = max_rss_mb
+        self.max_tasks = max_tasks
+        self.warm_up = warm_up
+        self.task_queue = self.ctx.Queue()
+        self.result_queue = self.ctx.Queue()
+        self.draining = threading.Event()
+        self.stats = {"answered": 0, "errors": 0, "worker_restarts": 0}
+        self._processes = {}
+        self._failed = set()
+        self._in_flight = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._next_worker_id = 0
+        self._next_request_id = 0
+
+    def _spawn(self):
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        process = self.ctx.Process(
+            target=worker_main, name=f"agent-worker-{worker_id}", daemon=True,
+            args=(worker_id, self.task_queue, self.result_queue, self.preload, self.max_rss_mb, self.max_tasks,
+                  self.warm_up)
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def start(self):
+        for _ in range(self.workers):
+            self._spawn()
+        log(f"Started {self.workers} worker(s), preloading: {', '.join(self.preload) or 'nothing'}")
+
+    def submit(self, item: dict, reply) -> bool:
+        """
+        Queue a question; reply(response) is called from the pool thread with its answer.
+
+        Returns:
+            False if the pool is draining and the question was refused.
+        """
+        with self._lock:
+            if self.draining.is_set():
+                return False
+            request_id = self._next_request_id
+            self._next_request_id += 1
+            self._pending[request_id] = (item, reply)
+        self.task_queue.put((request_id, item))
+        return True
+
+    def drain(self):
+        if not self.draining.is_set():
+            log("Draining: finishing queued questions, refusing new ones")
+        self.draining.set()
+
+    def _reply(self, request_id, response):
+        with self._lock:
+            item, reply = self._pending.pop(request_id, (None, None))
+        if reply is None:
+            return
+        if "id" in item:
+            response = {"id": item["id"], **response}
+        self.stats["errors" if "error" in response else "answered"] += 1
+        try:
+            reply(response)
+        except Exception as e:
+            log(f"Could not deliver answer for task {response.get('task_id')}: {e}")
+
+    def _handle(self, message):
+        kind, worker_id, payload = message
+        if kind == "ready":
+            log(f"Worker {worker_id} ready in {payload:.1f}s")
+        elif kind == "started":
+            self._in_flight[worker_id] = payload
+        elif kind == "result":
+            self._in_flight.pop(worker_id, None)
+            self._reply(*payload)
+        elif kind == "retire":
+            log(f"Worker {worker_id} retiring after {payload}")
+        elif kind == "failed":
+            log(f"Worker {worker_id} failed to start: {payload}")
+            self._failed.add(worker_id)
+
+    def _drain_results(self):
+        """Handle every message already queued, without waiting for more."""
+        while True:
+            try:
+                self._handle(self.result_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    def _check_workers(self):
+        dead = [(worker_id, process) for worker_id, process in self._processes.items() if not process.is_alive()]
+        if dead:
+            # A worker flushes its messages before exiting: handle them first, so the
+            # answer of a worker that retired is not taken for a crash
+            self._drain_results()
+        for worker_id, process in dead:
+            del self._processes[worker_id]
+            request_id = self._in_flight.pop(worker_id, None)
+            if request_id is not None:
+                item = self._pending.get(request_id, ({}, None))[0]
+                self._reply(request_id, {
+                    "task_id": item.get("task_id"), "question": item.get("question"),
+                    "error": f"worker exited with code {process.exitcode} while answering"
+                })
+            if worker_id in self._failed:
+                # Warm-up errors repeat in a replacement; don't respawn in a loop
+                continue
+            if not self.draining.is_set() or self._pending:
+                self.stats["worker_restarts"] += 1
+                self._spawn()
+        if not self._processes and (self._pending or not self.draining.is_set()):
+            log("No worker is running; failing the remaining questions")
+            self.drain()
+            for request_id, (item, _) in list(self._pending.items()):
+                self._reply(request_id, {"task_id": item.get("task_id"), "question": item.get("question"),
+                                         "error": "no worker could be started"})
+
+    def run(self):
+        """Serve until draining is requested and every accepted question has been answered."""
+        while not (self.draining.is_set() and not self._pending):
+            try:
+                self._handle(self.result_queue.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            self._drain_results()
+            self._check_workers()
+        self.shutdown()
+
+    def shutdown(self, timeout: float = 30):
+        for _ in self._processes:
+            self.task_queue.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        self._processes.clear()
+        log(f"Stopped: {self.stats}")
+
+    def terminate(self):
+        for process in self._processes.values():
+            process.terminate()
+
+
+def parse_request(line: str):
+    """Return (item, error) for one JSONL request line."""
+    try:
+        item = json.loads(line)
+    except ValueError as e:
+        return None, f"invalid JSON: {e}"
+    if not isinstance(item, dict) or not item.get("question"):
+        return None, "request must be a JSON object with a 'question'"
+    return item, None
+
+def serve_lines(pool: WorkerPool, lines, write, reply=None) -> int:
+    """
+    Submit every request read from `lines`.
+
+    Args:
+        write: Called with refusals and parse errors, which never reach a worker
+        reply: Called with each answer (defaults to write)
+
+    Returns:
+        The number of questions accepted by the pool.
+    """
+    submitted = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        item, error = parse_request(line)
+        if error:
+            write({"error": error})
+        elif pool.submit(item, reply or write):
+            submitted += 1
+        else:
+            write({"id": item.get("id"), "task_id": item.get("task_id"), "error": "worker pool is draining"})
+    return submitted
+
+def json_line_writer(stream):
+    lock = threading.Lock()
+
+    def write(response):
+        with lock:
+            stream.write(json.dumps(response, ensure_ascii=False) + "\n")
+            stream.flush()
+    return write
+
+def serve_stdin(pool: WorkerPool):
+    stdout = sys.stdout
+
+    def read():
+        serve_lines(pool, sys.stdin, json_line_writer(stdout))
+        # End of input: answer what was read, then stop
+        pool.drain()
+    threading.Thread(target=read, name="stdin-reader", daemon=True).start()
+
+def serve_socket(pool: WorkerPool, path: str):
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    server.settimeout(0.5)
+    log(f"Listening on {path}")
+
+    def handle(conn):
+        with conn, conn.makefile("r", encoding="utf-8") as reader, conn.makefile("w", encoding="utf-8") as writer:
+            write = json_line_writer(writer)
+            answered = threading.Semaphore(0)
+
+            def reply(response):
+                write(response)
+                answered.release()
+            # Keep the connection open until this client's answers have been written
+            for _ in range(serve_lines(pool, reader, write, reply)):
+                answered.acquire()
+
+    def accept():
+        while not pool.draining.is_set():
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+        server.close()
+        os.unlink(path)
+    threading.Thread(target=accept, name="socket-acceptor", daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve questions from a pool of warm agent workers.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Number of worker processes (default: %(default)s)")
+    parser.add_argument("--socket", default=None,
+                        help="Serve JSONL over this Unix socket instead of stdin/stdout")
+    parser.add_argument("--preload", nargs="*", choices=PRELOAD_CHOICES, default=PRELOAD_CHOICES,
+                        help="What each worker loads before its first question (default: all)")
+    parser.add_argument("--max-rss-mb", type=int, default=WORKER_MAX_RSS_MB,
+                        help="Replace a worker whose resident memory exceeds this after a question (0 = no cap)")
+    parser.add_argument("--max-tasks", type=int, default=WORKER_MAX_TASKS,
+                        help="Replace a worker after this many questions (0 = never)")
+    args = parser.parse_args()
+
+    pool = WorkerPool(workers=args.workers, preload=args.preload,
+                      max_rss_mb=args.max_rss_mb, max_tasks=args.max_tasks)
+
+    def on_signal(signum, frame):
+        if pool.draining.is_set():
+            log("Second signal: stopping now")
+            pool.terminate()
+            os._exit(1)
+        pool.drain()
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+
+    pool.start()
+    if args.socket:
+        serve_socket(pool, args.socket)
+    else:
+        serve_stdin(pool)
+    pool.run()